@@ -1,6 +1,8 @@
 import os
+import time
 import shutil
 from abc import abstractmethod
+from contextlib import contextmanager
 from plynx.db.node import Node, Parameter, ParameterTypes, NodeRunningStatus
 from plynx.db.validation_error import ValidationError
 from plynx.constants import NodeStatus, SpecialNodeId, ValidationTargetType, ValidationCode
@@ -43,6 +45,34 @@ class BaseExecutor:
         """
         pass
 
+    def get_timeout(self):
+        """Get the max execution time of the Node.
+
+        Return:
+            (int, None)     `_max_run_seconds` parameter, None if it is not set or not positive
+        """
+        # the legacy `_timeout` is not enforced: the nodes created before had it set to 600 by default
+        parameter = self.node.get_parameter_by_name('_max_run_seconds', throw=False)
+        if parameter is None or not parameter.value or int(parameter.value) <= 0:
+            return None
+        return int(parameter.value)
+
+    @contextmanager
+    def timing(self, phase):
+        """Record the start time and the duration of a phase of the run in `node.timings`.
+
+        The start is the wall clock time so that the phases of different nodes can be compared,
+        the duration is measured with the monotonic clock.
+        """
+        start, start_time = time.time(), time.monotonic()
+        try:
+            yield
+        finally:
+            self.node.timings[phase] = {
+                'start': start,
+                'duration': time.monotonic() - start_time,
+            }
+
     def is_updated(self):
         """Function that is regularly called by a Worker.
 
@@ -53,6 +83,14 @@ class BaseExecutor:
         """
         return False
 
+    def get_log_tails(self):
+        """Get the recent part of the logs kept in memory while the node is running.
+
+        Returns:
+            (dict):     Log name to text
+        """
+        return {}
+
     @classmethod
     def get_default_node(cls, is_workflow):
         node = Node()
@@ -1,5 +1,6 @@
 from collections import namedtuple
 from plynx.constants import NodeResources
+from plynx.utils.file_handler import materialize_file, upload_file_stream
 
 PreviewObject = namedtuple('PreviewObject', ['fp', 'resource_id'])
 
@@ -13,9 +14,40 @@ def _force_decode(byte_array):
 
 
 class BaseResource(object):
+    # Number of bytes fetched from the storage for `preview`. None means the whole object.
+    PREVIEW_SIZE = 1024 ** 2    # 1 MB
+    # Resource can be passed through a named pipe, i.e. `prepare_input` and `postprocess_output` do not access the file
+    STREAMABLE = True
+    # Resource consists of members that can be fetched separately, see `patterns` of `download_input`
+    PARTIAL = False
+    # Input file can share the stored object. Set to False if `prepare_input` or the operation modifies the file
+    ALLOW_LINK = True
+
     def __init__(self):
         pass
 
+    @classmethod
+    def download_input(cls, resource_id, filename, allow_symlink=True, patterns=None):
+        """Make the resource available as `filename` before `prepare_input`.
+
+        Args:
+            resource_id     (str):                  Resource ID
+            filename        (str):                  Destination path
+            allow_symlink   (bool):                 Allow `filename` to be a symbolic link
+            patterns        (list of str, None):    Fetch only the members matching the glob patterns, if `PARTIAL`
+        """
+        materialize_file(resource_id, filename, allow_symlink=allow_symlink, allow_link=cls.ALLOW_LINK)
+
+    @staticmethod
+    def upload_output(filename, metadata=None):
+        """Upload the output returned by `postprocess_output`.
+
+        Return:
+            (str)   Resource ID
+        """
+        with open(filename, 'rb') as f:
+            return upload_file_stream(f, metadata=metadata)
+
     @staticmethod
     def prepare_input(filename, preview=False):
         return {NodeResources.INPUT: filename}
@@ -33,6 +65,7 @@ class BaseResource(object):
 
     @classmethod
     def preview(cls, preview_object):
-        preview_object.fp.truncate(1024 ** 2)  # 1 MB
+        if cls.PREVIEW_SIZE is not None:
+            preview_object.fp.truncate(cls.PREVIEW_SIZE)
         # TODO escape html code for security reasons
         return '<pre>{}</pre>'.format(_force_decode(preview_object.fp.read()))
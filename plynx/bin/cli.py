@@ -7,6 +7,8 @@ from plynx.service.worker import run_worker
 from plynx.service.users import run_users
 from plynx.service.cache import run_cache
 from plynx.service.execute import run_execute
+from plynx.service.storage import run_storage
+from plynx.service.transfer import run_transfer
 from plynx.utils.logs import set_logging_level
 
 
@@ -41,6 +43,16 @@ def users(args):
     run_users(**args)
 
 
+def storage(args):
+    set_logging_level(args.pop('verbose'))
+    run_storage(**args)
+
+
+def transfer(args):
+    set_logging_level(args.pop('verbose'))
+    run_transfer(**args)
+
+
 def version(args):
     print(__version__)
 
@@ -173,6 +185,12 @@ class CLIFactory(object):
             "Do not prompt to confirm reset. Use with care!",
             "store_true",
             default=False),
+        'batch_size': Arg(
+            ("--batch-size", ),
+            help="Number of cached results removed in a single batch",
+            default=1000,
+            type=int,
+            ),
 
         # Execute
         'filename': Arg(
@@ -205,11 +223,19 @@ class CLIFactory(object):
         }, {
             'func': cache,
             'help': "Cache cli utils",
-            'args': ('verbose', 'mode', 'start_datetime', 'end_datetime', 'yes'),
+            'args': ('verbose', 'mode', 'start_datetime', 'end_datetime', 'yes', 'batch_size'),
+        }, {
+            'func': storage,
+            'help': "Storage cli utils",
+            'args': ('verbose', 'mode', 'storage_scheme', 'storage_prefix'),
         }, {
             'func': execute,
             'help': "Execute single node",
             'args': ('verbose', 'filename', 'storage_prefix'),
+        }, {
+            'func': transfer,
+            'help': "Transfer the inputs and the outputs of a job in a kubernetes pod",
+            'args': ('verbose', 'mode', 'filename'),
         },
     )
 
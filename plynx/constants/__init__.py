@@ -1,7 +1,7 @@
 # flake8: noqa
 from plynx.constants.collections import Collections
 from plynx.constants.node_enums import NodeRunningStatus, NodeStatus, \
-    NodePostAction, NodePostStatus, NodeClonePolicy, NodeVirtualCollection, SpecialNodeId
+    NodePostAction, NodePostStatus, NodeClonePolicy, NodeVirtualCollection, SpecialNodeId, RunPhase
 from plynx.constants.parameter_types import ParameterTypes
 from plynx.constants.resource_enums import NodeResources
 from plynx.constants.validation_enums import ValidationTargetType, ValidationCode
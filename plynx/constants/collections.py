@@ -1,6 +1,8 @@
 class Collections:
     GROUPS = 'groups'
     NODE_CACHE = 'node_cache'
+    RESOURCE_BLOBS = 'resource_blobs'
+    RESOURCES = 'resources'
     RUN_CANCELLATIONS = 'run_cancellations'
     RUNS = 'runs'
     TEMPLATES = 'templates'
@@ -76,6 +76,16 @@ class NodeClonePolicy:
     RUN_TO_NODE = 2
 
 
+class RunPhase:
+    """Phases of the run recorded in `Node.timings`."""
+    QUEUE = 'queue'
+    INPUTS = 'inputs'
+    RENDER = 'render'
+    EXEC = 'exec'
+    OUTPUTS = 'outputs'
+    LOGS = 'logs'
+
+
 class NodeVirtualCollection:
     OPERATIONS = 'operations'
     WORKFLOWS = 'workflows'
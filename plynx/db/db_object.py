@@ -8,6 +8,8 @@ from plynx.utils.common import ObjectId
 
 DBObjectField = namedtuple('DBObjectField', ['type', 'default', 'is_list'])
 
+_object_setattr = object.__setattr__
+
 _registry = {}
 
 
@@ -37,8 +39,13 @@ class _DBObject(object):
         obj_dict    (dict, None):   Representation of the object. If None, an object with default fields will be created.
     """
 
+    # The slots are generated by `Meta`
+    __slots__ = ()
+
     # Describe all the fields in the Object
     FIELDS = {}
+    # Attributes stored in the slots in addition to `FIELDS`
+    EXTRA_SLOTS = ()
     # Name of the collection in the database
     DB_COLLECTION = ''
 
@@ -50,8 +57,8 @@ class _DBObject(object):
         return self._dirty
 
     def __setattr__(self, key, value):
-        self.__dict__['_dirty'] = True
-        self.__dict__[key] = value
+        _object_setattr(self, '_dirty', True)
+        _object_setattr(self, key, value)
 
     def __init_fields(self, obj_dict):
         obj_dict = obj_dict or {}
@@ -67,7 +74,8 @@ class _DBObject(object):
             else:
                 # Use default value
                 value = object_field.default() if callable(object_field.default) else object_field.default
-            setattr(self, field_name, value)
+            # the object is marked as dirty by `__init__`
+            _object_setattr(self, field_name, value)
 
     @classmethod
     def load(cls, _id, collection=None):
@@ -156,7 +164,7 @@ class _DBObject(object):
     def __str__(self):
         return '{cls_name}({value})'.format(
             cls_name=self.__class__.__name__,
-            value=self.__dict__.get('_id', str(self.to_dict()))
+            value=getattr(self, '_id') if '_id' in self.FIELDS else str(self.to_dict())
         )
 
     def __repr__(self):
@@ -167,11 +175,28 @@ class _DBObject(object):
 
 
 class Meta(type):
+    """Register the class and generate `__slots__` from `FIELDS` and `EXTRA_SLOTS`.
+
+    The objects do not have `__dict__` unless an attribute outside of the slots is set.
+    """
+
     def __new__(meta, name, bases, class_dict):
+        if '__slots__' not in class_dict:
+            inherited = set()
+            for base in bases:
+                for klass in base.__mro__:
+                    inherited.update(klass.__dict__.get('__slots__', ()))
+            names = list(class_dict.get('FIELDS', {})) + list(class_dict.get('EXTRA_SLOTS', ()))
+            if '__dict__' not in inherited:
+                names.append('__dict__')
+            # class attributes with the same names cannot be slots
+            class_dict['__slots__'] = tuple(sorted(
+                slot_name for slot_name in set(names) if slot_name not in inherited and slot_name not in class_dict
+            ))
         cls = type.__new__(meta, name, bases, class_dict)
         register_class(cls)
         return cls
 
 
 class DBObject(_DBObject, metaclass=Meta):
-    pass
+    EXTRA_SLOTS = ('_dirty',)
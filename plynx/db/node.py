@@ -33,6 +33,8 @@ def _clone_update_in_place(node, node_clone_policy):
         return node
     node.node_running_status = NodeRunningStatus.READY
     node.node_status = NodeStatus.CREATED
+    node.timings = {}
+    node.rusage = {}
 
     sub_nodes = node.get_parameter_by_name('_nodes', throw=False)
     if sub_nodes:
@@ -219,6 +221,18 @@ class Node(DBObject):
             default=list,
             is_list=True,
             ),
+        # Resource usage of the process: `user_time`, `system_time`, `max_rss`, etc.
+        'rusage': DBObjectField(
+            type=dict,
+            default=dict,
+            is_list=False,
+            ),
+        # Phases of the run: `{<phase>: {'start': <unix time>, 'duration': <seconds>}}`, see `RunPhase`
+        'timings': DBObjectField(
+            type=dict,
+            default=dict,
+            is_list=False,
+            ),
         'node_running_status': DBObjectField(
             type=str,
             default=NodeRunningStatus.CREATED,
@@ -258,6 +272,15 @@ class Node(DBObject):
 
     DB_COLLECTION = Collections.TEMPLATES
 
+    # Fields with the elements looked up by name, see `_get_custom_element`
+    _INDEXED_FIELDS = frozenset(['inputs', 'outputs', 'parameters', 'logs'])
+    EXTRA_SLOTS = ('_indexes',)
+
+    def __init__(self, obj_dict=None):
+        # cached name to position indexes of `_INDEXED_FIELDS`
+        object.__setattr__(self, '_indexes', {})
+        super(Node, self).__init__(obj_dict)
+
     def _DEFAULT_LOG(name):
         return Output.from_dict({
             'name': name,
@@ -306,10 +329,27 @@ class Node(DBObject):
     def __repr__(self):
         return 'Node({})'.format(str(self.to_dict()))
 
-    def _get_custom_element(self, arr, name, throw, default=None):
-        for parameter in arr:
-            if parameter.name == name:
-                return parameter
+    def __setattr__(self, key, value):
+        if key in Node._INDEXED_FIELDS:
+            self._indexes.pop(key, None)
+        super(Node, self).__setattr__(key, value)
+
+    def _get_custom_element(self, field_name, name, throw, default=None):
+        arr = getattr(self, field_name)
+        index = self._indexes.get(field_name)
+        # the lists can be appended to in place
+        if index is None or index[0] != len(arr):
+            # the first element wins in case of duplicate names
+            index = (len(arr), {arr[position].name: position for position in range(len(arr) - 1, -1, -1)})
+            self._indexes[field_name] = index
+        position = index[1].get(name)
+        # the elements could have been renamed or replaced in place
+        if position is not None and arr[position].name == name:
+            return arr[position]
+        for element in arr:
+            if element.name == name:
+                del self._indexes[field_name]
+                return element
         if throw:
             raise Exception('Parameter "{}" not found in {}'.format(name, self.title))
         if default:
@@ -318,16 +358,16 @@ class Node(DBObject):
         return None
 
     def get_input_by_name(self, name, throw=True):
-        return self._get_custom_element(self.inputs, name, throw)
+        return self._get_custom_element('inputs', name, throw)
 
     def get_parameter_by_name(self, name, throw=True):
-        return self._get_custom_element(self.parameters, name, throw)
+        return self._get_custom_element('parameters', name, throw)
 
     def get_output_by_name(self, name, throw=True):
-        return self._get_custom_element(self.outputs, name, throw)
+        return self._get_custom_element('outputs', name, throw)
 
     def get_log_by_name(self, name, throw=False):
-        return self._get_custom_element(self.logs, name, throw, default=Node._DEFAULT_LOG)
+        return self._get_custom_element('logs', name, throw, default=Node._DEFAULT_LOG)
 
     def arrange_auto_layout(self, readonly=False):
         """Use heuristic to rearange nodes."""
@@ -47,7 +47,7 @@ class NodeCache(DBObject):
 
     DB_COLLECTION = Collections.NODE_CACHE
 
-    IGNORED_PARAMETERS = {'cmd', '_timeout'}
+    IGNORED_PARAMETERS = {'cmd', '_timeout', '_max_run_seconds'}
 
     @staticmethod
     def instantiate(node, run_id):
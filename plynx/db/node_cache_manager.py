@@ -94,8 +94,20 @@ class NodeCacheManager(object):
         """
         return get_db_connector().node_cache.find(NodeCacheManager._make_query(start_datetime, end_datetime, non_protected_only))
 
+    @staticmethod
+    def mark_removed(node_cache_ids):
+        """Set flag `removed` to NodeCache objects
+
+        Args:
+            node_cache_ids  (list of ObjectId): NodeCache IDs
+        """
+        return get_db_connector().node_cache.update_many(
+            {'_id': {'$in': list(node_cache_ids)}},
+            {'$set': {'removed': True}},
+        )
+
     @staticmethod
     def clean_up():
         """Remove NodeCache objects with flag `removed` set
         """
-        return get_db_connector().node_cache.remove({'removed': True})
+        return get_db_connector().node_cache.delete_many({'removed': True})
@@ -6,7 +6,7 @@ from plynx.constants import NodeRunningStatus, Collections, NodeStatus
 from plynx.utils.common import to_object_id, parse_search_string
 from plynx.utils.db_connector import get_db_connector
 
-_PROPERTIES_TO_GET_FROM_SUBS = ['node_running_status', 'logs', 'outputs', 'cache_url']
+_PROPERTIES_TO_GET_FROM_SUBS = ['node_running_status', 'logs', 'outputs', 'cache_url', 'timings', 'rusage']
 
 
 class NodeCollectionManager(object):
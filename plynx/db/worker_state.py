@@ -34,6 +34,19 @@ class WorkerState(DBObject):
             default=list,
             is_list=True,
             ),
+        # run id to the recent part of its logs, see `BaseExecutor.get_log_tails`.
+        # Not returned by `get_worker_states`: the access to the logs is checked by `/logs/<run_id>/<log_name>`
+        'log_tails': DBObjectField(
+            type=dict,
+            default=dict,
+            is_list=False,
+            ),
+        # counters of `plynx.utils.template.TemplateCache`
+        'template_cache': DBObjectField(
+            type=dict,
+            default=dict,
+            is_list=False,
+            ),
     }
 
     DB_COLLECTION = Collections.WORKER_STATE
@@ -41,7 +54,7 @@ class WorkerState(DBObject):
 
 def get_worker_states():
     states = getattr(get_db_connector(), Collections.WORKER_STATE)\
-           .find({}).sort('insertion_date', -1)
+           .find({}, {'log_tails': 0}).sort('insertion_date', -1)
 
     unique_worker_states = {}
     for state in states:
@@ -50,3 +63,20 @@ def get_worker_states():
         unique_worker_states[state['worker_id']] = state
 
     return list(sorted(unique_worker_states.values(), key=lambda state: state['worker_id']))
+
+
+def get_live_log_tail(run_id, log_name):
+    """Get the recent part of the log of the run published by its worker.
+
+    Return:
+        (str, None)     Text of the log, None if no worker has published it
+    """
+    key = 'log_tails.{}.{}'.format(run_id, log_name)
+    state = getattr(get_db_connector(), Collections.WORKER_STATE).find_one(
+        {key: {'$exists': True}},
+        {key: 1},
+        sort=[('insertion_date', -1)],
+    )
+    if not state:
+        return None
+    return state['log_tails'][str(run_id)][log_name]
@@ -4,7 +4,8 @@ from collections import defaultdict
 from plynx.constants import ParameterTypes
 from plynx.db.node import Node, Parameter
 from plynx.db.validation_error import ValidationError
-from plynx.constants import NodeRunningStatus, ValidationTargetType, ValidationCode, SpecialNodeId, Collections
+from plynx.constants import NodeRunningStatus, ValidationTargetType, ValidationCode, SpecialNodeId, Collections, \
+    RunPhase
 from plynx.utils.common import to_object_id
 import plynx.base.executor
 import plynx.utils.executor
@@ -179,6 +180,8 @@ class DAG(plynx.base.executor.BaseExecutor):
         dest_node.logs = node.logs
         dest_node.outputs = node.outputs
         dest_node.cache_url = node.cache_url
+        dest_node.rusage = node.rusage
+        dest_node.timings = node.timings
 
     def _set_node_status(self, node_id, node_running_status):
         node = self.node_id_to_node[node_id]
@@ -234,9 +237,9 @@ class DAG(plynx.base.executor.BaseExecutor):
             )
         node.parameters.append(
             Parameter.from_dict({
-                'name': '_timeout',
+                'name': '_max_run_seconds',
                 'parameter_type': ParameterTypes.INT,
-                'value': 600,
+                'value': 0,
                 'mutable_type': False,
                 'publicable': True,
                 'removable': False
@@ -249,12 +252,27 @@ class DAG(plynx.base.executor.BaseExecutor):
         if NodeRunningStatus.is_finished(node.node_running_status):     # NodeRunningStatus.SPECIAL
             return
         node.author = self.node.author                                  # Change it to the author that runs it
+        node.timings[RunPhase.QUEUE] = {'start': time.time()}
         node.save(collection=Collections.RUNS)
 
         self.monitoring_node_ids.add(node._id)
 
+    def _check_timeout(self, start_time, timeout):
+        """Cancel the running nodes and fail the graph if it has been running longer than `_max_run_seconds`."""
+        if timeout is None or NodeRunningStatus.is_failed(self._node_running_status):
+            return
+        if time.monotonic() - start_time <= timeout:
+            return
+        logging.error('DAG `{}` exceeded timeout of {} seconds, canceling the running nodes'.format(self.node._id, timeout))
+        self.kill()
+        # wait for the running nodes to stop and set status to FAILED
+        self._node_running_status = NodeRunningStatus.FAILED_WAITING
+
     def run(self):
+        start_time = time.monotonic()
+        timeout = self.get_timeout()
         while not self.finished():
+            self._check_timeout(start_time, timeout)
             new_jobs = self.pop_jobs()
             if len(new_jobs) == 0:
                 time.sleep(_GRAPH_ITERATION_SLEEP)
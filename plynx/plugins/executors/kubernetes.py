@@ -1,24 +1,47 @@
-from subprocess import Popen
 import os
+import json
 import time
 import uuid
-import shutil
+import queue
+import atexit
 import string
 import random
 import logging
+import threading
 import collections
 import kubernetes
 from enum import Enum
-from plynx.constants import NodeRunningStatus, ParameterTypes
+from plynx.constants import NodeRunningStatus, ParameterTypes, NodeResources
 from plynx.db.node import Parameter, Output
 import plynx.plugins.executors.local as local
 from plynx.plugins.resources.common import FILE_KIND
+from plynx.utils import k8s
+from plynx.utils.config import get_pod_pool_config, get_direct_transfer_config, get_worker_config
 
 NAMESPACE = 'plynx-worker'
 SCHEDULING_RETRY = 30
-
-KUBECTL_RETURN_CODES = {
-    137: 'Pod was not found: plese check `_timeout` parameter and/or `k8s_worker` logs',
+# The pods are labeled with the ID of the worker process, see `get_pod_watcher`
+WORKER_LABEL = 'plynx-worker'
+WORKER_LABEL_VALUE = uuid.uuid4().hex
+
+# Direct transfer: the inputs and the outputs are transferred by the helper container of the pod, see `plynx transfer`
+DIRECT_TRANSFER_CONFIG = get_direct_transfer_config()
+TRANSFER_CONTAINER = 'plynx-transfer'
+TRANSFER_SPEC_NAME = 'transfer.json'
+# Output name to the resource ID written by `plynx transfer --mode upload`
+TRANSFER_RESULT_NAME = 'transfer_result.json'
+_WORKDIRS_VOLUME = 'workdirs'
+_CONFIG_VOLUME = 'plynx-config'
+_CONFIG_DIR = '/etc/plynx'
+
+# The pod of a job runs `sleep <lifetime>`, so that it does not outlive a crashed worker for long.
+# The lifetime is a multiple of `_max_run_seconds`, because the transfers of the job do not count towards it.
+POD_LIFETIME_FACTOR = 60
+# Lifetime of the pods of the jobs without `_max_run_seconds`, in seconds
+DEFAULT_POD_LIFETIME = 10 * 60 * 60
+
+EXEC_RETURN_CODES = {
+    137: 'Process was killed: plese check `_max_run_seconds` parameter and/or `k8s_worker` logs',
 }
 
 KeyValue = collections.namedtuple('KeyValue', ['name', 'default', 'type'])
@@ -33,6 +56,10 @@ class KeyConstants(Enum):
     SCHEDULING_RETRY = KeyValue('_scheduling_retry', 30, ParameterTypes.INT)
 
 
+# Parameters of the pods that are interchangeable in the pool
+POD_KEY = (KeyConstants.IMAGE, KeyConstants.CPU, KeyConstants.MEMORY, KeyConstants.GPU)
+
+
 def gen_rand(length=8):
     letters = string.ascii_lowercase
     return ''.join(random.choice(letters) for i in range(length))
@@ -98,22 +125,35 @@ def get_api_instance():
     return _api_instance
 
 
-def wait_and_check_return_status(sp):
-    returncode = sp.wait()
-
+def check_return_code(returncode):
     if returncode == 0:
         return
-    if returncode in KUBECTL_RETURN_CODES:
-        raise Exception(KUBECTL_RETURN_CODES[returncode])
+    if returncode in EXEC_RETURN_CODES:
+        raise Exception(EXEC_RETURN_CODES[returncode])
     raise Exception('Error: unexpected return code `{}`. Please check the logs for details.'.format(returncode))
 
 
-def create_kubernetes_body(node_param_dict, job_name, workdir):
+def _get_pod_lifetime(timeout):
+    """Get the lifetime of the pod of a job in seconds.
+
+    Args:
+        timeout     (int, None):    `_max_run_seconds` of the job
+    """
+    if timeout is None:
+        return DEFAULT_POD_LIFETIME
+    return timeout * POD_LIFETIME_FACTOR
+
+
+def create_kubernetes_body(node_param_dict, job_name, lifetime):
     container_image = _extract_param_value(node_param_dict, KeyConstants.IMAGE)
     ENV_LIST = []
 
     body = kubernetes.client.V1Pod(api_version="v1", kind="Pod")
-    body.metadata = kubernetes.client.V1ObjectMeta(namespace=NAMESPACE, name=job_name)
+    body.metadata = kubernetes.client.V1ObjectMeta(
+        namespace=NAMESPACE,
+        name=job_name,
+        labels={WORKER_LABEL: WORKER_LABEL_VALUE},
+    )
     body.status = kubernetes.client.V1PodStatus()
 
     # Now we start with the Template...
@@ -124,7 +164,7 @@ def create_kubernetes_body(node_param_dict, job_name, workdir):
         name=job_name,
         image=container_image,
         env=ENV_LIST,
-        command=['sleep', str(node_param_dict.get('_timeout', 600) * 60)],
+        command=['sleep', str(lifetime)],
         resources=kubernetes.client.V1ResourceRequirements(
             requests={
                 'memory': _extract_param_value(node_param_dict, KeyConstants.MEMORY),
@@ -138,47 +178,349 @@ def create_kubernetes_body(node_param_dict, job_name, workdir):
             },
         ),
     )
+    containers = [container]
+    volumes = []
+    if DIRECT_TRANSFER_CONFIG.enabled:
+        # the containers share the workdirs, the paths are the same as on the worker
+        workdir_mounts = [
+            kubernetes.client.V1VolumeMount(name=_WORKDIRS_VOLUME, mount_path=scratch_root.path)
+            for scratch_root in get_worker_config().scratch_roots
+        ]
+        container.volume_mounts = workdir_mounts
+        containers.append(kubernetes.client.V1Container(
+            name=TRANSFER_CONTAINER,
+            image=DIRECT_TRANSFER_CONFIG.image,
+            env=[kubernetes.client.V1EnvVar(name='PLYNX_CONFIG_PATH', value=os.path.join(_CONFIG_DIR, 'config.yaml'))],
+            command=container.command,
+            volume_mounts=workdir_mounts + [
+                kubernetes.client.V1VolumeMount(name=_CONFIG_VOLUME, mount_path=_CONFIG_DIR, read_only=True),
+            ],
+        ))
+        volumes = [
+            kubernetes.client.V1Volume(name=_WORKDIRS_VOLUME, empty_dir=kubernetes.client.V1EmptyDirVolumeSource()),
+            kubernetes.client.V1Volume(
+                name=_CONFIG_VOLUME,
+                config_map=kubernetes.client.V1ConfigMapVolumeSource(name=DIRECT_TRANSFER_CONFIG.config_map),
+            ),
+        ]
+
     template.template.spec = kubernetes.client.V1PodSpec(
-        containers=[container],
+        containers=containers,
+        volumes=volumes,
         restart_policy='Never',
         )
     # And finaly we can create our V1JobSpec!
     body.spec = kubernetes.client.V1PodSpec(
-        containers=[container],
+        containers=containers,
+        volumes=volumes,
         restart_policy='Never',
         )
 
     return body
 
 
-def delete_pod(job_name, log_stream):
-    logging.info("Deleting pod")
-    sp = Popen(
-        [
-            'kubectl', 'delete', 'pod',
-            '--namespace', NAMESPACE,
-            '--grace-period=0',
-            job_name
-        ],
-        stdout=log_stream,
-        stderr=log_stream,
-    )
-    wait_and_check_return_status(sp)
+_pod_watcher = None
+_pod_watcher_lock = threading.Lock()
+
+
+def get_pod_watcher():
+    """Get the watch of the pods of the worker process shared by the jobs."""
+    global _pod_watcher
+    with _pod_watcher_lock:
+        if _pod_watcher is None:
+            _pod_watcher = k8s.PodWatcher(
+                get_api_instance(),
+                NAMESPACE,
+                '{}={}'.format(WORKER_LABEL, WORKER_LABEL_VALUE),
+            )
+            _pod_watcher.start()
+        return _pod_watcher
+
+
+def wait_for_pod(job_name, param_dict, write_log, events):
+    """Wait until the pod is running.
+
+    Args:
+        job_name    (str):          Name of the pod
+        param_dict  (dict):         Parameters of the node
+        write_log   (function):     Callable `(str) -> None`
+        events      (queue.Queue):  Events of the pod, see `PodWatcher.subscribe`
+    """
+    # the pod is given `_scheduling_retry` seconds to be scheduled once it is reported as unschedulable
+    unschedulable_deadline = None
+    unschedulable_message = None
+    while True:
+        timeout = None
+        if unschedulable_deadline is not None:
+            timeout = max(0, unschedulable_deadline - time.time())
+        try:
+            event_type, pod = events.get(timeout=timeout)
+        except queue.Empty:
+            raise Exception(unschedulable_message)
+        if event_type == 'DELETED':
+            raise Exception('Pod `{}` has been deleted'.format(job_name))
+
+        phase = pod.status.phase
+        write_log('Pod `{}` in `{}` status\n'.format(job_name, phase))
+        if phase == KubernetesStatusPhase.PENDING:
+            for condition in pod.status.conditions or []:
+                if condition.reason == 'Unschedulable' and unschedulable_deadline is None:
+                    scheduling_retry = param_dict.get('_scheduling_retry', SCHEDULING_RETRY)
+                    write_log('Pod is unschedulable, waiting for {} seconds\n'.format(scheduling_retry))
+                    unschedulable_deadline = time.time() + scheduling_retry
+                    unschedulable_message = condition.message
+        elif phase == KubernetesStatusPhase.RUNNING:
+            return
+        elif phase in (KubernetesStatusPhase.SUCCEEDED, KubernetesStatusPhase.FAILED):
+            raise Exception("Kubernetes pod failed")
+        elif phase == KubernetesStatusPhase.UNKNOWN:
+            raise Exception("Kubernetes pod is unknown")
+        else:
+            raise Exception("Unknown Kubernetes pod phase: `{}`".format(phase))
+
+
+def create_pod(param_dict, write_log, lifetime):
+    """Create a pod and wait until it is running.
+
+    Return:
+        (str)   Name of the pod
+    """
+    job_name = gen_rand_name()
+    body = create_kubernetes_body(param_dict, job_name, lifetime=lifetime)
+    pod_watcher = get_pod_watcher()
+    events = pod_watcher.subscribe(job_name)
+    try:
+        api_response = get_api_instance().create_namespaced_pod(NAMESPACE, body, pretty=True)
+        logging.info(api_response)
+        try:
+            wait_for_pod(job_name, param_dict, write_log, events)
+        except Exception:
+            write_log('Removing pod `{}`\n'.format(job_name))
+            _delete_pod_quietly(job_name)
+            raise
+    finally:
+        pod_watcher.unsubscribe(job_name)
+    return job_name
+
+
+def _delete_pod_quietly(job_name):
+    try:
+        k8s.delete_pod(get_api_instance(), NAMESPACE, job_name)
+    except Exception:
+        logging.exception('Failed to delete pod `{}`'.format(job_name))
+
+
+def get_pod_key(param_dict):
+    return tuple(_extract_param_value(param_dict, e) for e in POD_KEY)
+
+
+def _create_pooled_pod(key, lifetime):
+    param_dict = {e.value.name: value for e, value in zip(POD_KEY, key)}
+    return create_pod(param_dict, logging.info, lifetime=lifetime)
+
+
+_pod_pool = None
+_pod_pool_lock = threading.Lock()
+
+
+def get_pod_pool():
+    """Get the pool of the pods shared by the jobs of the worker.
+
+    Return:
+        (PodPool, None)     None if the pool is disabled
+    """
+    global _pod_pool
+    with _pod_pool_lock:
+        if _pod_pool is None:
+            config = get_pod_pool_config()
+            if not config.enabled:
+                return None
+            _pod_pool = k8s.PodPool(
+                min_size=config.min_size,
+                max_size=config.max_size,
+                idle_ttl=config.idle_ttl,
+                lifetime=config.lifetime,
+                create_pod=_create_pooled_pod,
+                delete_pod=_delete_pod_quietly,
+            )
+            _pod_pool.start()
+            atexit.register(_pod_pool.close)
+        return _pod_pool
 
 
 def _init(self):
     self.job_name = None
+    # `job_name` is cleared before the pod is released or deleted, so that `kill` never deletes a pod of another job
+    self._job_lock = threading.Lock()
+    self._transfer_spec = {'inputs': [], 'outputs': []}
+
+
+def _run_in_pod(self, script_location, param_dict, k8s_worker_log_file):
+    direct_transfer = DIRECT_TRANSFER_CONFIG.enabled
+    if direct_transfer:
+        self._transfer_spec['result_filename'] = os.path.join(self.workdir, TRANSFER_RESULT_NAME)
+        with open(os.path.join(self.workdir, TRANSFER_SPEC_NAME), 'w') as f:
+            json.dump(self._transfer_spec, f)
+
+    with open(self.logs['stdout'], 'wb', buffering=0) as stdout_file, open(self.logs['stderr'], 'wb', buffering=0) as stderr_file:
+        k8s_worker_log_file.write('Uploading artifacts...\n')
+        k8s_worker_log_file.flush()
+        check_return_code(k8s.copy_to_pod(
+            get_api_instance(), NAMESPACE, self.job_name, self.workdir, self.workdir,
+            write_log=k8s_worker_log_file.write,
+            container=TRANSFER_CONTAINER if direct_transfer else self.job_name,
+        ))
+
+        if direct_transfer:
+            k8s_worker_log_file.write('Downloading inputs in the pod...\n')
+            k8s_worker_log_file.flush()
+            check_return_code(_exec_transfer(self, 'download', k8s_worker_log_file))
+
+        k8s_worker_log_file.write('Running script...\n')
+        k8s_worker_log_file.flush()
+        job_name = self.job_name
+        timeout = self.get_timeout()
+        timed_out = threading.Event()
+
+        def delete_on_timeout():
+            with self._job_lock:
+                if self.job_name != job_name:
+                    return
+                timed_out.set()
+                _delete_pod_quietly(job_name)
+
+        # deleting the pod stops the script and the exec
+        timer = threading.Timer(timeout, delete_on_timeout) if timeout else None
+        if timer:
+            timer.daemon = True
+            timer.start()
+        try:
+            returncode = k8s.exec_in_pod(
+                get_api_instance(), NAMESPACE, job_name,
+                [_extract_param_value(param_dict, KeyConstants.IMAGE_COMMAND), script_location],
+                write_stdout=lambda data: stdout_file.write(data.encode('utf-8')),
+                write_stderr=lambda data: stderr_file.write(data.encode('utf-8')),
+                container=job_name,
+            )
+        except Exception:
+            if not timed_out.is_set():
+                raise
+        finally:
+            if timer:
+                timer.cancel()
+        if timed_out.is_set():
+            raise Exception('Timeout of {} seconds exceeded, pod `{}` has been deleted'.format(timeout, job_name))
+        check_return_code(returncode)
+
+    if direct_transfer:
+        k8s_worker_log_file.write('Uploading outputs in the pod...\n')
+        k8s_worker_log_file.flush()
+        check_return_code(_exec_transfer(self, 'upload', k8s_worker_log_file))
+        result_filename = self._transfer_spec['result_filename']
+        check_return_code(k8s.copy_from_pod(
+            get_api_instance(), NAMESPACE, self.job_name, [result_filename], self.workdir,
+            write_log=k8s_worker_log_file.write,
+            container=TRANSFER_CONTAINER,
+        ))
+        with open(result_filename) as f:
+            output_to_resource_id = json.load(f)
+        for output_name, resource_id in output_to_resource_id.items():
+            self.node.get_output_by_name(output_name).values = [resource_id]
+        return
+
+    k8s_worker_log_file.write('Downloading artifacts...\n')
+    k8s_worker_log_file.flush()
+    filenames = list(self.output_to_filename.values())
+    if filenames:
+        check_return_code(k8s.copy_from_pod(
+            get_api_instance(), NAMESPACE, self.job_name, filenames, self.workdir,
+            write_log=k8s_worker_log_file.write,
+            container=self.job_name,
+        ))
+
+
+def _exec_transfer(self, mode, k8s_worker_log_file):
+    return k8s.exec_in_pod(
+        get_api_instance(), NAMESPACE, self.job_name,
+        ['plynx', 'transfer', '--mode', mode, '--filename', os.path.join(self.workdir, TRANSFER_SPEC_NAME)],
+        write_stdout=k8s_worker_log_file.write,
+        write_stderr=k8s_worker_log_file.write,
+        container=TRANSFER_CONTAINER,
+    )
+
+
+def _prepare_remote_inputs(self):
+    """Make the paths of the inputs, the inputs are downloaded in the pod."""
+    resource_merger = local.ResourceMerger(
+        [NodeResources.INPUT],
+        [input.name for input in self.node.inputs if input.is_array],
+    )
+    partial_input_patterns = self._get_partial_input_patterns()
+    for input in self.node.inputs:
+        resource_class = self._resource_manager.kind_to_resource_class[input.file_type]
+        for i, value in enumerate(input.values):
+            filename = os.path.join(self.workdir, 'i_{}_{}'.format(i, input.name))
+            self._transfer_spec['inputs'].append({
+                'resource_id': value,
+                'filename': filename,
+                'file_type': input.file_type,
+                'patterns': partial_input_patterns.get(input.name),
+            })
+            # `preview` does not access the file
+            resource_merger.append(resource_class.prepare_input(filename, preview=True), input.name, input.is_array)
+    return resource_merger.get_dict()
+
+
+def _prepare_remote_outputs(self):
+    """Make the paths of the outputs, the outputs are prepared and uploaded in the pod."""
+    resource_merger = local.ResourceMerger(
+        [NodeResources.OUTPUT],
+        [output.name for output in self.node.outputs if output.is_array],
+    )
+    for output in self.node.outputs:
+        filename = os.path.join(self.workdir, 'o_{}'.format(output.name))
+        self.output_to_filename[output.name] = filename
+        self._transfer_spec['outputs'].append({
+            'name': output.name,
+            'filename': filename,
+            'file_type': output.file_type,
+            'metadata': self._get_resource_metadata(output.file_type),
+        })
+        resource_merger.append(
+            self._resource_manager.kind_to_resource_class[output.file_type].prepare_output(filename, preview=True),
+            output.name,
+            is_list=False,
+        )
+    return resource_merger.get_dict()
+
+
+def _wipe_workdir(self, k8s_worker_log_file):
+    """Remove the workdir in the pod, so that the pod can be reused.
+
+    Return:
+        (bool)  True if the workdir has been removed
+    """
+    k8s_worker_log_file.write('Removing the working directory in pod `{}`\n'.format(self.job_name))
+    try:
+        return k8s.exec_in_pod(
+            get_api_instance(), NAMESPACE, self.job_name,
+            ['rm', '-rf', self.workdir],
+            write_stdout=k8s_worker_log_file.write,
+            write_stderr=k8s_worker_log_file.write,
+            container=self.job_name,
+        ) == 0
+    except Exception:
+        logging.exception('Failed to remove the working directory')
+        return False
 
 
 def _exec_script(self, script_location):
     self._node_running_status = NodeRunningStatus.FAILED
+    pod_pool = get_pod_pool()
+    pod = None
 
     try:
         param_dict = get_param_dict(self.node)
-        self.job_name = gen_rand_name()
-        body = create_kubernetes_body(param_dict, self.job_name, self.workdir)
-        api_response = get_api_instance().create_namespaced_pod(NAMESPACE, body, pretty=True)
-        logging.info(api_response)
 
         # append running script to worker log
         with open(script_location, 'r') as sf, open(self.logs['worker'], 'a') as wf:
@@ -187,119 +529,40 @@ def _exec_script(self, script_location):
             wf.write('\n')
             wf.write(self._make_debug_text("End script"))
 
-        stream = kubernetes.watch.Watch().stream(
-            func=get_api_instance().list_namespaced_pod,
-            namespace=NAMESPACE,
-            field_selector="metadata.name={}".format(self.job_name)
-            )
-        second_time_running = False
-        with open(self.logs['stdout'], 'wb', buffering=0) as stdout_file, open(self.logs['stderr'], 'wb', buffering=0) as stderr_file:
-            for event in stream:
-                phase = event["object"].status.phase
-                with open(self.logs['k8s_worker'], 'a+') as k8s_worker_log_file:
-                    k8s_worker_log_file.write(
-                        'Pod `{}` in `{}` status\n'.format(self.job_name, phase)
-                        )
-                    if phase == KubernetesStatusPhase.PENDING:
-                        # for some reason pod sometimes gets back to this state
-                        if second_time_running:
-                            break
-                        if not event['object'].status.conditions:
-                            continue
-                        for condition in event['object'].status.conditions:
-                            if condition.reason == 'Unschedulable':
-                                scheduled = False
-                                for ii in range(param_dict.get('_scheduling_retry', SCHEDULING_RETRY)):
-                                    time.sleep(1)
-                                    pod_list = get_api_instance().list_namespaced_pod(
-                                        namespace=NAMESPACE,
-                                        field_selector="metadata.name={}".format(self.job_name)
-                                    )
-                                    k8s_worker_log_file.write(
-                                        'Retry scheduling #{}\n'.format(ii)
-                                        )
-                                    if len(pod_list.items) != 1:
-                                        raise Exception('Unexpected number of pods: {}'.format(len(pod_list.items)))
-                                    if pod_list.items[0].status.phase == KubernetesStatusPhase.PENDING:
-                                        continue
-                                    scheduled = True
-                                    break
-                                if not scheduled:
-                                    raise Exception(condition.message)
-                    elif phase == KubernetesStatusPhase.RUNNING:
-                        if second_time_running:
-                            continue
-                        second_time_running = True
-                        k8s_worker_log_file.write('Uploading artifacts...\n')
-                        sp = Popen(
-                            [
-                                'kubectl', 'cp',
-                                '--namespace', NAMESPACE,
-                                self.workdir, '{}:{}'.format(self.job_name, self.workdir)
-                            ],
-                            stdout=k8s_worker_log_file,
-                            stderr=k8s_worker_log_file,
-                            cwd=self.workdir
-                        )
-                        wait_and_check_return_status(sp)
-
-                        k8s_worker_log_file.write('Running script...\n')
-                        sp = Popen(
-                            [
-                                'kubectl', 'exec',
-                                '--namespace', NAMESPACE,
-                                '-it', self.job_name,
-                                '--',
-                                _extract_param_value(param_dict, KeyConstants.IMAGE_COMMAND), script_location
-                            ],
-                            stdout=stdout_file,
-                            stderr=stderr_file,
-                            cwd=self.workdir
-                        )
-                        wait_and_check_return_status(sp)
-
-                        # Hack: absolute path does not work with `kubectl cp`
-                        # solution: download to a local `tmp_dir` directory and move it to `workdir`
-                        tmp_dir = str(uuid.uuid1())
-                        os.mkdir(tmp_dir)
-                        k8s_worker_log_file.write('Downloading artifacts...\n')
-                        for output_name, filename in self.output_to_filename.items():
-                            k8s_worker_log_file.write('Downloading `{}`...\n'.format(output_name))
-                            local_filename = os.path.join(tmp_dir, os.path.basename(filename))
-                            sp = Popen(
-                                [
-                                    'kubectl', 'cp',
-                                    '--namespace', NAMESPACE,
-                                    '{}:{}'.format(self.job_name, filename), local_filename,
-                                ],
-                                stdout=k8s_worker_log_file,
-                                stderr=k8s_worker_log_file,
-                            )
-                            wait_and_check_return_status(sp)
-
-                            if os.path.exists(filename):
-                                if os.path.isfile(filename):
-                                    os.remove(filename)
-                                else:
-                                    shutil.rmtree(filename)
-                            shutil.move(local_filename, filename)
-                        os.rmdir(tmp_dir)
-
-                        delete_pod(self.job_name, k8s_worker_log_file)
+        with open(self.logs['k8s_worker'], 'a+') as k8s_worker_log_file:
+            try:
+                lifetime = _get_pod_lifetime(self.get_timeout())
+                if pod_pool:
+                    pod = pod_pool.acquire(get_pod_key(param_dict), lifetime)
+                    job_name = pod.name
+                    k8s_worker_log_file.write('Using pod `{}` of the pool\n'.format(pod.name))
+                else:
+                    job_name = create_pod(param_dict, k8s_worker_log_file.write, lifetime)
+                with self._job_lock:
+                    self.job_name = job_name
+
+                _run_in_pod(self, script_location, param_dict, k8s_worker_log_file)
+                with self._job_lock:
+                    if self._node_running_status != NodeRunningStatus.CANCELED:
                         self._node_running_status = NodeRunningStatus.SUCCESS
-                    elif phase in (KubernetesStatusPhase.SUCCEEDED, KubernetesStatusPhase.FAILED):
-                        if self._node_running_status == NodeRunningStatus.SUCCESS:
-                            break
-                        k8s_worker_log_file.write('Removing pod `{}`\n'.format(self.job_name))
-                        delete_pod(self.job_name, k8s_worker_log_file)
-                        raise Exception("Kubernetes pod failed")
-                    elif phase == KubernetesStatusPhase.UNKNOWN:
-                        raise Exception("Kubernetes pod is unknown")
-                    else:
-                        raise Exception("Unknown Kubernetes pod phase: `{}`".format(phase))
+            finally:
+                if pod:
+                    wiped = self._node_running_status == NodeRunningStatus.SUCCESS and _wipe_workdir(self, k8s_worker_log_file)
+                    with self._job_lock:
+                        self.job_name = None
+                        # `kill` might have deleted the pod
+                        reusable = wiped and self._node_running_status == NodeRunningStatus.SUCCESS
+                    pod_pool.release(pod, reusable)
+                else:
+                    with self._job_lock:
+                        job_name, self.job_name = self.job_name, None
+                    if job_name:
+                        k8s_worker_log_file.write('Deleting pod `{}`\n'.format(job_name))
+                        _delete_pod_quietly(job_name)
 
     except Exception as e:
-        self._node_running_status = NodeRunningStatus.FAILED
+        if self._node_running_status != NodeRunningStatus.CANCELED:
+            self._node_running_status = NodeRunningStatus.FAILED
         logging.exception("Job failed")
         with open(self.logs['k8s_worker'], 'a+') as k8s_worker_log_file:
             k8s_worker_log_file.write(self._make_debug_text("JOB FAILED"))
@@ -309,14 +572,20 @@ def _exec_script(self, script_location):
 
 
 def _kill(self):
-    if not self.job_name:
-        return
+    with self._job_lock:
+        if not self.job_name:
+            return
 
-    self._node_running_status = NodeRunningStatus.CANCELED
-    delete_pod(self.job_name, None)
+        self._node_running_status = NodeRunningStatus.CANCELED
+        _delete_pod_quietly(self.job_name)
 
 
 class BashJinja2(local.BashJinja2):
+    # the workdir is copied with tar that does not dereference symbolic links and does not support named pipes
+    ALLOW_SYMLINK_INPUTS = False
+    ALLOW_STREAMS = False
+    ALLOW_LOG_PIPES = False
+
     def __init__(self, node=None):
         super(BashJinja2, self).__init__(node)
         _init(self)
@@ -330,6 +599,21 @@ class BashJinja2(local.BashJinja2):
 
         return node
 
+    def _prepare_inputs(self, preview=False):
+        if preview or not DIRECT_TRANSFER_CONFIG.enabled:
+            return super()._prepare_inputs(preview)
+        return _prepare_remote_inputs(self)
+
+    def _prepare_outputs(self, preview=False):
+        if preview or not DIRECT_TRANSFER_CONFIG.enabled:
+            return super()._prepare_outputs(preview)
+        return _prepare_remote_outputs(self)
+
+    def _postprocess_outputs(self, outputs):
+        if not DIRECT_TRANSFER_CONFIG.enabled:
+            return super()._postprocess_outputs(outputs)
+        # the outputs have been uploaded in the pod
+
     def exec_script(self, script_location):
         return _exec_script(self, script_location)
 
@@ -338,6 +622,11 @@ class BashJinja2(local.BashJinja2):
 
 
 class PythonNode(local.PythonNode):
+    # the workdir is copied with tar that does not dereference symbolic links and does not support named pipes
+    ALLOW_SYMLINK_INPUTS = False
+    ALLOW_STREAMS = False
+    ALLOW_LOG_PIPES = False
+
     def __init__(self, node=None):
         super(PythonNode, self).__init__(node)
         _init(self)
@@ -358,6 +647,21 @@ class PythonNode(local.PythonNode):
 
         return node
 
+    def _prepare_inputs(self, preview=False):
+        if preview or not DIRECT_TRANSFER_CONFIG.enabled:
+            return super()._prepare_inputs(preview)
+        return _prepare_remote_inputs(self)
+
+    def _prepare_outputs(self, preview=False):
+        if preview or not DIRECT_TRANSFER_CONFIG.enabled:
+            return super()._prepare_outputs(preview)
+        return _prepare_remote_outputs(self)
+
+    def _postprocess_outputs(self, outputs):
+        if not DIRECT_TRANSFER_CONFIG.enabled:
+            return super()._postprocess_outputs(outputs)
+        # the outputs have been uploaded in the pod
+
     def exec_script(self, script_location):
         return _exec_script(self, script_location)
 
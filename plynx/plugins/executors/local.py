@@ -1,20 +1,29 @@
-from subprocess import Popen
+from subprocess import Popen, PIPE
 import os
+import resource
 import signal
+import time
 import logging
 import threading
-import jinja2
 from past.builtins import basestring
 from collections import defaultdict
-from plynx.constants import NodeRunningStatus, ParameterTypes
+from plynx.constants import NodeRunningStatus, ParameterTypes, RunPhase
 from plynx.db.node import Parameter, Output
-from plynx.utils.file_handler import get_file_stream, upload_file_stream
+from plynx.utils.file_handler import download_file, upload_file_stream, append_file_stream, compact_file, remove
 import plynx.utils.plugin_manager
+from plynx.utils.template import render_template
 from plynx.plugins.resources.common import FILE_KIND
 import plynx.base.executor
 from plynx.constants import NodeResources
 
 
+# Signals sent by the kernel when the limits set by `setrlimit` are exceeded
+_LIMIT_SIGNALS = {
+    signal.SIGXCPU: '`_max_cpu_seconds` exceeded',
+    signal.SIGXFSZ: '`_max_output_bytes` exceeded',
+}
+
+
 def _RESOURCE_MERGER_FUNC():
     return defaultdict(list)
 
@@ -61,7 +70,151 @@ class ResourceMerger(object):
         return self._dict
 
 
+class _InputStream(threading.Thread):
+    """Feed the resource to a named pipe in a background thread.
+
+    The process can start reading the input before the download finishes.
+    The pipe can be read only once.
+    """
+
+    def __init__(self, resource_id, filename):
+        super(_InputStream, self).__init__()
+        self.daemon = True
+        self.resource_id = resource_id
+        self.filename = filename
+        self.error = None
+        os.mkfifo(filename)
+
+    def run(self):
+        try:
+            # blocks until the process opens the pipe
+            with open(self.filename, 'wb') as f:
+                download_file(self.resource_id, f)
+        except BrokenPipeError:
+            # the process stopped reading the input
+            pass
+        except Exception as e:
+            self.error = e
+
+    def finish(self):
+        while self.is_alive():
+            # unblock `open` if the process has not opened the pipe
+            os.close(os.open(self.filename, os.O_RDONLY | os.O_NONBLOCK))
+            self.join(timeout=0.1)
+
+
+class _OutputStream(threading.Thread):
+    """Upload the content of a named pipe while the process is writing it."""
+
+    def __init__(self, filename, metadata=None):
+        super(_OutputStream, self).__init__()
+        self.daemon = True
+        self.filename = filename
+        self.metadata = metadata
+        self.resource_id = None
+        self.error = None
+        self.finished = False
+        os.mkfifo(filename)
+        self._read_fd = os.open(filename, os.O_RDONLY | os.O_NONBLOCK)
+        os.set_blocking(self._read_fd, True)
+        # Keep the pipe open for writing: EOF will be reached only after `finish()`,
+        # so that the process can open the output multiple times
+        self._write_fd = os.open(filename, os.O_WRONLY)
+
+    def run(self):
+        try:
+            with os.fdopen(self._read_fd, 'rb') as f:
+                self.resource_id = upload_file_stream(f, seek=False, metadata=self.metadata)
+        except Exception as e:
+            self.error = e
+
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            os.close(self._write_fd)
+        self.join()
+
+
+class _LogPipe(threading.Thread):
+    """Read the output of the process from a pipe and write it to a file.
+
+    The part of the output that has not been uploaded yet is returned by `pop_delta()`,
+    the recent part of it is kept in memory for the live display. The output above `max_size` bytes is dropped.
+    """
+
+    READ_SIZE = 64 * 1024
+    TRUNCATION_MARKER = '\n##### The log has been truncated after {} bytes #####\n'
+
+    def __init__(self, pipe, file_obj, max_size=0, tail_size=4 * 1024):
+        super(_LogPipe, self).__init__()
+        self.daemon = True
+        self.max_size = max_size
+        self.size = 0
+        self.truncated = False
+        self._pipe = pipe
+        self._file_obj = file_obj
+        self._tail_size = tail_size
+        self._tail = bytearray()
+        self._delta = bytearray()
+        self._detached = False
+        self._lock = threading.Lock()
+
+    def run(self):
+        try:
+            for data in iter(lambda: os.read(self._pipe.fileno(), self.READ_SIZE), b''):
+                if self.truncated:
+                    # keep reading, otherwise the process would block on the full pipe
+                    continue
+                if self.max_size and self.size + len(data) > self.max_size:
+                    data = data[:self.max_size - self.size] + self.TRUNCATION_MARKER.format(self.max_size).encode()
+                    self.truncated = True
+                with self._lock:
+                    if self._detached:
+                        continue
+                    self._file_obj.write(data)
+                    self.size += len(data)
+                    self._delta += data
+                    self._tail += data
+                    del self._tail[:-self._tail_size]
+        finally:
+            self._pipe.close()
+
+    def get_delta_size(self):
+        with self._lock:
+            return len(self._delta)
+
+    def pop_delta(self):
+        with self._lock:
+            data = bytes(self._delta)
+            self._delta = bytearray()
+            return data
+
+    def get_tail(self):
+        with self._lock:
+            return bytes(self._tail)
+
+    def finish(self, timeout=None):
+        """Wait for the end of the output. The rest of it is dropped if the pipe is still open after `timeout`."""
+        self.join(timeout)
+        with self._lock:
+            self._detached = self.is_alive()
+        if self._detached:
+            logging.warning('The pipe is held open by a child of the process, the rest of the output is dropped')
+
+
 class BaseBash(plynx.base.executor.BaseExecutor):
+    # Inputs can be symbolic links to the storage if it is accessible
+    ALLOW_SYMLINK_INPUTS = True
+    # Inputs and outputs can be passed through named pipes (`_stream_inputs` and `_stream_outputs` parameters)
+    ALLOW_STREAMS = True
+    # Seconds between SIGTERM and SIGKILL when `_max_run_seconds` is exceeded
+    KILL_GRACE_PERIOD = 10
+    # stdout and stderr can be read from pipes (`_pipe_logs` and `_max_log_size` parameters)
+    ALLOW_LOG_PIPES = True
+    # A new segment of a log is uploaded once it has `LOG_SEGMENT_MIN_SIZE` bytes or `LOG_SEGMENT_MAX_AGE` seconds
+    # after the previous one, so that the long running jobs do not produce a segment per tick
+    LOG_SEGMENT_MIN_SIZE = 1024 ** 2
+    LOG_SEGMENT_MAX_AGE = 10
 
     def __init__(self, node=None):
         super(BaseBash, self).__init__(node)
@@ -70,7 +223,14 @@ class BaseBash(plynx.base.executor.BaseExecutor):
         self.final_logs_uploaded = False
         self.logs = {}
         self.logs_lock = threading.Lock()
+        # segments of the logs uploaded so far, so that the manifests are not read back on every tick
+        self._log_segments = {}
+        # monotonic time of the last upload of the logs
+        self._log_upload_times = {}
         self.output_to_filename = {}
+        self._input_streams = []
+        self._output_streams = {}
+        self._log_pipes = {}
         self._resource_manager = plynx.utils.plugin_manager.get_resource_manager()
         self._command = 'bash'
         self._node_running_status = NodeRunningStatus.READY
@@ -79,12 +239,17 @@ class BaseBash(plynx.base.executor.BaseExecutor):
         self._node_running_status = NodeRunningStatus.SUCCESS
 
         try:
+            limits = self._get_resource_limits()
+
             def pre_exec():
                 # Restore default signal disposition and invoke setsid
                 for sig in ('SIGPIPE', 'SIGXFZ', 'SIGXFSZ'):
                     if hasattr(signal, sig):
                         signal.signal(getattr(signal, sig), signal.SIG_DFL)
                 os.setsid()
+                for limit, value in limits:
+                    # SIGKILL is sent instead of SIGXCPU when the hard limit of CPU time is reached
+                    resource.setrlimit(limit, (value, value + 1 if limit == resource.RLIMIT_CPU else value))
 
             env = os.environ.copy()
 
@@ -95,16 +260,33 @@ class BaseBash(plynx.base.executor.BaseExecutor):
                 wf.write('\n')
                 wf.write(self._make_debug_text("End script"))
 
+            pipe_logs = self._get_pipe_logs()
             with open(self.logs['stdout'], 'wb') as stdout_file, open(self.logs['stderr'], 'wb') as stderr_file:
                 self.sp = Popen(
                     [self._command, script_location],
-                    stdout=stdout_file, stderr=stderr_file,
+                    stdout=PIPE if pipe_logs else stdout_file,
+                    stderr=PIPE if pipe_logs else stderr_file,
+                    bufsize=0,
                     cwd=self.workdir, env=env,
                     preexec_fn=pre_exec)
 
-                self.sp.wait()
+                try:
+                    if pipe_logs:
+                        self._start_log_pipes({'stdout': stdout_file, 'stderr': stderr_file})
+                    self._start_waiter()
+                    timeout = self.get_timeout()
+                    if not self._wait_process(timeout):
+                        self._terminate_process_group()
+                        raise Exception('Timeout of {} seconds exceeded, the process has been killed'.format(timeout))
+                finally:
+                    # the files are closed after the pipes are finished
+                    for log_pipe in self._log_pipes.values():
+                        log_pipe.finish(self.KILL_GRACE_PERIOD)
 
             if self.sp.returncode:
+                # only the status of `wait4` is trusted: the script may exit with `128 + <signal>` on its own
+                if -self.sp.returncode in _LIMIT_SIGNALS:
+                    raise Exception('Process has been killed: {}'.format(_LIMIT_SIGNALS[-self.sp.returncode]))
                 raise Exception("Process returned non-zero value")
 
         except Exception as e:
@@ -117,6 +299,90 @@ class BaseBash(plynx.base.executor.BaseExecutor):
 
         return self._node_running_status
 
+    def _get_pipe_logs(self):
+        if not self.ALLOW_LOG_PIPES:
+            return False
+        parameter = self.node.get_parameter_by_name('_pipe_logs', throw=False)
+        return bool(parameter and parameter.value)
+
+    def _start_log_pipes(self, log_files):
+        parameter = self.node.get_parameter_by_name('_max_log_size', throw=False)
+        max_size = max(0, int(parameter.value)) if parameter and parameter.value else 0
+        pipes = {'stdout': self.sp.stdout, 'stderr': self.sp.stderr}
+        with self.logs_lock:
+            for name, file_obj in log_files.items():
+                self._log_pipes[name] = _LogPipe(pipes[name], file_obj, max_size)
+                self._log_pipes[name].start()
+
+    def get_log_tails(self):
+        with self.logs_lock:
+            log_pipes = dict(self._log_pipes)
+        return {
+            name: log_pipe.get_tail().decode('utf-8', errors='replace')
+            for name, log_pipe in log_pipes.items()
+        }
+
+    def _get_resource_limits(self):
+        """Get the list of `(resource, value)` limits set by `_max_memory`, `_max_cpu_seconds` and `_max_output_bytes`."""
+        limits = []
+        for parameter_name, limit, scale in (
+                ('_max_memory', resource.RLIMIT_AS, 1024 ** 2),
+                ('_max_cpu_seconds', resource.RLIMIT_CPU, 1),
+                ('_max_output_bytes', resource.RLIMIT_FSIZE, 1),
+        ):
+            parameter = self.node.get_parameter_by_name(parameter_name, throw=False)
+            if parameter and parameter.value and int(parameter.value) > 0:
+                limits.append((limit, int(parameter.value) * scale))
+        return limits
+
+    def _start_waiter(self):
+        """Wait for the process in a separate thread and collect its resource usage."""
+        def wait():
+            _, status, rusage = os.wait4(self.sp.pid, 0)
+            self.node.rusage = {
+                'user_time': rusage.ru_utime,
+                'system_time': rusage.ru_stime,
+                # kilobytes on Linux
+                'max_rss': rusage.ru_maxrss,
+                'block_input_operations': rusage.ru_inblock,
+                'block_output_operations': rusage.ru_oublock,
+            }
+            # the process has been reaped, `Popen` would not be able to get the status
+            self.sp.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+        self._waiter = threading.Thread(target=wait)
+        self._waiter.daemon = True
+        self._waiter.start()
+
+    def _wait_process(self, timeout=None):
+        """Wait for the process to exit.
+
+        Return:
+            (bool)  True if the process has exited
+        """
+        self._waiter.join(timeout)
+        return not self._waiter.is_alive()
+
+    def _signal_process_group(self, sig):
+        try:
+            # the process is the leader of its group, see `os.setsid()` in `exec_script`
+            os.killpg(self.sp.pid, sig)
+            logging.info('Sent signal {} to {}'.format(sig, self.sp.pid))
+        except ProcessLookupError:
+            logging.info('Process group {} has already exited'.format(self.sp.pid))
+        except OSError as e:
+            logging.error('Error: {}'.format(e))
+
+    def _terminate_process_group(self):
+        """Send SIGTERM to the process group, then SIGKILL to the rest of it after `KILL_GRACE_PERIOD`."""
+        logging.info('Sending SIGTERM signal to bash process group')
+        self._signal_process_group(signal.SIGTERM)
+        self._wait_process(self.KILL_GRACE_PERIOD)
+        # the children might ignore SIGTERM or outlive the main process
+        logging.info('Sending SIGKILL signal to bash process group')
+        self._signal_process_group(signal.SIGKILL)
+        self._wait_process()
+
     def kill(self):
         if not hasattr(self, 'sp') or not self.sp:
             return
@@ -124,11 +390,7 @@ class BaseBash(plynx.base.executor.BaseExecutor):
         self._node_running_status = NodeRunningStatus.CANCELED
 
         logging.info('Sending SIGTERM signal to bash process group')
-        try:
-            os.killpg(os.getpgid(self.sp.pid), signal.SIGTERM)
-            logging.info('Killed {}'.format(self.sp.pid))
-        except OSError as e:
-            logging.error('Error: {}'.format(e))
+        self._signal_process_group(signal.SIGTERM)
 
     def is_updated(self):
         logging.info('Tick')
@@ -178,15 +440,94 @@ class BaseBash(plynx.base.executor.BaseExecutor):
                     'removable': False,
                 }),
                 Parameter.from_dict({
-                    'name': '_timeout',
+                    'name': '_max_run_seconds',
                     'parameter_type': ParameterTypes.INT,
-                    'value': 600,
+                    'value': 0,
                     'mutable_type': False,
                     'publicable': True,
                     'removable': False
                 }),
+                # name of the preferred scratch root of the workdir, see `worker.scratch_roots` in the config
+                Parameter.from_dict({
+                    'name': '_scratch',
+                    'parameter_type': ParameterTypes.STR,
+                    'value': '',
+                    'mutable_type': False,
+                    'publicable': True,
+                    'removable': False,
+                }),
+                # resource limits of the process, 0 means unlimited
+                Parameter.from_dict({
+                    'name': '_max_memory',
+                    'parameter_type': ParameterTypes.INT,
+                    'value': 0,
+                    'mutable_type': False,
+                    'publicable': True,
+                    'removable': False,
+                }),
+                Parameter.from_dict({
+                    'name': '_max_cpu_seconds',
+                    'parameter_type': ParameterTypes.INT,
+                    'value': 0,
+                    'mutable_type': False,
+                    'publicable': True,
+                    'removable': False,
+                }),
+                Parameter.from_dict({
+                    'name': '_max_output_bytes',
+                    'parameter_type': ParameterTypes.INT,
+                    'value': 0,
+                    'mutable_type': False,
+                    'publicable': True,
+                    'removable': False,
+                }),
+                # list of `<input name>:<glob pattern>`, only the matching members of the inputs are fetched
+                Parameter.from_dict({
+                    'name': '_partial_inputs',
+                    'parameter_type': ParameterTypes.LIST_STR,
+                    'value': [],
+                    'mutable_type': False,
+                    'publicable': True,
+                    'removable': False,
+                }),
             ]
         )
+        if cls.ALLOW_LOG_PIPES:
+            node.parameters.extend(
+                [
+                    Parameter.from_dict({
+                        'name': '_pipe_logs',
+                        'parameter_type': ParameterTypes.BOOL,
+                        'value': False,
+                        'mutable_type': False,
+                        'publicable': True,
+                        'removable': False,
+                    }),
+                    # bytes of stdout and stderr each, the rest is truncated; 0 means unlimited
+                    Parameter.from_dict({
+                        'name': '_max_log_size',
+                        'parameter_type': ParameterTypes.INT,
+                        'value': 0,
+                        'mutable_type': False,
+                        'publicable': True,
+                        'removable': False,
+                    }),
+                ]
+            )
+        if cls.ALLOW_STREAMS:
+            node.parameters.extend(
+                [
+                    Parameter.from_dict({
+                        'name': name,
+                        'parameter_type': ParameterTypes.LIST_STR,
+                        'value': [],
+                        'mutable_type': False,
+                        'publicable': True,
+                        'removable': False,
+                    })
+                    for name in ('_stream_inputs', '_stream_outputs')
+                ]
+            )
         node.logs.extend(
             [
                 Output.from_dict({
@@ -205,11 +546,34 @@ class BaseBash(plynx.base.executor.BaseExecutor):
         )
         return node
 
+    def _get_stream_names(self, parameter_name, resources):
+        if not self.ALLOW_STREAMS:
+            return set()
+        parameter = self.node.get_parameter_by_name(parameter_name, throw=False)
+        names = set(parameter.value) if parameter else set()
+        for res in resources:
+            if res.name in names and not self._resource_manager.kind_to_resource_class[res.file_type].STREAMABLE:
+                raise ValueError('Resource `{}` of type `{}` cannot be streamed'.format(res.name, res.file_type))
+        return names
+
+    def _get_partial_input_patterns(self):
+        parameter = self.node.get_parameter_by_name('_partial_inputs', throw=False)
+        res = defaultdict(list)
+        for value in (parameter.value if parameter else []):
+            name, _, pattern = value.partition(':')
+            res[name].append(pattern)
+        for input in self.node.inputs:
+            if input.name in res and not self._resource_manager.kind_to_resource_class[input.file_type].PARTIAL:
+                raise ValueError('Members of the input `{}` of type `{}` cannot be selected'.format(input.name, input.file_type))
+        return res
+
     def _prepare_inputs(self, preview=False):
         resource_merger = ResourceMerger(
             [NodeResources.INPUT],
             [input.name for input in self.node.inputs if input.is_array],
         )
+        stream_input_names = set() if preview else self._get_stream_names('_stream_inputs', self.node.inputs)
+        partial_input_patterns = {} if preview else self._get_partial_input_patterns()
         for input in self.node.inputs:
             if preview:
                 for i, value in enumerate(range(input.min_count)):
@@ -220,10 +584,19 @@ class BaseBash(plynx.base.executor.BaseExecutor):
                         input.is_array,
                     )
             else:
+                is_stream = input.name in stream_input_names
                 for i, value in enumerate(input.values):
                     filename = os.path.join(self.workdir, 'i_{}_{}'.format(i, input.name))
-                    with open(filename, 'wb') as f:
-                        f.write(get_file_stream(value).read())
+                    if is_stream:
+                        self._input_streams.append(_InputStream(value, filename))
+                        self._input_streams[-1].start()
+                    else:
+                        self._resource_manager.kind_to_resource_class[input.file_type].download_input(
+                            value,
+                            filename,
+                            allow_symlink=self.ALLOW_SYMLINK_INPUTS,
+                            patterns=partial_input_patterns.get(input.name),
+                        )
                     resource_merger.append(
                         self._resource_manager.kind_to_resource_class[input.file_type].prepare_input(filename, preview),
                         input.name,
@@ -236,9 +609,13 @@ class BaseBash(plynx.base.executor.BaseExecutor):
             [NodeResources.OUTPUT],
             [output.name for output in self.node.outputs if output.is_array],
         )
+        stream_output_names = set() if preview else self._get_stream_names('_stream_outputs', self.node.outputs)
         for output in self.node.outputs:
             filename = os.path.join(self.workdir, 'o_{}'.format(output.name))
             self.output_to_filename[output.name] = filename
+            if output.name in stream_output_names:
+                self._output_streams[output.name] = _OutputStream(filename, self._get_resource_metadata(output.file_type))
+                self._output_streams[output.name].start()
             resource_merger.append(
                 self._resource_manager.kind_to_resource_class[output.file_type].prepare_output(filename, preview),
                 output.name,
@@ -281,19 +658,54 @@ class BaseBash(plynx.base.executor.BaseExecutor):
             res[parameter.name] = value
         return res
 
+    def _get_resource_metadata(self, file_type):
+        return {
+            'file_type': file_type,
+            'run_id': self.node._id,
+            'node_id': self.node.original_node_id,
+        }
+
+    def _finish_streams(self):
+        for input_stream in self._input_streams:
+            input_stream.finish()
+        for output_stream in self._output_streams.values():
+            output_stream.finish()
+        for stream in self._input_streams + list(self._output_streams.values()):
+            if stream.error:
+                raise IOError('Streaming `{}` failed: {}'.format(os.path.basename(stream.filename), stream.error))
+
+    def _close_streams(self):
+        """Stop the streams that have not been finished by `_postprocess_outputs`, i.e. if the run has failed.
+
+        The outputs uploaded by the streams are removed.
+        """
+        for input_stream in self._input_streams:
+            input_stream.finish()
+        for output_stream in self._output_streams.values():
+            if output_stream.finished:
+                continue
+            output_stream.finish()
+            if output_stream.resource_id:
+                remove(output_stream.resource_id)
+
     def _postprocess_outputs(self, outputs):
+        self._finish_streams()
         for key, filename in outputs.items():
             logging.info("Uploading output `{}` - `{}`".format(key, filename))
-            if os.path.exists(filename):
+            if key in self._output_streams:
+                self.node.get_output_by_name(key).values = [self._output_streams[key].resource_id]
+            elif os.path.exists(filename):
                 logging.info('path exists')
                 matching_outputs = list(filter(lambda o: o.name == key, self.node.outputs))
                 assert len(matching_outputs) == 1, "Found more that 1 output with the same name `{}`".format(key)
-                filename = self._resource_manager.kind_to_resource_class[matching_outputs[0].file_type].postprocess_output(filename)
+                resource_class = self._resource_manager.kind_to_resource_class[matching_outputs[0].file_type]
+                filename = resource_class.postprocess_output(filename)
                 logging.info(filename)
-                with open(filename, 'rb') as f:
-                    # resource_id
-                    self.node.get_output_by_name(key).values = [upload_file_stream(f)]
-                    logging.info(self.node.get_output_by_name(key).to_dict())
+                # resource_id
+                self.node.get_output_by_name(key).values = [
+                    resource_class.upload_output(filename, metadata=self._get_resource_metadata(matching_outputs[0].file_type))
+                ]
+                logging.info(self.node.get_output_by_name(key).to_dict())
             else:
                 raise IOError("Output `{}` (filename: `{}`) does not exist".format(key, filename))
 
@@ -315,24 +727,51 @@ class BaseBash(plynx.base.executor.BaseExecutor):
             if self.final_logs_uploaded:
                 return is_dirty
             self.final_logs_uploaded = final
+            now = time.monotonic()
             for key, filename in self.logs.items():
                 if key not in self.logs_sizes:
                     # the logs have not been initialized yet
                     continue
-                if os.path.exists(filename) and os.stat(filename).st_size != self.logs_sizes[key]:
-                    is_dirty = True
-                    log = self.node.get_log_by_name(key)
-                    self.logs_sizes[key] = os.stat(filename).st_size
+                log = self.node.get_log_by_name(key)
+                log_pipe = self._log_pipes.get(key)
+                if log_pipe:
+                    # the pipe keeps the bytes written since the last upload, the file is not read
+                    pending_size = log_pipe.get_delta_size()
+                elif os.path.exists(filename):
+                    pending_size = os.stat(filename).st_size - self.logs_sizes[key]
+                else:
+                    pending_size = 0
+                upload_time = self._log_upload_times.setdefault(key, now)
+                if pending_size <= 0 or not (
+                        final or pending_size >= self.LOG_SEGMENT_MIN_SIZE or now - upload_time >= self.LOG_SEGMENT_MAX_AGE):
+                    data = b''
+                elif log_pipe:
+                    data = log_pipe.pop_delta()
+                else:
                     with open(filename, 'rb') as f:
-                        # resource_id should be None if the file has not been uploaded yet
-                        # otherwise assign it
-                        log.values = [upload_file_stream(f, log.values[0] if len(log.values) > 0 else None)]
+                        # upload only the bytes appended since the last upload
+                        f.seek(self.logs_sizes[key])
+                        data = f.read(pending_size)
+                    self.logs_sizes[key] += len(data)
+                if data:
+                    is_dirty = True
+                    self._log_upload_times[key] = now
+                    # resource_id should be None if the file has not been uploaded yet
+                    # otherwise append to it
+                    log.values = [append_file_stream(
+                        data,
+                        log.values[0] if len(log.values) > 0 else None,
+                        segments=self._log_segments.setdefault(key, []),
+                    )]
+                if final and len(log.values) > 0:
+                    is_dirty = True
+                    log.values = [compact_file(log.values[0], metadata=self._get_resource_metadata(log.file_type))]
         return is_dirty
 
 
 class BashJinja2(BaseBash):
     HELP_TEMPLATE = '''# Use templates: {}
-# For example `{{{{ '{{{{' }}}} param['_timeout'] {{{{ '}}}}' }}}}` or `{{{{ '{{{{' }}}} input['abc'] {{{{ '}}}}' }}}}`
+# For example `{{{{ '{{{{' }}}} param['_max_run_seconds'] {{{{ '}}}}' }}}}` or `{{{{ '{{{{' }}}} input['abc'] {{{{ '}}}}' }}}}`
 
 '''
 
@@ -340,41 +779,50 @@ class BashJinja2(BaseBash):
         super(BashJinja2, self).__init__(node)
 
     def run(self, preview=False):
-        inputs = self._prepare_inputs(preview)
-        parameters = self._prepare_parameters()
-        outputs = self._prepare_outputs(preview)
-        logs = self._prepare_logs()
-        if preview:
-            help = BashJinja2.HELP_TEMPLATE.format(list(inputs.keys()) + list(outputs.keys()) + [NodeResources.PARAM])
-        else:
-            help = ''
-        cmd = '{help}{cmd}'.format(
-            help=help,
-            cmd=self._extract_cmd_text()
-        )
-        cmd_template = jinja2.Template(cmd)
-        resources = inputs
-        resources.update(outputs)
-        cmd_string = cmd_template.render(
-            params=parameters,
-            logs=logs,
-            **resources
-        )
-        if preview:
-            return cmd_string
+        try:
+            with self.timing(RunPhase.INPUTS):
+                inputs = self._prepare_inputs(preview)
+            with self.timing(RunPhase.RENDER):
+                parameters = self._prepare_parameters()
+                outputs = self._prepare_outputs(preview)
+                logs = self._prepare_logs()
+                if preview:
+                    help = BashJinja2.HELP_TEMPLATE.format(list(inputs.keys()) + list(outputs.keys()) + [NodeResources.PARAM])
+                else:
+                    help = ''
+                cmd = '{help}{cmd}'.format(
+                    help=help,
+                    cmd=self._extract_cmd_text()
+                )
+                resources = inputs
+                resources.update(outputs)
+                cmd_string = render_template(
+                    cmd,
+                    params=parameters,
+                    logs=logs,
+                    **resources
+                )
+                if preview:
+                    return cmd_string
 
-        script_location = self._get_script_fname()
-        with open(script_location, 'w') as script_file:
-            script_file.write(
-                cmd_string
-            )
+                script_location = self._get_script_fname()
+                with open(script_location, 'w') as script_file:
+                    script_file.write(
+                        cmd_string
+                    )
 
-        self._node_running_status = self.exec_script(script_location)
+            with self.timing(RunPhase.EXEC):
+                self._node_running_status = self.exec_script(script_location)
 
-        self._postprocess_outputs(outputs[NodeResources.OUTPUT])
-        self._postprocess_logs()
+            with self.timing(RunPhase.OUTPUTS):
+                self._postprocess_outputs(outputs[NodeResources.OUTPUT])
+            with self.timing(RunPhase.LOGS):
+                self._postprocess_logs()
 
-        return self._node_running_status
+            return self._node_running_status
+        finally:
+            # unblock the streams if the run has failed
+            self._close_streams()
 
     def status(self):
         pass
@@ -392,44 +840,53 @@ class PythonNode(BaseBash):
         self._command = 'python'
 
     def run(self, preview=False):
-        inputs = self._prepare_inputs(preview)
-        parameters = self._prepare_parameters()
-        outputs = self._prepare_outputs(preview)
-        logs = self._prepare_logs()
-        cmd = self._extract_cmd_text()
-        cmd_array = []
-        cmd_array.extend([
-            self._get_arguments_string(key, value)
-            for key, value in inputs.items()
-        ])
-        cmd_array.extend([
-            self._get_arguments_string(key, value)
-            for key, value in outputs.items()
-        ])
-        cmd_array.extend([
-            self._get_arguments_string(NodeResources.PARAM, parameters),
-            self._get_arguments_string(NodeResources.LOG, logs),
-            "\n",
-            "# User code starts there:",
-            cmd,
-        ])
-        cmd_string = '\n'.join(cmd_array)
-
-        if preview:
-            return cmd_string
-
-        script_location = self._get_script_fname(extension='.py')
-        with open(script_location, 'w') as script_file:
-            script_file.write(
-                cmd_string
-            )
+        try:
+            with self.timing(RunPhase.INPUTS):
+                inputs = self._prepare_inputs(preview)
+            with self.timing(RunPhase.RENDER):
+                parameters = self._prepare_parameters()
+                outputs = self._prepare_outputs(preview)
+                logs = self._prepare_logs()
+                cmd = self._extract_cmd_text()
+                cmd_array = []
+                cmd_array.extend([
+                    self._get_arguments_string(key, value)
+                    for key, value in inputs.items()
+                ])
+                cmd_array.extend([
+                    self._get_arguments_string(key, value)
+                    for key, value in outputs.items()
+                ])
+                cmd_array.extend([
+                    self._get_arguments_string(NodeResources.PARAM, parameters),
+                    self._get_arguments_string(NodeResources.LOG, logs),
+                    "\n",
+                    "# User code starts there:",
+                    cmd,
+                ])
+                cmd_string = '\n'.join(cmd_array)
+
+                if preview:
+                    return cmd_string
+
+                script_location = self._get_script_fname(extension='.py')
+                with open(script_location, 'w') as script_file:
+                    script_file.write(
+                        cmd_string
+                    )
 
-        res = self.exec_script(script_location)
+            with self.timing(RunPhase.EXEC):
+                res = self.exec_script(script_location)
 
-        self._postprocess_outputs(outputs[NodeResources.OUTPUT])
-        self._postprocess_logs()
+            with self.timing(RunPhase.OUTPUTS):
+                self._postprocess_outputs(outputs[NodeResources.OUTPUT])
+            with self.timing(RunPhase.LOGS):
+                self._postprocess_logs()
 
-        return res
+            return res
+        finally:
+            # unblock the streams if the run has failed
+            self._close_streams()
 
     def status(self):
         """Temp"""
@@ -0,0 +1,117 @@
+"""Executor of registered Python callables, see `plynx.utils.callables`."""
+import os
+import logging
+import threading
+from plynx.constants import NodeRunningStatus, ParameterTypes, NodeResources, RunPhase
+from plynx.db.node import Parameter
+from plynx.utils.callables import CallableProcessPool
+from plynx.utils.config import get_callables_config
+import plynx.plugins.executors.local
+
+# Parameters of `BaseBash` that do not apply to the callables running in a shared process
+_PROCESS_PARAMETERS = {'_cmd', '_max_memory', '_max_cpu_seconds', '_max_output_bytes'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_callable_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CallableProcessPool(PythonCallable.MAX_PROCESSES, get_callables_config().modules)
+        return _pool
+
+
+class PythonCallable(plynx.plugins.executors.local.BaseBash):
+    # Max number of processes of the pool shared by the operations of the worker
+    MAX_PROCESSES = os.cpu_count() or 1
+    ALLOW_STREAMS = False
+    ALLOW_LOG_PIPES = False
+
+    def __init__(self, node=None):
+        super(PythonCallable, self).__init__(node)
+        self._process = None
+        # `_process` is cleared before the process is released, so that `kill` never terminates a call of another node
+        self._process_lock = threading.Lock()
+
+    def run(self, preview=False):
+        if preview:
+            return 'Calls `{}`'.format(self.node.get_parameter_by_name('_callable').value)
+
+        with self.timing(RunPhase.INPUTS):
+            inputs = self._prepare_inputs()
+        with self.timing(RunPhase.RENDER):
+            parameters = self._prepare_parameters()
+            outputs = self._prepare_outputs()
+            logs = self._prepare_logs()
+
+        with self.timing(RunPhase.EXEC):
+            self._node_running_status = self._call({
+                NodeResources.INPUT: inputs[NodeResources.INPUT],
+                NodeResources.OUTPUT: outputs[NodeResources.OUTPUT],
+                NodeResources.PARAM: parameters,
+                NodeResources.LOG: logs,
+            })
+
+        with self.timing(RunPhase.OUTPUTS):
+            self._postprocess_outputs(outputs[NodeResources.OUTPUT])
+        with self.timing(RunPhase.LOGS):
+            self._postprocess_logs()
+
+        return self._node_running_status
+
+    def _call(self, kwargs):
+        self._node_running_status = NodeRunningStatus.SUCCESS
+        path = self.node.get_parameter_by_name('_callable').value
+        pool = get_callable_pool()
+        try:
+            with open(self.logs['worker'], 'a') as wf:
+                wf.write(self._make_debug_text('Calling `{}`'.format(path)))
+            process = pool.acquire()
+            with self._process_lock:
+                self._process = process
+            try:
+                error = process.call(path, kwargs, self.workdir, self.logs['stdout'], self.logs['stderr'], self.get_timeout())
+            finally:
+                with self._process_lock:
+                    self._process = None
+                pool.release(process)
+            if error:
+                raise Exception(error)
+        except Exception as e:
+            if self._node_running_status != NodeRunningStatus.CANCELED:
+                self._node_running_status = NodeRunningStatus.FAILED
+            logging.exception('Job failed')
+            with open(self.logs['worker'], 'a+') as worker_log_file:
+                worker_log_file.write(self._make_debug_text('JOB FAILED'))
+                worker_log_file.write(str(e))
+        return self._node_running_status
+
+    def kill(self):
+        with self._process_lock:
+            if not self._process:
+                return
+            self._node_running_status = NodeRunningStatus.CANCELED
+            logging.info('Terminating the process of the callable')
+            self._process.terminate()
+
+    def status(self):
+        pass
+
+    @classmethod
+    def get_default_node(cls, is_workflow):
+        node = super().get_default_node(is_workflow)
+        node.title = 'New python callable'
+        node.parameters = [parameter for parameter in node.parameters if parameter.name not in _PROCESS_PARAMETERS]
+        node.parameters.append(
+            Parameter.from_dict({
+                'name': '_callable',
+                'parameter_type': ParameterTypes.STR,
+                'value': '',
+                'mutable_type': False,
+                'publicable': False,
+                'removable': False,
+            })
+        )
+        return node
@@ -0,0 +1,103 @@
+import io
+import pytest
+import plynx.utils.remote
+from plynx.constants import Collections
+from plynx.db.node import Input, Output, Parameter
+from plynx.utils import file_handler
+from plynx.utils.config import StorageConfig
+from plynx.utils.remote.file import RemoteFile
+
+mongomock = pytest.importorskip('mongomock')
+
+try:
+    import plynx.plugins.executors.local as local
+except KeyError:
+    # the executors require `plugins` of the config, see PLYNX_CONFIG_PATH
+    pytest.skip('plugins are not configured', allow_module_level=True)
+
+
+@pytest.fixture(autouse=True)
+def storage(tmpdir, monkeypatch):
+    monkeypatch.setattr(plynx.utils.remote, '_driver', RemoteFile(StorageConfig(
+        scheme='file',
+        prefix='{}/'.format(tmpdir.mkdir('storage')),
+        credential_path=None,
+        part_size=8 * 1024 ** 2,
+        concurrency=1,
+        inline_threshold=0,
+    )))
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(file_handler, 'get_db_connector', lambda: db)
+    return db
+
+
+def test_streams_are_closed_on_failure(tmpdir, monkeypatch, storage):
+    node = local.BashJinja2.get_default_node(is_workflow=False)
+    node.inputs.append(Input.from_dict({
+        'name': 'in',
+        'file_type': 'file',
+        'values': [file_handler.upload_file_stream(io.BytesIO(b'data'))],
+    }))
+    node.outputs.append(Output.from_dict({'name': 'out', 'file_type': 'file'}))
+    node.get_parameter_by_name('_stream_inputs').value = ['in']
+    node.get_parameter_by_name('_stream_outputs').value = ['out']
+    executor = local.BashJinja2(node)
+    executor.workdir = str(tmpdir.join('workdir'))
+    executor.init_workdir()
+
+    prepare_outputs = executor._prepare_outputs
+
+    def fail(preview=False):
+        prepare_outputs(preview)
+        raise ValueError('Failed to prepare the outputs')
+
+    monkeypatch.setattr(executor, '_prepare_outputs', fail)
+    resources_count = storage[Collections.RESOURCES].count_documents({})
+    with pytest.raises(ValueError):
+        executor.run()
+
+    streams = executor._input_streams + list(executor._output_streams.values())
+    assert len(streams) == 2
+    assert not any(stream.is_alive() for stream in streams)
+    # the output uploaded by the stream is removed
+    assert storage[Collections.RESOURCES].count_documents({}) == resources_count
+
+
+def test_legacy_timeout_is_ignored():
+    node = local.BashJinja2.get_default_node(is_workflow=False)
+    assert local.BashJinja2(node).get_timeout() is None
+
+    # the default value of the nodes created by previous versions
+    node.parameters.append(Parameter.from_dict({'name': '_timeout', 'parameter_type': 'int', 'value': 600}))
+    assert local.BashJinja2(node).get_timeout() is None
+
+    node.get_parameter_by_name('_max_run_seconds').value = 5
+    assert local.BashJinja2(node).get_timeout() == 5
+
+
+def test_log_segments(tmpdir, monkeypatch):
+    node = local.BashJinja2.get_default_node(is_workflow=False)
+    executor = local.BashJinja2(node)
+    executor.workdir = str(tmpdir.join('workdir'))
+    executor.init_workdir()
+    logs = executor._prepare_logs()
+    log = node.get_log_by_name('stdout')
+
+    with open(logs['stdout'], 'ab') as f:
+        f.write(b'small')
+    # neither large nor old enough
+    assert not executor.upload_logs()
+    assert log.values == []
+
+    monkeypatch.setattr(executor, 'LOG_SEGMENT_MAX_AGE', 0)
+    assert executor.upload_logs()
+    file_path = log.values[0]
+    with open(logs['stdout'], 'ab') as f:
+        f.write(b' and more')
+    monkeypatch.setattr(executor, 'LOG_SEGMENT_MAX_AGE', 1000)
+    assert not executor.upload_logs()
+
+    # the rest is uploaded, the log is compacted under the same path
+    assert executor.upload_logs(final=True)
+    assert log.values == [file_path]
+    assert file_handler.get_file_stream(file_path).read() == b'small and more'
@@ -10,6 +10,8 @@ CLOUD_SERVICE_CONFIG = get_cloud_service_config()
 
 
 class CloudStorage(resource.BaseResource):
+    STREAMABLE = False
+
     @staticmethod
     def prepare_input(filename, preview):
         if preview:
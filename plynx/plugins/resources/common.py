@@ -1,13 +1,15 @@
 import os
 import stat
 import json
-import zipfile
 from plynx.constants import NodeResources
 from plynx.base import resource
-from plynx.utils.common import zipdir
-from plynx.utils.config import get_web_config
+from plynx.utils.archive import MemberType, pack_directory, unpack_directory, extract_members, list_directory
+from plynx.utils.config import get_web_config, get_archive_config
+from plynx.utils.file_handler import stream_download, stream_upload, get_file_range, get_file_index, put_file_index, \
+    get_file_stream
 
 WEB_CONFIG = get_web_config()
+ARCHIVE_CONFIG = get_archive_config()
 
 
 class File(resource.BaseResource):
@@ -15,6 +17,9 @@ class File(resource.BaseResource):
 
 
 class PDF(resource.BaseResource):
+    # preview refers to the resource by url
+    PREVIEW_SIZE = 0
+
     @classmethod
     def preview(cls, preview_object):
         return '<iframe src="{}" title="preview" type="application/pdf" width="100%"/>'.format(
@@ -25,6 +30,9 @@ class PDF(resource.BaseResource):
 
 
 class Image(resource.BaseResource):
+    # preview refers to the resource by url
+    PREVIEW_SIZE = 0
+
     @classmethod
     def preview(cls, preview_object):
         return '<img src="{}" width="100%" alt="preview" />'.format(
@@ -41,7 +49,8 @@ class _BaseSeparated(resource.BaseResource):
 
     @classmethod
     def preview(cls, preview_object):
-        preview_object.fp.truncate(1024 ** 2)
+        if cls.PREVIEW_SIZE is not None:
+            preview_object.fp.truncate(cls.PREVIEW_SIZE)
         line_data = []
         for idx, line in enumerate(preview_object.fp.read().decode('utf-8').split('\n')):
             line_data.append(
@@ -64,7 +73,8 @@ class TSV(_BaseSeparated):
 class Json(resource.BaseResource):
     @classmethod
     def preview(cls, preview_object):
-        if preview_object.fp.getbuffer().nbytes > 1024 ** 2:
+        # the object is likely to be truncated
+        if cls.PREVIEW_SIZE is not None and preview_object.fp.getbuffer().nbytes >= cls.PREVIEW_SIZE:
             return super(Json, cls).preview(preview_object)
         try:
             return '<pre>{}</pre>'.format(
@@ -75,6 +85,10 @@ class Json(resource.BaseResource):
 
 
 class Executable(resource.BaseResource):
+    STREAMABLE = False
+    # `prepare_input` changes the mode of the file
+    ALLOW_LINK = False
+
     @staticmethod
     def prepare_input(filename, preview):
         # `chmod +x` to the executable file
@@ -86,16 +100,46 @@ class Executable(resource.BaseResource):
 
 
 class Directory(resource.BaseResource):
+    # the list of files is read from the index
+    PREVIEW_SIZE = 0
+    STREAMABLE = False
+    PARTIAL = True
+
     @staticmethod
-    def prepare_input(filename, preview):
-        # extract zip file
-        if preview:
-            return {NodeResources.INPUT: filename}
-        zip_filename = '{}.zip'.format(filename)
-        os.rename(filename, zip_filename)
+    def download_input(resource_id, filename, allow_symlink=True, patterns=None):
         os.mkdir(filename)
-        with zipfile.ZipFile(zip_filename) as zf:
-            zf.extractall(filename)
+        index = get_file_index(resource_id) if patterns is not None else None
+        if index is not None:
+            # fetch only the selected members
+            extract_members(
+                index,
+                lambda offset, length: get_file_range(resource_id, offset, length),
+                filename,
+                patterns,
+            )
+        else:
+            # extract the archive while it is being downloaded
+            stream_download(resource_id, lambda f: unpack_directory(f, filename, patterns))
+
+    @staticmethod
+    def upload_output(filename, metadata=None):
+        # archive the directory while it is being uploaded
+        indexes = []
+        resource_id = stream_upload(
+            lambda f: indexes.append(pack_directory(
+                filename,
+                f,
+                compression=ARCHIVE_CONFIG.compression,
+                level=ARCHIVE_CONFIG.level,
+                threads=ARCHIVE_CONFIG.threads,
+            )),
+            metadata=metadata,
+        )
+        put_file_index(resource_id, indexes[0])
+        return resource_id
+
+    @staticmethod
+    def prepare_input(filename, preview):
         return {NodeResources.INPUT: filename}
 
     @staticmethod
@@ -105,19 +149,18 @@ class Directory(resource.BaseResource):
         os.mkdir(filename)
         return {NodeResources.OUTPUT: filename}
 
-    @staticmethod
-    def postprocess_output(filename):
-        zip_filename = '{}.zip'.format(filename)
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zf:
-            zipdir(filename, zf)
-        return zip_filename
-
     @classmethod
     def preview(cls, preview_object):
-        with zipfile.ZipFile(preview_object.fp, 'r') as zf:
-            content_stream = '\n'.join(zf.namelist())
-
-        return '<pre>{}</pre>'.format(content_stream)
+        index = get_file_index(preview_object.resource_id)
+        if index is not None:
+            names = [
+                member['name'] + ('/' if member['type'] == MemberType.DIRECTORY else '')
+                for member in index['members']
+            ]
+        else:
+            # archives uploaded before the indexes were introduced
+            names = list_directory(get_file_stream(preview_object.resource_id))
+        return '<pre>{}</pre>'.format('\n'.join(names))
 
 
 FILE_KIND = 'file'
@@ -0,0 +1,20 @@
+import io
+from plynx.base.resource import PreviewObject
+from plynx.plugins.resources.common import File, CSV, Json
+
+
+def _preview(resource_class, data):
+    return resource_class.preview(PreviewObject(fp=io.BytesIO(data), resource_id='resource'))
+
+
+def test_preview_size(monkeypatch):
+    data = b'a,b\n' * 10
+    monkeypatch.setattr(File, 'PREVIEW_SIZE', 4)
+    assert _preview(File, data) == '<pre>a,b\n</pre>'
+
+    # the whole object is previewed
+    for resource_class in (File, CSV, Json):
+        monkeypatch.setattr(resource_class, 'PREVIEW_SIZE', None)
+    assert _preview(File, data) == '<pre>{}</pre>'.format(data.decode())
+    assert _preview(CSV, data).count('<tr') == 11
+    assert _preview(Json, b'{"a": 1}') == '<pre>{\n  "a": 1\n}</pre>'
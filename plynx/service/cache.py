@@ -1,6 +1,8 @@
 import sys
 import csv
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import dateutil.parser
 from collections import namedtuple
@@ -18,6 +20,7 @@ MODES = [
     CLEAN_CACHE,
     LIST_CACHE,
 ]
+DEFAULT_BATCH_SIZE = 1000
 
 node_cache_manager = NodeCacheManager()
 
@@ -43,7 +46,73 @@ def run_list_cache(start_datetime, end_datetime):
                     )
 
 
-def run_clean_cache(start_datetime, end_datetime, yes):
+def _iter_batches(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _get_resource_ids(node_cache_dict):
+    resource_ids = []
+    for resource_type in ('outputs', 'logs'):
+        for resource in node_cache_dict.get(resource_type, []):
+            resource_ids.extend(resource.get('values', []))
+    return resource_ids
+
+
+class _CleanStats(object):
+    """Progress and throughput of cache cleaning."""
+
+    def __init__(self, total_count):
+        self.total_count = total_count
+        self.caches_count = 0
+        self.removed_count = 0
+        self.failed_count = 0
+        self.start_time = time.time()
+
+    def add(self, caches_count, removed_count, failed_count):
+        self.caches_count += caches_count
+        self.removed_count += removed_count
+        self.failed_count += failed_count
+
+    def report(self, final=False):
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        logging.info('{prefix} `{caches}/{total}` cached results, `{removed}` resources, `{failed}` failed '
+                     'in {elapsed:.1f}s ({caches_rate:.1f} results/s, {removed_rate:.1f} resources/s)'.format(
+                        prefix='Removed' if final else 'Progress:',
+                        caches=self.caches_count,
+                        total=self.total_count,
+                        removed=self.removed_count,
+                        failed=self.failed_count,
+                        elapsed=elapsed,
+                        caches_rate=self.caches_count / elapsed,
+                        removed_rate=self.removed_count / elapsed,
+                        ))
+
+
+def _remove_node_caches(node_cache_dicts):
+    """Remove resources of a batch of caches and mark the caches as removed.
+
+    Return:
+        (tuple) Number of caches, number of removed resources and number of failed resources
+    """
+    resource_ids = []
+    for node_cache_dict in node_cache_dicts:
+        resource_ids.extend(_get_resource_ids(node_cache_dict))
+    try:
+        failed_resource_ids = file_handler.remove_batch(resource_ids)
+    # TODO use more cache states, such as `attempted to remove`
+    finally:
+        node_cache_manager.mark_removed([node_cache_dict['_id'] for node_cache_dict in node_cache_dicts])
+    return len(node_cache_dicts), len(resource_ids) - len(failed_resource_ids), len(failed_resource_ids)
+
+
+def run_clean_cache(start_datetime, end_datetime, yes, batch_size=DEFAULT_BATCH_SIZE):
     query = node_cache_manager.get_list(start_datetime, end_datetime, non_protected_only=True)
     query_count = query.count()
     if query_count == 0:
@@ -54,25 +123,26 @@ def run_clean_cache(start_datetime, end_datetime, yes):
         return 0
 
     logging.info('Start removing `{}` objects'.format(query_count))
-    for node_cache_dict in query:
-        node_cache = NodeCache.from_dict(node_cache_dict)
-        try:
-            for resource_type in {'outputs', 'logs'}:
-                for resource in getattr(node_cache, resource_type):
-                    if resource.resource_id:
-                        file_handler.remove(resource.resource_id)
-        # TODO use more cache states, such as `attempted to remove`
-        finally:
-            node_cache.removed = True
-            node_cache.save()
-            logging.info('Removed files from `{}`'.format(node_cache))
+    stats = _CleanStats(query_count)
+
+    # remove resources of the current batch while the next one is being read from the database
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = None
+        for node_cache_dicts in _iter_batches(query, batch_size):
+            future = executor.submit(_remove_node_caches, node_cache_dicts)
+            if pending:
+                stats.add(*pending.result())
+                stats.report()
+            pending = future
+        if pending:
+            stats.add(*pending.result())
 
     node_cache_manager.clean_up()
-    logging.info('Removed `{}` objects'.format(query_count))
+    stats.report(final=True)
     return 0
 
 
-def run_cache(mode, start_datetime, end_datetime, yes):
+def run_cache(mode, start_datetime, end_datetime, yes, batch_size=DEFAULT_BATCH_SIZE):
     if mode not in MODES:
         raise ValueError('`mode` must be one of `{values}`. Value `{mode}` is given'.format(
             values=MODES,
@@ -83,4 +153,4 @@ def run_cache(mode, start_datetime, end_datetime, yes):
     if mode == LIST_CACHE:
         return run_list_cache(start_datetime, end_datetime)
     elif mode == CLEAN_CACHE:
-        return run_clean_cache(start_datetime, end_datetime, yes)
+        return run_clean_cache(start_datetime, end_datetime, yes, batch_size)
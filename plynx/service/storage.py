@@ -0,0 +1,50 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from plynx.utils.remote import get_driver
+from plynx.utils.remote.file import RemoteFile, MIGRATE_MOVED, MIGRATE_DUPLICATE_REMOVED
+
+
+SHARD_STORAGE = 'shard'
+MODES = [
+    SHARD_STORAGE,
+]
+
+_REPORT_EVERY = 10000
+
+
+def run_shard_storage():
+    """Move objects of the `file` storage from the flat layout to the sharded one."""
+    driver = get_driver()
+    if not isinstance(driver, RemoteFile):
+        raise ValueError('Sharding is supported by `file` storage scheme only')
+
+    logging.info('Start moving objects to the sharded layout')
+    start_time = time.time()
+    moved_count = 0
+    removed_count = 0
+    with ThreadPoolExecutor(max_workers=driver.concurrency) as executor:
+        for result in executor.map(driver.migrate_to_sharded, driver.list_flat_paths()):
+            removed_count += int(result == MIGRATE_DUPLICATE_REMOVED)
+            if result != MIGRATE_MOVED:
+                continue
+            moved_count += 1
+            if moved_count % _REPORT_EVERY == 0:
+                logging.info('Moved `{}` objects ({:.1f} objects/s)'.format(
+                    moved_count,
+                    moved_count / max(time.time() - start_time, 1e-6),
+                ))
+    logging.critical('Moved `{}` objects in {:.1f}s'.format(moved_count, time.time() - start_time))
+    if removed_count:
+        logging.critical('Removed `{}` flat objects that had already been stored in the sharded layout'.format(removed_count))
+    return 0
+
+
+def run_storage(mode):
+    if mode not in MODES:
+        raise ValueError('`mode` must be one of `{values}`. Value `{mode}` is given'.format(
+            values=MODES,
+            mode=mode,
+        ))
+    if mode == SHARD_STORAGE:
+        return run_shard_storage()
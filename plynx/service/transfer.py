@@ -0,0 +1,74 @@
+"""Transfer of the inputs and the outputs of a job in the pod of the kubernetes executor.
+
+The spec is written by the worker, see `plynx.plugins.executors.kubernetes`.
+"""
+import os
+import json
+import logging
+from plynx.utils.db_connector import check_connection
+from plynx.utils.plugin_manager import get_resource_manager
+
+DOWNLOAD = 'download'
+UPLOAD = 'upload'
+MODES = [
+    DOWNLOAD,
+    UPLOAD,
+]
+
+
+def run_download(spec):
+    """Download the inputs and prepare the outputs."""
+    kind_to_resource_class = get_resource_manager().kind_to_resource_class
+    for input in spec['inputs']:
+        logging.info('Downloading `{}` to `{}`'.format(input['resource_id'], input['filename']))
+        resource_class = kind_to_resource_class[input['file_type']]
+        # the containers of the pod share the volume of the workdir, but not the rest of the file system
+        resource_class.download_input(
+            input['resource_id'],
+            input['filename'],
+            allow_symlink=False,
+            patterns=input['patterns'],
+        )
+        resource_class.prepare_input(input['filename'], preview=False)
+    for output in spec['outputs']:
+        kind_to_resource_class[output['file_type']].prepare_output(output['filename'], preview=False)
+
+
+def run_upload(spec):
+    """Upload the outputs.
+
+    Return:
+        (dict)  Name of the output to the resource ID
+    """
+    kind_to_resource_class = get_resource_manager().kind_to_resource_class
+    res = {}
+    for output in spec['outputs']:
+        logging.info('Uploading `{}`'.format(output['filename']))
+        if not os.path.exists(output['filename']):
+            raise IOError("Output `{}` (filename: `{}`) does not exist".format(output['name'], output['filename']))
+        resource_class = kind_to_resource_class[output['file_type']]
+        filename = resource_class.postprocess_output(output['filename'])
+        res[output['name']] = resource_class.upload_output(filename, metadata=output['metadata'])
+    return res
+
+
+def run_transfer(mode, filename):
+    if mode not in MODES:
+        raise ValueError('`mode` must be one of `{values}`. Value `{mode}` is given'.format(
+            values=MODES,
+            mode=mode,
+        ))
+    with open(filename) as f:
+        spec = json.load(f)
+    # the metadata of the resources and the small resources are stored in the database
+    try:
+        check_connection()
+    except Exception as e:
+        raise Exception('`plynx transfer` requires access to the database, see `db` in the config: {}'.format(e))
+    if mode == DOWNLOAD:
+        run_download(spec)
+    elif mode == UPLOAD:
+        # the resource IDs are copied by the worker from the pod, the output of the resources is not parsed
+        with open(spec['result_filename'], 'w') as f:
+            json.dump(run_upload(spec), f)
+    return 0
@@ -1,19 +1,24 @@
 import os
 import sys
+import time
+import shutil
 import threading
 import logging
 import six
 import traceback
 import uuid
 import socket
-from plynx.constants import NodeRunningStatus, Collections
+from concurrent.futures import ThreadPoolExecutor
+from plynx.constants import NodeRunningStatus, Collections, RunPhase
 import plynx.db.node_collection_manager
 import plynx.db.run_cancellation_manager
 from plynx.db.worker_state import WorkerState
 from plynx.utils.config import get_worker_config
 from plynx.utils.db_connector import check_connection
 import plynx.utils.executor
-from plynx.utils.file_handler import upload_file_stream
+from plynx.utils.file_handler import upload_file_stream, get_files_metadata
+from plynx.utils.scratch import ScratchManager
+from plynx.utils.template import get_template_cache
 
 
 class TickThread(object):
@@ -50,6 +55,39 @@ class TickThread(object):
                     self.executor.node.save(collection=Collections.RUNS)
 
 
+class WorkdirReaper(object):
+    """Remove the working directories in the background, so that the jobs do not wait for it.
+
+    Args:
+        concurrency (int):  Max number of directories removed at the same time
+    """
+
+    def __init__(self, concurrency):
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='workdir-reaper')
+
+    def submit(self, clean_up, name):
+        """Schedule a call of `clean_up()`, e.g. `executor.clean_up`."""
+        def run():
+            try:
+                clean_up()
+                logging.info('Removed workdir `{}`'.format(name))
+            except Exception as e:
+                logging.warning('Could not remove workdir `{}`: {}'.format(name, e))
+
+        return self._pool.submit(run)
+
+    def submit_path(self, path, lock_file=None):
+        """Schedule the removal of the directory. `lock_file` is closed after the directory has been removed."""
+        def clean_up():
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                if lock_file:
+                    lock_file.close()
+
+        return self.submit(clean_up, path)
+
+
 class Worker(object):
     """Worker main class.
 
@@ -81,8 +119,14 @@ class Worker(object):
     # Worker State update timeout
     WORKER_STATE_UPDATE_TIMEOUT = 1
 
+    # Max total size of the log tails in the worker state, the document is limited to 16 MB by MongoDB
+    MAX_LOG_TAILS_SIZE = 1024 ** 2
+
     def __init__(self, worker_config, worker_id):
         self.worker_id = worker_id if worker_id else str(uuid.uuid1())
+        self._reaper = WorkdirReaper(worker_config.cleanup_concurrency)
+        self._scratch = ScratchManager(worker_config.scratch_roots, worker_config.scratch_policy, self.worker_id)
+        self._init_scratch()
         self.node_collection_manager = plynx.db.node_collection_manager.NodeCollectionManager(collection=Collections.RUNS)
         self.run_cancellation_manager = plynx.db.run_cancellation_manager.RunCancellationManager()
         self.kinds = worker_config.kinds
@@ -102,17 +146,65 @@ class Worker(object):
 
         self._killed_run_ids = set()
 
+    def _init_scratch(self):
+        """Lock the scratch roots of the worker and sweep the workdirs left by the previous runs."""
+        self._scratch.lock()
+        for path, lock_file in self._scratch.iter_leftovers():
+            self._reaper.submit_path(path, lock_file)
+
     def serve_forever(self):
         """
         Run the worker.
         """
         self._stop_event.wait()
 
-    def execute_job(self, executor):
+    @staticmethod
+    def _finish_queue_timing(node):
+        # the run has been queued by another process: the wall clock is used instead of the monotonic one
+        queue_timing = node.timings.get(RunPhase.QUEUE)
+        if queue_timing and 'duration' not in queue_timing:
+            queue_timing['duration'] = max(0., time.time() - queue_timing['start'])
+
+    @staticmethod
+    def _estimate_workdir_size(node):
+        """Estimate the size of the workdir as the total size of the inputs.
+
+        The sizes are taken from the metadata of the resources with a single query, the storage is not accessed:
+        the resources without metadata are not counted.
+        """
+        resource_ids = [resource_id for input in node.inputs for resource_id in input.values]
+        if not resource_ids:
+            return 0
+        try:
+            id_to_metadata = get_files_metadata(set(resource_ids))
+            return sum(id_to_metadata[resource_id].get('size', 0) for resource_id in resource_ids if resource_id in id_to_metadata)
+        except Exception as e:
+            logging.warning('Could not get the sizes of the inputs: {}'.format(e))
+            return 0
+
+    def _reserve_scratch(self, node):
+        """Select the scratch root for the node.
+
+        Return:
+            (ScratchRoot, int)  Root and the reserved size
+        """
+        parameter = node.get_parameter_by_name('_scratch', throw=False)
+        size = self._estimate_workdir_size(node)
+        return self._scratch.reserve(size, parameter.value if parameter else None), size
+
+    def execute_job(self, executor, scratch_root, scratch_size):
+        executor.workdir = os.path.join(scratch_root.path, str(uuid.uuid1()))
+
+        def clean_up():
+            try:
+                executor.clean_up()
+            finally:
+                self._scratch.release(scratch_root, scratch_size)
+
         try:
             try:
+                self._finish_queue_timing(executor.node)
                 status = NodeRunningStatus.FAILED
-                executor.workdir = os.path.join('/tmp', str(uuid.uuid1()))
                 executor.init_workdir()
                 with TickThread(executor):
                     status = executor.run()
@@ -126,8 +218,6 @@ class Worker(object):
                     # This case of `except` has happened before due to I/O failure
                     logging.critical(traceback.format_exc())
                     raise
-            finally:
-                executor.clean_up()
 
             logging.info('Node {node_id} `{title}` finished with status `{status}`'.format(
                 node_id=executor.node._id,
@@ -141,24 +231,35 @@ class Worker(object):
             logging.warning('Execution failed: {}'.format(e))
             executor.node.node_running_status = NodeRunningStatus.FAILED
         finally:
-            with executor._lock:
-                executor.node.save(collection=Collections.RUNS)
-            with self._run_id_to_executor_lock:
-                del self._run_id_to_executor[executor.node._id]
+            try:
+                with executor._lock:
+                    executor.node.save(collection=Collections.RUNS)
+                with self._run_id_to_executor_lock:
+                    del self._run_id_to_executor[executor.node._id]
+            finally:
+                # the status has been saved, the workdir can be removed off the critical path
+                self._reaper.submit(clean_up, executor.workdir)
 
     def _run_db_status_update(self):
         """Syncing with the database."""
         try:
             while not self._stop_event.is_set():
+                if not self._scratch.has_free_space():
+                    logging.warning('No free scratch space, waiting for the running jobs to finish')
+                    self._stop_event.wait(timeout=Worker.SDB_STATUS_UPDATE_TIMEOUT)
+                    continue
                 node = self.node_collection_manager.pick_node(kinds=self.kinds)
                 if node:
                     logging.info('New node found: {} {} {}'.format(node['_id'], node['node_running_status'], node['title']))
                     executor = plynx.utils.executor.materialize_executor(node)
                     executor._lock = threading.Lock()
 
+                    # reserve the space before picking the next node
+                    scratch_root, scratch_size = self._reserve_scratch(executor.node)
+
                     with self._run_id_to_executor_lock:
                         self._run_id_to_executor[executor.node._id] = executor
-                    thread = threading.Thread(target=self.execute_job, args=(executor, ))
+                    thread = threading.Thread(target=self.execute_job, args=(executor, scratch_root, scratch_size))
                     thread.start()
 
                 else:
@@ -181,14 +282,23 @@ class Worker(object):
                     self._run_id_to_executor[run_id].kill()
 
                 runs = []
+                log_tails = {}
+                log_tails_size = 0
                 with self._run_id_to_executor_lock:
                     for executor in self._run_id_to_executor.values():
                         runs.append(executor.node.to_dict())
+                        run_log_tails = executor.get_log_tails()
+                        run_log_tails_size = sum(len(text) for text in run_log_tails.values())
+                        if run_log_tails and log_tails_size + run_log_tails_size <= Worker.MAX_LOG_TAILS_SIZE:
+                            log_tails[str(executor.node._id)] = run_log_tails
+                            log_tails_size += run_log_tails_size
                 worker_state = WorkerState.from_dict({
                     'worker_id': self.worker_id,
                     'host': self.host,
                     'runs': runs,
                     'kinds': self.kinds,
+                    'log_tails': log_tails,
+                    'template_cache': get_template_cache().get_stats(),
                 })
                 worker_state.save()
                 self._stop_event.wait(timeout=Worker.WORKER_STATE_UPDATE_TIMEOUT)
@@ -0,0 +1,328 @@
+"""Streaming archives of directories.
+
+Directories are packed as tar archives, optionally compressed with zstd, directly into a writable stream.
+Archives are unpacked directly from a readable stream. Legacy zip archives are still readable.
+"""
+import io
+import os
+import fnmatch
+import logging
+import zipfile
+import tarfile
+import tempfile
+from plynx.utils.common import PrefixedStream
+
+try:
+    import zstandard
+except ImportError:     # pragma: no cover
+    zstandard = None
+
+
+class Compression:
+    NONE = 'none'
+    ZSTD = 'zstd'
+
+
+class MemberType:
+    FILE = 'file'
+    DIRECTORY = 'dir'
+    SYMLINK = 'symlink'
+
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+ZIP_MAGICS = (b'PK\x03\x04', b'PK\x05\x06')
+GZIP_MAGIC = b'\x1f\x8b'
+_MAGIC_SIZE = 4
+_READ_SIZE = 8 * 1024 ** 2
+# Min size of the uncompressed data of a zstd frame. Small files share a frame, so that the compression ratio
+# and multithreaded compression are not lost
+FRAME_SIZE = 4 * 1024 ** 2
+
+
+def _read_head(file_obj, size):
+    # streams such as pipes may return fewer bytes than requested
+    head = b''
+    while len(head) < size:
+        data = file_obj.read(size - len(head))
+        if not data:
+            break
+        head += data
+    return head
+
+
+def _spool(head, file_obj, dirname=None):
+    # zip archives keep the list of files in the end: the stream has to be stored in a seekable file
+    f = tempfile.TemporaryFile(dir=dirname)
+    f.write(head)
+    for data in iter(lambda: file_obj.read(1024 ** 2), b''):
+        f.write(data)
+    f.seek(0)
+    return f
+
+
+class _CountingWriter(object):
+    """Writable stream that counts the bytes written to `file_obj`."""
+
+    def __init__(self, file_obj):
+        self._file_obj = file_obj
+        self.position = 0
+
+    def write(self, data):
+        self._file_obj.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+
+def _padded_size(size):
+    # tar stores the data in blocks
+    return (size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+
+
+def _iter_paths(path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in dirs + sorted(files):
+            full_path = os.path.join(root, name)
+            yield full_path, os.path.relpath(full_path, path)
+
+
+def pack_directory(path, file_obj, compression=Compression.ZSTD, level=3, threads=0, frame_size=FRAME_SIZE):
+    """Write a tar archive of the directory to a stream.
+
+    A compressed archive is split into zstd frames of at least `frame_size` bytes of the tar stream, ending at
+    the end of a file, so that a file can be read without decompressing the rest of the archive.
+    The concatenation of the frames is a regular `.tar.zst` stream.
+
+    Args:
+        path        (str):  Directory
+        file_obj    (file): Writable stream, does not have to be seekable
+        compression (str):  Compression, `Compression.NONE` or `Compression.ZSTD`
+        level       (int):  Compression level
+        threads     (int):  Number of compression threads. 0 means compressing in the calling thread, -1 means the number of CPUs
+        frame_size  (int):  Min size of the uncompressed data of a frame
+
+    Return:
+        (dict)  Index of the archive, see `extract_members`
+    """
+    if compression == Compression.ZSTD and zstandard is None:
+        logging.warning('`zstandard` is not installed, directory `{}` will not be compressed'.format(path))
+        compression = Compression.NONE
+    if compression not in (Compression.NONE, Compression.ZSTD):
+        raise ValueError('Unknown compression `{}`'.format(compression))
+
+    compressed_stream = _CountingWriter(file_obj)
+    writer = None
+    if compression == Compression.ZSTD:
+        writer = zstandard.ZstdCompressor(level=level, threads=threads).stream_writer(compressed_stream, closefd=False)
+    tar_stream = _CountingWriter(writer or compressed_stream)
+
+    members = []
+    # position of the current frame in the compressed and in the uncompressed streams, and its files
+    frame_offset, frame_start = 0, 0
+    frame_members = []
+
+    def flush_frame():
+        nonlocal frame_offset, frame_start
+        writer.flush(zstandard.FLUSH_FRAME)
+        for member in frame_members:
+            member['frame'] = [frame_offset, compressed_stream.position - frame_offset]
+            member['frame_data_offset'] = member['offset'] - frame_start
+        del frame_members[:]
+        frame_offset, frame_start = compressed_stream.position, tar_stream.position
+
+    # `w|` mode buffers the output, `w` mode writes the members to the stream as they are added
+    with tarfile.open(fileobj=tar_stream, mode='w') as tf:
+        for full_path, name in _iter_paths(path):
+            tf.add(full_path, arcname=name, recursive=False)
+            tarinfo = tf.members[-1]
+            member = {
+                'name': name,
+                'mode': tarinfo.mode,
+            }
+            if tarinfo.isdir():
+                member['type'] = MemberType.DIRECTORY
+            elif tarinfo.issym():
+                member['type'] = MemberType.SYMLINK
+                member['linkname'] = tarinfo.linkname
+            elif tarinfo.isfile():
+                member['type'] = MemberType.FILE
+                member['size'] = tarinfo.size
+                # data is followed by the padding to the size of the block
+                member['offset'] = tar_stream.position - _padded_size(tarinfo.size)
+                if writer:
+                    frame_members.append(member)
+                    if tar_stream.position - frame_start >= frame_size:
+                        flush_frame()
+            else:
+                # devices, fifos and hard links are not indexed
+                continue
+            members.append(member)
+    if writer:
+        # the last frame includes the end of the archive
+        flush_frame()
+
+    return {
+        'compression': compression,
+        'members': members,
+    }
+
+
+def _open_tar_stream(head, file_obj):
+    stream = PrefixedStream(head, file_obj)
+    if head.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ImportError('`zstandard` is required to read zstd archives')
+        return tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(stream), mode='r|')
+    if head.startswith(GZIP_MAGIC):
+        return tarfile.open(fileobj=stream, mode='r|gz')
+    return tarfile.open(fileobj=stream, mode='r|')
+
+
+def match_member(name, patterns):
+    """Check if the name of a member matches any of the glob patterns. A directory matches all of its members."""
+    return any(
+        fnmatch.fnmatchcase(name, pattern) or name.startswith(pattern.rstrip('/') + '/')
+        for pattern in patterns
+    )
+
+
+def _check_tar_members(members, path):
+    """Validate the members of a tar archive one by one while they are extracted to `path`.
+
+    The members and the targets of the links must be inside of `path`, taking into account the symbolic links
+    extracted before. Devices and fifos are rejected, setuid and setgid bits are dropped.
+    """
+    for member in members:
+        _safe_join(path, member.name)
+        if member.issym():
+            _safe_join(path, os.path.join(os.path.dirname(member.name), member.linkname))
+        elif member.islnk():
+            _safe_join(path, member.linkname)
+        elif not member.isfile() and not member.isdir():
+            raise ValueError('Member `{}` is not a file, a directory or a link'.format(member.name))
+        member.mode &= 0o777
+        yield member
+
+
+def extract_tar(tf, path, patterns=None):
+    """Extract a tar archive to the existing directory. The archive is not trusted, see `_check_tar_members`.
+
+    Args:
+        tf          (tarfile.TarFile):      Archive, can be a stream
+        path        (str):                  Directory
+        patterns    (list of str, None):    Extract only the members matching the patterns, see `match_member`
+    """
+    members = tf if patterns is None else (member for member in tf if match_member(member.name, patterns))
+    members = _check_tar_members(members, path)
+    if hasattr(tarfile, 'data_filter'):
+        tf.extractall(path, members=members, filter='data')
+    else:
+        tf.extractall(path, members=members)
+
+
+def unpack_directory(file_obj, path, patterns=None):
+    """Extract an archive read from a stream to the existing directory.
+
+    Args:
+        file_obj    (file):                 Readable stream, does not have to be seekable
+        path        (str):                  Directory
+        patterns    (list of str, None):    Extract only the members matching the patterns, see `match_member`
+    """
+    head = _read_head(file_obj, _MAGIC_SIZE)
+    if head.startswith(ZIP_MAGICS):
+        with _spool(head, file_obj, os.path.dirname(os.path.abspath(path))) as f, zipfile.ZipFile(f) as zf:
+            names = zf.namelist()
+            if patterns is not None:
+                names = [name for name in names if match_member(name.rstrip('/'), patterns)]
+            zf.extractall(path, members=names)
+        return
+    with _open_tar_stream(head, file_obj) as tf:
+        extract_tar(tf, path, patterns)
+
+
+def _safe_join(path, name):
+    """Join the name of a member to `path`. The symbolic links that already exist in `path` are resolved."""
+    root = os.path.realpath(path)
+    target = os.path.realpath(os.path.join(root, name))
+    if os.path.isabs(name) or os.path.commonpath([root, target]) != root:
+        raise ValueError('Member `{}` is outside of the directory'.format(name))
+    return target
+
+
+def _copy_range(read_range, offset, size, file_obj):
+    end = offset + size
+    while offset < end:
+        data = read_range(offset, min(_READ_SIZE, end - offset))
+        if not data:
+            raise IOError('Unexpected end of the archive')
+        file_obj.write(data)
+        offset += len(data)
+
+
+def _copy_frame(frame, member, file_obj):
+    reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(frame))
+    # skip the header of the member
+    _read_head(reader, member['frame_data_offset'])
+    size = member['size']
+    while size > 0:
+        data = reader.read(min(_READ_SIZE, size))
+        if not data:
+            raise IOError('Unexpected end of the archive')
+        file_obj.write(data)
+        size -= len(data)
+
+
+def extract_members(index, read_range, path, patterns):
+    """Extract the members of an indexed archive using ranged reads, the rest of the archive is not read.
+
+    Args:
+        index       (dict):         Index of the archive returned by `pack_directory`.
+                                    Members are the dicts with `name`, `type` and `mode`. Files have `size` and `offset`
+                                    of the data in the tar stream. Files of compressed archives have `frame`, i.e.
+                                    `[offset, size]` of the zstd frame, and `frame_data_offset` of the data in it.
+                                    Files can share a frame.
+        read_range  (function):     Callable `(offset, length) -> bytes` reading the archive
+        path        (str):          Existing directory
+        patterns    (list of str):  Glob patterns, see `match_member`
+    """
+    # the files of a frame are consecutive, the last frame is kept
+    frame_range, frame = None, None
+    for member in index['members']:
+        if not match_member(member['name'], patterns):
+            continue
+        target = _safe_join(path, member['name'])
+        if member['type'] == MemberType.DIRECTORY:
+            os.makedirs(target, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if member['type'] == MemberType.SYMLINK:
+            _safe_join(path, os.path.join(os.path.dirname(member['name']), member['linkname']))
+            os.symlink(member['linkname'], target)
+            continue
+        with open(target, 'wb') as f:
+            if 'frame' in member:
+                if zstandard is None:
+                    raise ImportError('`zstandard` is required to read zstd archives')
+                if member['frame'] != frame_range:
+                    frame_range, frame = member['frame'], read_range(*member['frame'])
+                _copy_frame(frame, member, f)
+            else:
+                _copy_range(read_range, member['offset'], member['size'], f)
+        os.chmod(target, member['mode'] & 0o777)
+
+
+def list_directory(file_obj):
+    """List the files of an archive read from a stream.
+
+    Return:
+        (list of str)   Relative paths of the members
+    """
+    head = _read_head(file_obj, _MAGIC_SIZE)
+    if head.startswith(ZIP_MAGICS):
+        with _spool(head, file_obj) as f, zipfile.ZipFile(f) as zf:
+            return zf.namelist()
+    with _open_tar_stream(head, file_obj) as tf:
+        return [member.name + ('/' if member.isdir() else '') for member in tf]
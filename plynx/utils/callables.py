@@ -0,0 +1,148 @@
+"""Python callables called in a pool of processes.
+
+The callable is referenced by its import path, i.e. `my_package.my_module.my_function`, and must be decorated
+with `plynx_callable` in one of the modules imported by the pool, see `callables.modules` in the config.
+`PythonCallable` operations call it with keyword arguments `inputs`, `outputs`, `params` and `logs`,
+the same dictionaries that are available in BashJinja2 templates:
+
+    @plynx_callable
+    def count_lines(inputs, outputs, params, logs):
+        with open(inputs['data']) as fin, open(outputs['count'], 'w') as fout:
+            fout.write(str(sum(1 for _ in fin)))
+
+The processes are reused, so that the cost of starting the interpreter and importing the modules is paid once.
+The module does not depend on the config, so that the processes import only the modules of the callables.
+The paths given by the users are never imported: they are looked up among the registered callables.
+"""
+import os
+import sys
+import importlib
+import threading
+import traceback
+import multiprocessing
+from contextlib import redirect_stdout, redirect_stderr
+
+# Import path to the callables registered by `plynx_callable` in the modules imported by the process
+_registry = {}
+
+
+def plynx_callable(func):
+    """Register the function so that it can be called by `PythonCallable` operations."""
+    _registry['{}.{}'.format(func.__module__, func.__qualname__)] = func
+    return func
+
+
+def _locate_callable(path):
+    func = _registry.get(path)
+    if func is None:
+        raise LookupError('`{}` is not registered with `plynx_callable` in the configured modules'.format(path))
+    return func
+
+
+def _serve(conn, modules):
+    """Main loop of the process of the pool: call the callables until the connection is closed."""
+    import_error = None
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except BaseException as e:
+            import_error = 'Could not import `{}`: {}: {}'.format(module, type(e).__name__, e)
+    while True:
+        try:
+            path, kwargs, workdir, stdout_filename, stderr_filename = conn.recv()
+        except EOFError:
+            return
+        with open(stdout_filename, 'a') as stdout_file, open(stderr_filename, 'a') as stderr_file, \
+                redirect_stdout(stdout_file), redirect_stderr(stderr_file):
+            error = None
+            try:
+                if import_error:
+                    raise ImportError(import_error)
+                os.chdir(workdir)
+                _locate_callable(path)(**kwargs)
+            except BaseException as e:
+                traceback.print_exc()
+                error = '{}: {}'.format(type(e).__name__, e)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+        conn.send(error)
+
+
+class _CallableProcess(object):
+    def __init__(self, context, modules):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn, modules), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, path, kwargs, workdir, stdout_filename, stderr_filename, timeout=None):
+        """Call the callable in the process.
+
+        Return:
+            (str, None)     Error message, None if the call succeeded
+        """
+        self.conn.send((path, kwargs, workdir, stdout_filename, stderr_filename))
+        if not self.conn.poll(timeout):
+            self.terminate()
+            raise Exception('Timeout of {} seconds exceeded, the process has been killed'.format(timeout))
+        try:
+            return self.conn.recv()
+        except EOFError:
+            raise Exception('The process has exited with code {}'.format(self.process.exitcode))
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def terminate(self):
+        self.process.terminate()
+        self.process.join()
+
+    def close(self):
+        self.conn.close()
+
+
+class CallableProcessPool(object):
+    """Pool of the processes calling the callables, one call at a time per process.
+
+    Args:
+        max_processes   (int):          Max number of processes
+        modules         (list of str):  Modules imported by the processes, only their callables can be called
+    """
+
+    def __init__(self, max_processes, modules):
+        self.max_processes = max_processes
+        self.modules = list(modules)
+        # the processes must not inherit the threads and the locks of the worker
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = []
+        self._num_processes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while not self._idle and self._num_processes >= self.max_processes:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._num_processes += 1
+        try:
+            return _CallableProcess(self._context, self.modules)
+        except Exception:
+            self._discard()
+            raise
+
+    def release(self, process):
+        if not process.is_alive():
+            # killed or crashed
+            process.close()
+            self._discard()
+            return
+        with self._condition:
+            self._idle.append(process)
+            self._condition.notify()
+
+    def _discard(self):
+        with self._condition:
+            self._num_processes -= 1
+            self._condition.notify()
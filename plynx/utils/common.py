@@ -35,6 +35,31 @@ def zipdir(path, zf):
             zf.write(os.path.join(root, file), arcname)
 
 
+class PrefixedStream(object):
+    """Read-only stream of `prefix` followed by the rest of `file_obj`."""
+
+    def __init__(self, prefix, file_obj):
+        self._prefix = prefix
+        self._file_obj = file_obj
+        self._position = 0
+
+    def read(self, size=-1):
+        if self._position < len(self._prefix):
+            end = len(self._prefix) if size is None or size < 0 else min(len(self._prefix), self._position + size)
+            data = self._prefix[self._position:end]
+            if size is None or size < 0:
+                data += self._file_obj.read()
+            elif len(data) < size:
+                data += self._file_obj.read(size - len(data))
+        else:
+            data = self._file_obj.read(size)
+        self._position += len(data)
+        return data
+
+    def tell(self):
+        return self._position
+
+
 def parse_search_string(search_string):
     found_matches = re.findall(SEARCH_RGX, search_string)
     search_parameters = dict([match.split(':') for match in found_matches])
@@ -9,9 +9,14 @@ DEFAULT_ICON = 'feathericons.x-square'
 DEFAULT_COLOR = '#ffffff'
 _config = None
 
-WorkerConfig = namedtuple('WorkerConfig', ['kinds'])
+WorkerConfig = namedtuple('WorkerConfig', ['kinds', 'scratch_roots', 'scratch_policy', 'cleanup_concurrency'])
+ScratchRootConfig = namedtuple('ScratchRootConfig', ['name', 'path', 'quota', 'min_free'])
 MongoConfig = namedtuple('MongoConfig', ['user', 'password', 'host', 'port'])
-StorageConfig = namedtuple('StorageConfig', ['scheme', 'prefix', 'credential_path'])
+StorageConfig = namedtuple('StorageConfig', ['scheme', 'prefix', 'credential_path', 'part_size', 'concurrency', 'inline_threshold'])
+ArchiveConfig = namedtuple('ArchiveConfig', ['compression', 'level', 'threads'])
+PodPoolConfig = namedtuple('PodPoolConfig', ['enabled', 'min_size', 'max_size', 'idle_ttl', 'lifetime'])
+DirectTransferConfig = namedtuple('DirectTransferConfig', ['enabled', 'image', 'config_map'])
+CallablesConfig = namedtuple('CallablesConfig', ['modules'])
 AuthConfig = namedtuple('AuthConfig', ['secret_key'])
 WebConfig = namedtuple('WebConfig', ['host', 'port', 'endpoint', 'debug'])
 DemoConfig = namedtuple('DemoConfig', ['enabled', 'kind', 'template_id'])
@@ -54,6 +59,22 @@ def __init__():
 def get_worker_config():
     return WorkerConfig(
         kinds=(_config.get('worker', {}).get('kinds', [])),
+        scratch_roots=[
+            ScratchRootConfig(
+                name=scratch_root['name'],
+                path=scratch_root['path'],
+                quota=int(scratch_root.get('quota', 0)),
+                min_free=int(scratch_root.get('min_free', 0)),
+            )
+            for scratch_root in _config.get('worker', {}).get('scratch_roots', [
+                {
+                    'name': 'default',
+                    'path': os.path.join('/tmp', 'plx-workdirs'),
+                }
+            ])
+        ],
+        scratch_policy=_config.get('worker', {}).get('scratch_policy', 'first_fit'),
+        cleanup_concurrency=int(_config.get('worker', {}).get('cleanup_concurrency', 2)),
     )
 
 
@@ -74,6 +95,43 @@ def get_storage_config():
             os.path.join(os.path.expanduser("~"), 'plynx', 'data')
         ),
         credential_path=_config.get('storage', {}).get('credential_path', None),
+        part_size=int(_config.get('storage', {}).get('part_size', 8 * 1024 ** 2)),
+        concurrency=int(_config.get('storage', {}).get('concurrency', 10)),
+        inline_threshold=int(_config.get('storage', {}).get('inline_threshold', 16 * 1024)),
+    )
+
+
+def get_archive_config():
+    return ArchiveConfig(
+        compression=_config.get('archive', {}).get('compression', 'zstd'),
+        level=int(_config.get('archive', {}).get('level', 3)),
+        threads=int(_config.get('archive', {}).get('threads', -1)),
+    )
+
+
+def get_pod_pool_config():
+    pod_pool = _config.get('kubernetes', {}).get('pod_pool', {})
+    return PodPoolConfig(
+        enabled=bool(pod_pool.get('enabled', False)),
+        min_size=int(pod_pool.get('min_size', 0)),
+        max_size=int(pod_pool.get('max_size', 4)),
+        idle_ttl=int(pod_pool.get('idle_ttl', 300)),
+        lifetime=int(pod_pool.get('lifetime', 24 * 60 * 60)),
+    )
+
+
+def get_direct_transfer_config():
+    direct_transfer = _config.get('kubernetes', {}).get('direct_transfer', {})
+    return DirectTransferConfig(
+        enabled=bool(direct_transfer.get('enabled', False)),
+        image=direct_transfer.get('image', 'plynx/plynx'),
+        config_map=direct_transfer.get('config_map', 'plynx-config'),
+    )
+
+
+def get_callables_config():
+    return CallablesConfig(
+        modules=list(_config.get('callables', {}).get('modules', [])),
     )
 
 
@@ -13,6 +13,8 @@ def init_indexes():
 
     _db[Collections.NODE_CACHE].create_index('key', unique=True)
 
+    _db[Collections.RESOURCES].create_index('run_id')
+
     _db[Collections.TEMPLATES].create_index('insertion_date')
     _db[Collections.TEMPLATES].create_index([
         ('starred', pymongo.DESCENDING),
@@ -1,26 +1,461 @@
 import io
+import os
+import codecs
+import logging
+import json
 import uuid
+import hashlib
+import datetime
+import tempfile
+import threading
+from plynx.constants import Collections
+from plynx.utils.common import PrefixedStream
+from plynx.utils.db_connector import get_db_connector
 from plynx.utils.remote import get_driver
 
+# Segmented resources are represented by a manifest object with the list of segments.
+# They are used for the files that grow over time, such as logs: only new bytes are uploaded.
+SEGMENTED_SUFFIX = '.segments'
 
-def get_file_stream(file_path, preview=False, file_type=None):
+# Inline resources are small enough to be stored in the database instead of the storage.
+INLINE_SUFFIX = '.inline'
+
+# Indexes are stored next to the resources, they are referred by the metadata
+INDEX_SUFFIX = '.index'
+
+DIGEST_ALGORITHM = 'sha256'
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+# Number of the first bytes used to guess the content type
+_CONTENT_TYPE_SNIFF_SIZE = 512
+_MAGIC_CONTENT_TYPES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'\x28\xb5\x2f\xfd', 'application/zstd'),
+]
+
+
+def is_segmented(file_path):
+    return file_path.endswith(SEGMENTED_SUFFIX)
+
+
+def is_inline(file_path):
+    return file_path.endswith(INLINE_SUFFIX)
+
+
+def _get_inline_data(file_path):
+    blob = get_db_connector()[Collections.RESOURCE_BLOBS].find_one({'_id': file_path})
+    if blob is None:
+        raise IOError('Resource `{}` does not exist'.format(file_path))
+    return bytes(blob['data'])
+
+
+class _HashingStream(object):
+    """Read-only stream that computes the size and the digest of the data read from `file_obj`."""
+
+    def __init__(self, file_obj):
+        self._file_obj = file_obj
+        self.hash = hashlib.new(DIGEST_ALGORITHM)
+        self.size = 0
+        self.head = b''
+
+    def read(self, size=-1):
+        data = self._file_obj.read(size)
+        self.hash.update(data)
+        self.size += len(data)
+        if len(self.head) < _CONTENT_TYPE_SNIFF_SIZE:
+            self.head += data[:_CONTENT_TYPE_SNIFF_SIZE - len(self.head)]
+        return data
+
+
+def _guess_content_type(head):
+    for magic, content_type in _MAGIC_CONTENT_TYPES:
+        if head.startswith(magic):
+            return content_type
+    if b'\x00' in head:
+        return DEFAULT_CONTENT_TYPE
+    try:
+        # the last multibyte character might be cut off in the head
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=len(head) < _CONTENT_TYPE_SNIFF_SIZE)
+    except UnicodeDecodeError:
+        return DEFAULT_CONTENT_TYPE
+    return 'text/plain'
+
+
+def _save_metadata(file_path, hashing_stream, metadata):
+    metadata_dict = dict(metadata or {})
+    metadata_dict.update({
+        '_id': file_path,
+        'size': hashing_stream.size,
+        'digest': '{}:{}'.format(DIGEST_ALGORITHM, hashing_stream.hash.hexdigest()),
+        'content_type': _guess_content_type(hashing_stream.head),
+        'insertion_date': datetime.datetime.utcnow(),
+    })
+    try:
+        get_db_connector()[Collections.RESOURCES].replace_one({'_id': file_path}, metadata_dict, upsert=True)
+    except Exception as e:
+        # metadata is an index: the resource is usable without it
+        logging.warning('Could not save metadata of `{}`: {}'.format(file_path, e))
+
+
+def get_file_metadata(file_path):
+    """Get the metadata of the resource without reading its content.
+
+    Return:
+        (dict)  Fields `size`, `digest`, `content_type`, `file_type`, `run_id` and `node_id`.
+                Resources uploaded before the metadata was introduced have only `size`.
+    """
+    metadata = get_db_connector()[Collections.RESOURCES].find_one({'_id': file_path})
+    if metadata is None:
+        metadata = {'_id': file_path, 'size': get_file_size(file_path)}
+    return metadata
+
+
+def get_files_metadata(file_paths):
+    """Get the metadata of multiple resources with a single query.
+
+    Return:
+        (dict)  Path of the resource to its metadata, see `get_file_metadata`.
+                Resources without metadata, i.e. uploaded before it was introduced, are missing
+    """
+    return {
+        metadata['_id']: metadata
+        for metadata in get_db_connector()[Collections.RESOURCES].find({'_id': {'$in': list(file_paths)}})
+    }
+
+
+def _get_segments(file_path):
+    """Get the list of segments of a segmented resource.
+
+    Return:
+        (list)  List of pairs `[segment_path, size]`
+    """
     content = get_driver().get_contents_handler(file_path)
+    manifest_stream = io.BytesIO()
+    content.get_contents_to_file(manifest_stream)
+    return json.loads(manifest_stream.getvalue().decode('utf-8'))['segments']
+
+
+def _put_segments(file_path, segments):
+    content = get_driver().get_contents_handler(file_path)
+    content.set_contents_from_file(io.BytesIO(json.dumps({'segments': segments}).encode('utf-8')))
+
+
+def download_file(file_path, file_obj):
+    """Write the content of the resource to a writable stream `file_obj`."""
+    if is_inline(file_path):
+        file_obj.write(_get_inline_data(file_path))
+    elif is_segmented(file_path):
+        for segment_path, _ in _get_segments(file_path):
+            get_driver().get_contents_handler(segment_path).get_contents_to_file(file_obj)
+    else:
+        get_driver().get_contents_handler(file_path).get_contents_to_file(file_obj)
+
+
+def get_file_stream(file_path, preview=False, file_type=None):
     content_stream = io.BytesIO()
-    content.get_contents_to_file(content_stream)
+    download_file(file_path, content_stream)
     content_stream.seek(0)
     return content_stream
 
 
-def upload_file_stream(fp, file_path=None, seek=True):
+def stream_download(file_path, read):
+    """Read the resource as a stream without storing it in memory or on disk.
+
+    The resource is downloaded to a pipe in a background thread.
+
+    Args:
+        file_path   (str):      Resource
+        read        (function): Callable `(file_obj) -> result` consuming the stream
+
+    Return:
+        Result of `read`
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def download():
+        try:
+            with open(write_fd, 'wb') as f:
+                download_file(file_path, f)
+        except BrokenPipeError:
+            # the reader stopped reading
+            pass
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=download)
+    thread.daemon = True
+    thread.start()
+    try:
+        with open(read_fd, 'rb') as f:
+            return read(f)
+    finally:
+        thread.join()
+        if errors:
+            # the reader could have failed because of the truncated stream
+            raise IOError('Failed to download `{}`: {}'.format(file_path, errors[0]))
+
+
+def stream_upload(write, metadata=None):
+    """Upload a new resource produced as a stream without storing it in memory or on disk.
+
+    The resource is uploaded from a pipe in a background thread.
+
+    Args:
+        write       (function):     Callable `(file_obj) -> None` producing the stream
+        metadata    (dict, None):   Extra metadata of the resource, see `upload_file_stream`
+
+    Return:
+        (str)   Path of the resource
+    """
+    read_fd, write_fd = os.pipe()
+    result = {}
+
+    def upload():
+        try:
+            with open(read_fd, 'rb') as f:
+                result['file_path'] = upload_file_stream(f, seek=False, metadata=metadata)
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=upload)
+    thread.daemon = True
+    thread.start()
+    try:
+        with open(write_fd, 'wb') as f:
+            write(f)
+    except BrokenPipeError:
+        # the upload has failed, the error is raised below
+        pass
+    except Exception:
+        thread.join()
+        # the truncated resource has been uploaded
+        if 'file_path' in result:
+            remove(result['file_path'])
+        raise
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result['file_path']
+
+
+def materialize_file(file_path, local_path, allow_symlink=True, allow_link=True):
+    """Make the resource available as a local file `local_path`.
+
+    Drivers may avoid copying the data, i.e. `file` driver will try to clone the object.
+    """
+    if is_segmented(file_path) or is_inline(file_path):
+        with open(local_path, 'wb') as f:
+            download_file(file_path, f)
+    else:
+        get_driver().get_contents_handler(file_path).materialize(
+            local_path,
+            allow_symlink=allow_symlink,
+            allow_link=allow_link,
+        )
+
+
+def get_file_range(file_path, offset=0, length=None):
+    """Read `length` bytes of the resource starting from `offset` without downloading the rest of it."""
+    if is_inline(file_path):
+        return _get_inline_data(file_path)[offset:None if length is None else offset + length]
+    if not is_segmented(file_path):
+        return get_driver().get_contents_handler(file_path).read_range(offset, length)
+
+    res = []
+    segment_offset = 0
+    for segment_path, size in _get_segments(file_path):
+        if length is not None and length <= 0:
+            break
+        if offset < segment_offset + size:
+            data = get_driver().get_contents_handler(segment_path).read_range(max(0, offset - segment_offset), length)
+            res.append(data)
+            if length is not None:
+                length -= len(data)
+        segment_offset += size
+    return b''.join(res)
+
+
+def get_file_size(file_path):
+    if is_inline(file_path):
+        return len(_get_inline_data(file_path))
+    if is_segmented(file_path):
+        return sum(size for _, size in _get_segments(file_path))
+    return get_driver().get_contents_handler(file_path).size()
+
+
+def upload_file_stream(fp, file_path=None, seek=True, metadata=None):
+    """Upload the content of the stream `fp`.
+
+    Args:
+        fp          (file):         Readable stream
+        file_path   (str, None):    Path of the resource. If None, a new one will be created:
+                                    resources not larger than `inline_threshold` of the driver are stored in the database,
+                                    metadata of the resource is saved in `resources` collection
+        seek        (bool):         Rewind `fp` before reading. Must be False if `fp` is not seekable
+        metadata    (dict, None):   Extra metadata of a new resource, such as `file_type`, `run_id` and `node_id`
+
+    Return:
+        (str)   Path of the resource
+    """
     if seek:
         fp.seek(0)
-    if file_path is None:
+    if file_path is not None:
+        get_driver().get_contents_handler(file_path).set_contents_from_file(fp)
+        return file_path
+
+    # size and digest are computed while the data is being uploaded
+    hashing_stream = _HashingStream(fp)
+    inline_threshold = get_driver().inline_threshold
+    head = hashing_stream.read(inline_threshold + 1) if inline_threshold > 0 else b''
+    if inline_threshold > 0 and len(head) <= inline_threshold:
+        file_path = '{}{}'.format(uuid.uuid1(), INLINE_SUFFIX)
+        get_db_connector()[Collections.RESOURCE_BLOBS].insert_one({'_id': file_path, 'data': head})
+    else:
         file_path = str(uuid.uuid1())
-    content = get_driver().get_contents_handler(file_path)
-    content.set_contents_from_file(fp)
+        get_driver().get_contents_handler(file_path).set_contents_from_file(PrefixedStream(head, hashing_stream))
+    _save_metadata(file_path, hashing_stream, metadata)
+    return file_path
+
+
+def append_file_stream(data, file_path=None, segments=None):
+    """Append bytes to a segmented resource.
+
+    Args:
+        data        (bytes):        New bytes
+        file_path   (str, None):    Segmented resource. If None, a new one will be created
+        segments    (list, None):   Segments of the resource kept by the caller between the appends, updated in place.
+                                    If empty, the manifest is read from the storage
+
+    Return:
+        (str)   Path of the segmented resource
+    """
+    if segments is None:
+        segments = []
+    if file_path is None:
+        file_path = '{}{}'.format(uuid.uuid1(), SEGMENTED_SUFFIX)
+        del segments[:]
+    elif not segments:
+        segments.extend(_get_segments(file_path))
+    segment_path = '{}.{}'.format(file_path, len(segments))
+    upload_file_stream(io.BytesIO(data), segment_path)
+    segments.append([segment_path, len(data)])
+    # segment is uploaded before the manifest so that readers always see complete segments
+    _put_segments(file_path, segments)
     return file_path
 
 
+def compact_file(file_path, metadata=None):
+    """Merge the segments of a segmented resource into a single segment and save the metadata of the resource.
+
+    The path of the resource does not change, the readers fetch the manifest and a single segment afterwards.
+
+    Args:
+        file_path   (str):          Segmented resource
+        metadata    (dict, None):   Extra metadata of the resource, see `upload_file_stream`
+
+    Return:
+        (str)   Path of the resource
+    """
+    if not is_segmented(file_path):
+        return file_path
+    segments = _get_segments(file_path)
+    # the name is unique, the appends after the compaction name the segments by their number
+    segment_path = '{}.{}'.format(file_path, uuid.uuid1())
+    with tempfile.TemporaryFile() as f:
+        for old_segment_path, _ in segments:
+            get_driver().get_contents_handler(old_segment_path).get_contents_to_file(f)
+        f.seek(0)
+        hashing_stream = _HashingStream(f)
+        get_driver().get_contents_handler(segment_path).set_contents_from_file(hashing_stream)
+    # the manifest is replaced before the old segments are removed
+    _put_segments(file_path, [[segment_path, hashing_stream.size]])
+    for failed_path in get_driver().remove_batch([old_segment_path for old_segment_path, _ in segments]):
+        logging.warning('Could not remove segment `{}`'.format(failed_path))
+    _save_metadata(file_path, hashing_stream, metadata)
+    return file_path
+
+
+def put_file_index(file_path, index):
+    """Store an index of the resource next to it, i.e. the list of members of an archive.
+
+    Args:
+        file_path   (str):  Resource
+        index       (dict): JSON-serializable index
+    """
+    index_path = '{}{}'.format(file_path, INDEX_SUFFIX)
+    upload_file_stream(io.BytesIO(json.dumps(index).encode('utf-8')), index_path)
+    get_db_connector()[Collections.RESOURCES].update_one({'_id': file_path}, {'$set': {'index': index_path}}, upsert=True)
+
+
+def get_file_index(file_path):
+    """Get the index of the resource.
+
+    Return:
+        (dict, None)    Index stored by `put_file_index` or None if the resource has no index
+    """
+    metadata = get_db_connector()[Collections.RESOURCES].find_one({'_id': file_path}, {'index': 1})
+    if not metadata or not metadata.get('index'):
+        return None
+    return json.loads(get_file_stream(metadata['index']).getvalue().decode('utf-8'))
+
+
+def _get_index_paths(file_paths):
+    """Get the mapping from the paths of the indexes to the paths of the resources."""
+    return {
+        metadata['index']: metadata['_id']
+        for metadata in get_db_connector()[Collections.RESOURCES].find(
+            {'_id': {'$in': list(file_paths)}, 'index': {'$exists': True}},
+            {'index': 1},
+        )
+    }
+
+
 def remove(file_path):
+    for index_path in _get_index_paths([file_path]):
+        get_driver().get_contents_handler(index_path).remove()
+    get_db_connector()[Collections.RESOURCES].delete_one({'_id': file_path})
+    if is_inline(file_path):
+        get_db_connector()[Collections.RESOURCE_BLOBS].delete_one({'_id': file_path})
+        return
+    if is_segmented(file_path):
+        for segment_path, _ in _get_segments(file_path):
+            get_driver().get_contents_handler(segment_path).remove()
     content = get_driver().get_contents_handler(file_path)
     content.remove()
+
+
+def remove_batch(file_paths):
+    """Remove multiple resources using batch operations of the driver.
+
+    Return:
+        (list of str)   Paths that failed to be removed
+    """
+    index_paths = _get_index_paths(file_paths)
+    paths = list(index_paths.keys())
+    inline_paths = []
+    for file_path in file_paths:
+        if is_inline(file_path):
+            inline_paths.append(file_path)
+            continue
+        if is_segmented(file_path):
+            try:
+                paths.extend(segment_path for segment_path, _ in _get_segments(file_path))
+            except Exception as e:
+                # the manifest might have been removed already
+                logging.warning('Could not read segments of `{}`: {}'.format(file_path, e))
+        paths.append(file_path)
+    if inline_paths:
+        get_db_connector()[Collections.RESOURCE_BLOBS].delete_many({'_id': {'$in': inline_paths}})
+    # failures to remove an index are reported as the failures of its resource
+    failed_paths = sorted({index_paths.get(path, path) for path in (get_driver().remove_batch(paths) if paths else [])})
+    failed_paths_set = set(failed_paths)
+    get_db_connector()[Collections.RESOURCES].delete_many(
+        {'_id': {'$in': [file_path for file_path in file_paths if file_path not in failed_paths_set]}}
+    )
+    return failed_paths
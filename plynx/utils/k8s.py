@@ -0,0 +1,479 @@
+"""Operations on the pods through the websocket exec API of `kubernetes.client.CoreV1Api`.
+
+Files are copied with tar running in the pod, as `kubectl cp` does. The archives are base64-encoded because the
+channels of the client are text. The input of the process ends with a terminator line, because the client
+cannot close stdin of the process.
+"""
+import os
+import copy
+import time
+import queue
+import shlex
+import base64
+import shutil
+import logging
+import tarfile
+import threading
+import kubernetes
+from kubernetes.stream import stream
+from plynx.utils.archive import extract_tar
+
+# Seconds to wait for the new frames
+STREAM_UPDATE_TIMEOUT = 1
+# base64 line: the size is a multiple of 4, i.e. it decodes to complete bytes
+_LINE_SIZE = 76
+_LINES_PER_WRITE = 1024
+_END_OF_INPUT = 'PLYNX-END-OF-INPUT'
+# Read base64 lines from stdin until the terminator line
+_READ_INPUT = "sed -n '/^{}$/q;p' | base64 -d".format(_END_OF_INPUT)
+
+
+class _Base64Writer(object):
+    """Writable binary stream sending base64 lines to stdin of the process."""
+
+    def __init__(self, resp):
+        self._resp = resp
+        self._buffer = bytearray()
+        self._chunk_size = _LINE_SIZE // 4 * 3 * _LINES_PER_WRITE
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_size:
+            self._send(len(self._buffer) // self._chunk_size * self._chunk_size)
+        return len(data)
+
+    def _send(self, size):
+        encoded = base64.b64encode(bytes(self._buffer[:size])).decode('ascii')
+        del self._buffer[:size]
+        self._resp.write_stdin(''.join(
+            encoded[i:i + _LINE_SIZE] + '\n' for i in range(0, len(encoded), _LINE_SIZE)
+        ))
+
+    def close(self):
+        if self._buffer:
+            self._send(len(self._buffer))
+        self._resp.write_stdin(_END_OF_INPUT + '\n')
+
+
+class _Base64Reader(object):
+    """Decode base64 text received in chunks and write the bytes to `file_obj`."""
+
+    def __init__(self, file_obj):
+        self._file_obj = file_obj
+        self._pending = ''
+
+    def write(self, text):
+        self._pending += ''.join(text.split())
+        size = len(self._pending) // 4 * 4
+        if size:
+            self._file_obj.write(base64.b64decode(self._pending[:size]))
+            self._pending = self._pending[size:]
+
+    def close(self):
+        if self._pending:
+            raise IOError('Truncated base64 stream')
+
+
+def _drain(resp, write_stdout, write_stderr):
+    if resp.peek_stdout():
+        data = resp.read_stdout()
+        if write_stdout:
+            write_stdout(data)
+    if resp.peek_stderr():
+        data = resp.read_stderr()
+        if write_stderr:
+            write_stderr(data)
+    # the client keeps a copy of the whole output for `read_all`, drop it. `read_all` itself cannot be used: it drops
+    # the frames of the other channels as well
+    resp._all = resp._all.__class__()
+
+
+def _get_stream_api(api):
+    # `stream` replaces the transport of the client for the duration of the call, use a copy of the client in order
+    # not to affect the concurrent calls of the shared one
+    return kubernetes.client.CoreV1Api(copy.copy(api.api_client))
+
+
+def exec_in_pod(api, namespace, name, command, write_stdout=None, write_stderr=None, write_stdin=None, container=None):
+    """Run the command in the pod, the output is passed to the callbacks as it arrives.
+
+    Args:
+        api             (CoreV1Api):        Client
+        namespace       (str):              Namespace of the pod
+        name            (str):              Name of the pod
+        command         (list of str):      Command
+        write_stdout    (function, None):   Callable `(str) -> None` consuming stdout
+        write_stderr    (function, None):   Callable `(str) -> None` consuming stderr
+        write_stdin     (function, None):   Callable `(resp) -> None` writing stdin with `resp.write_stdin`
+        container       (str, None):        Container, required if the pod has more than one
+
+    Return:
+        (int)   Exit code
+    """
+    kwargs = {'container': container} if container else {}
+    resp = stream(
+        _get_stream_api(api).connect_get_namespaced_pod_exec,
+        name,
+        namespace,
+        command=command,
+        stdin=write_stdin is not None,
+        stdout=True,
+        stderr=True,
+        tty=False,
+        _preload_content=False,
+        **kwargs
+    )
+    try:
+        if write_stdin:
+            write_stdin(resp)
+        while resp.is_open():
+            resp.update(timeout=STREAM_UPDATE_TIMEOUT)
+            _drain(resp, write_stdout, write_stderr)
+        _drain(resp, write_stdout, write_stderr)
+        try:
+            return resp.returncode
+        except Exception:
+            raise Exception('Connection to pod `{}` has been closed without the exit code'.format(name))
+    finally:
+        resp.close()
+
+
+def copy_to_pod(api, namespace, name, local_path, remote_path, write_log=None, container=None):
+    """Copy a file or a directory to the pod.
+
+    Args:
+        local_path      (str):              File or directory
+        remote_path     (str):              Absolute path in the pod
+        write_log       (function, None):   Callable `(str) -> None` consuming the output of tar
+
+    Return:
+        (int)   Exit code of tar
+    """
+    def write_stdin(resp):
+        writer = _Base64Writer(resp)
+        with tarfile.open(fileobj=writer, mode='w|') as tf:
+            tf.add(local_path, arcname=remote_path.lstrip('/'))
+        writer.close()
+
+    return exec_in_pod(
+        api, namespace, name,
+        ['sh', '-c', '{} | tar xf - -C /'.format(_READ_INPUT)],
+        write_stdout=write_log,
+        write_stderr=write_log,
+        write_stdin=write_stdin,
+        container=container,
+    )
+
+
+def copy_from_pod(api, namespace, name, remote_paths, local_dir, write_log=None, container=None):
+    """Copy files and directories from the pod. The existing local ones with the same names are replaced.
+
+    Args:
+        remote_paths    (list of str):      Absolute paths in the same directory of the pod
+        local_dir       (str):              Existing directory
+        write_log       (function, None):   Callable `(str) -> None` consuming stderr of tar
+
+    Return:
+        (int)   Exit code of tar
+    """
+    dirnames = set(os.path.dirname(remote_path) for remote_path in remote_paths)
+    if len(dirnames) != 1:
+        raise ValueError('The paths must be in the same directory')
+    basenames = [os.path.basename(remote_path) for remote_path in remote_paths]
+
+    for basename in basenames:
+        local_path = os.path.join(local_dir, basename)
+        if os.path.isdir(local_path) and not os.path.islink(local_path):
+            shutil.rmtree(local_path)
+        elif os.path.lexists(local_path):
+            os.remove(local_path)
+
+    # a single archive for all of the paths
+    command = 'tar cf - -C {} {} | base64'.format(
+        shlex.quote(dirnames.pop()),
+        ' '.join(shlex.quote(basename) for basename in basenames),
+    )
+
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def extract():
+        try:
+            with open(read_fd, 'rb') as f:
+                if not f.peek(1):
+                    # none of the paths exist
+                    return
+                # the files are produced by the code of the user
+                with tarfile.open(fileobj=f, mode='r|') as tf:
+                    extract_tar(tf, local_dir)
+                # read the end of the stream, otherwise the writer would get EPIPE
+                for _ in iter(lambda: f.read(1024 ** 2), b''):
+                    pass
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=extract)
+    thread.daemon = True
+    thread.start()
+    try:
+        with open(write_fd, 'wb') as f:
+            reader = _Base64Reader(f)
+            returncode = exec_in_pod(
+                api, namespace, name,
+                ['sh', '-c', command],
+                write_stdout=reader.write,
+                write_stderr=write_log,
+                container=container,
+            )
+            reader.close()
+    finally:
+        thread.join()
+    if errors:
+        raise IOError('Failed to copy from pod `{}`: {}'.format(name, errors[0]))
+    return returncode
+
+
+def delete_pod(api, namespace, name):
+    api.delete_namespaced_pod(name, namespace, grace_period_seconds=0)
+
+
+class PodWatcher(object):
+    """Watch of the pods with the label in the namespace, the events are dispatched to the queues of the pods.
+
+    The pods are listed whenever the watch is (re)started, so that the subscribers get the latest state of the pods even
+    if the events have been missed.
+
+    Args:
+        api             (CoreV1Api):    Client
+        namespace       (str):          Namespace
+        label_selector  (str):          Selector of the pods, e.g. `plynx-worker=abc`
+    """
+    # Seconds to wait before restarting the failed watch
+    RETRY_INTERVAL = 1
+
+    def __init__(self, api, namespace, label_selector):
+        self._api = api
+        self._namespace = namespace
+        self._label_selector = label_selector
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watch = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._watch:
+            self._watch.stop()
+
+    def subscribe(self, name):
+        """Get the queue of the events of the pod. Subscribe before creating the pod in order not to miss the events.
+
+        Return:
+            (queue.Queue)   Queue of tuples `(event_type, V1Pod)`
+        """
+        events = queue.Queue()
+        with self._lock:
+            self._queues[name] = events
+        return events
+
+    def unsubscribe(self, name):
+        with self._lock:
+            self._queues.pop(name, None)
+
+    def dispatch(self, event_type, pod):
+        with self._lock:
+            events = self._queues.get(pod.metadata.name)
+        if events:
+            events.put((event_type, pod))
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._list_and_watch()
+            except Exception:
+                logging.exception('Watch of the pods failed')
+            self._stop_event.wait(timeout=PodWatcher.RETRY_INTERVAL)
+
+    def _list_and_watch(self):
+        pod_list = self._api.list_namespaced_pod(self._namespace, label_selector=self._label_selector)
+        for pod in pod_list.items:
+            self.dispatch('MODIFIED', pod)
+
+        self._watch = kubernetes.watch.Watch()
+        stream = self._watch.stream(
+            self._api.list_namespaced_pod,
+            self._namespace,
+            label_selector=self._label_selector,
+            resource_version=pod_list.metadata.resource_version,
+        )
+        for event in stream:
+            if self._stop_event.is_set():
+                break
+            if event['type'] == 'ERROR':
+                # e.g. the resource version is too old, list the pods again
+                logging.warning('Watch of the pods returned an error: {}'.format(event['raw_object']))
+                break
+            self.dispatch(event['type'], event['object'])
+        self._watch.stop()
+
+
+class PooledPod(object):
+    """Pod of `PodPool`.
+
+    Args:
+        name        (str):      Name of the pod
+        key         (tuple):    Key of the pool, e.g. image and resources
+        expires_at  (float):    Time when the pod exits
+        pooled      (bool):     False if the pod is to be deleted when it is released
+    """
+
+    def __init__(self, name, key, expires_at, pooled):
+        self.name = name
+        self.key = key
+        self.expires_at = expires_at
+        self.pooled = pooled
+        self.idle_since = None
+
+
+class PodPool(object):
+    """Running pods reused by the successive jobs with the same key.
+
+    The pods are created by `create_pod(key, lifetime) -> name` that waits until the pod is running. The pods exit after
+    the lifetime, so that they do not outlive the worker for long.
+
+    Args:
+        min_size    (int):      Number of the pods kept per key once the key has been used
+        max_size    (int):      Max number of the pooled pods per key, the extra pods are deleted after the jobs
+        idle_ttl    (int):      Seconds after which an idle pod is deleted, unless there are at most `min_size` pods
+        lifetime    (int):      Min lifetime of the pods in seconds
+        create_pod  (function): Callable `(key, lifetime) -> str`
+        delete_pod  (function): Callable `(name) -> None`
+    """
+    # Seconds between the checks of the idle pods
+    MAINTENANCE_INTERVAL = 10
+
+    def __init__(self, min_size, max_size, idle_ttl, lifetime, create_pod, delete_pod):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.idle_ttl = idle_ttl
+        self.lifetime = lifetime
+        self._create_pod = create_pod
+        self._delete_pod = delete_pod
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._sizes = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run_maintenance, daemon=True)
+        self._thread.start()
+
+    def _run_maintenance(self):
+        while not self._stop_event.wait(timeout=PodPool.MAINTENANCE_INTERVAL):
+            try:
+                self.maintain()
+            except Exception:
+                logging.exception('Pod pool maintenance failed')
+
+    def _new_pod(self, key, duration, pooled):
+        lifetime = max(self.lifetime, duration)
+        expires_at = time.time() + lifetime
+        try:
+            name = self._create_pod(key, lifetime)
+        except Exception:
+            with self._lock:
+                if pooled and not self._stop_event.is_set():
+                    self._sizes[key] -= 1
+            raise
+        return PooledPod(name, key, expires_at, pooled)
+
+    def acquire(self, key, duration):
+        """Get an idle pod or create a new one.
+
+        Args:
+            key         (tuple):    Key of the pool
+            duration    (int):      Max duration of the job in seconds, the pod must not exit earlier
+
+        Return:
+            (PooledPod)
+        """
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._sizes.setdefault(key, 0)
+            deadline = time.time() + duration
+            # the most recently used pods first
+            for pod in reversed(idle):
+                if pod.expires_at > deadline:
+                    idle.remove(pod)
+                    return pod
+            pooled = self._sizes[key] < self.max_size
+            if pooled:
+                self._sizes[key] += 1
+        return self._new_pod(key, duration, pooled)
+
+    def release(self, pod, reusable):
+        """Return the pod to the pool.
+
+        Args:
+            pod         (PooledPod)
+            reusable    (bool):     False if the pod is broken or has been deleted
+        """
+        with self._lock:
+            # the counters have been reset if the pool is closed
+            if pod.pooled and not self._stop_event.is_set():
+                if reusable:
+                    pod.idle_since = time.time()
+                    self._idle[pod.key].append(pod)
+                    return
+                self._sizes[pod.key] -= 1
+        self._safe_delete(pod)
+
+    def maintain(self):
+        """Delete the expiring and the extra idle pods, create the pods up to `min_size`."""
+        now = time.time()
+        to_delete = []
+        to_create = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                for pod in list(idle):
+                    expiring = pod.expires_at < now + PodPool.MAINTENANCE_INTERVAL
+                    stale = now - pod.idle_since > self.idle_ttl and self._sizes[key] > self.min_size
+                    if expiring or stale:
+                        idle.remove(pod)
+                        self._sizes[key] -= 1
+                        to_delete.append(pod)
+                for _ in range(self.min_size - self._sizes[key]):
+                    self._sizes[key] += 1
+                    to_create.append(key)
+
+        for pod in to_delete:
+            self._safe_delete(pod)
+        for key in to_create:
+            try:
+                pod = self._new_pod(key, 0, True)
+            except Exception:
+                logging.exception('Failed to create a pod for the pool')
+                continue
+            self.release(pod, True)
+
+    def close(self):
+        """Stop the maintenance and delete the idle pods."""
+        self._stop_event.set()
+        with self._lock:
+            pods = [pod for idle in self._idle.values() for pod in idle]
+            self._idle = {}
+            self._sizes = {}
+        for pod in pods:
+            self._safe_delete(pod)
+
+    def _safe_delete(self, pod):
+        try:
+            self._delete_pod(pod.name)
+        except Exception:
+            logging.exception('Failed to delete pod `{}`'.format(pod.name))
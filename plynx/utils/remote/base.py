@@ -1,3 +1,8 @@
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
 class ContentsHandlerBase(object):
     def __init__(self, remote):
         self.remote = remote
@@ -14,12 +19,93 @@ class ContentsHandlerBase(object):
     def exists(self):
         raise NotImplementedError()
 
+    def size(self):
+        """Size of the object in bytes."""
+        raise NotImplementedError()
+
+    def read_range(self, offset, length=None):
+        """Read a range of bytes of the object.
+
+        Args:
+            offset  (int):          First byte to read
+            length  (int, None):    Number of bytes to read. If None, read until the end of the object
+
+        Return:
+            (bytes) Up to `length` bytes. Empty if `offset` is beyond the end of the object
+        """
+        raise NotImplementedError()
+
+    def materialize(self, local_path, allow_symlink=True, allow_link=True):
+        """Make the object available as a local file.
+
+        Default implementation streams the object to `local_path`.
+        Drivers with local access to the objects might avoid copying.
+
+        Args:
+            local_path      (str):  Destination path
+            allow_symlink   (bool): Allow `local_path` to be a symbolic link
+            allow_link      (bool): Allow `local_path` to share the stored object, e.g. to be a symbolic link to a
+                                    read-only mount. If False, `local_path` is a private copy that can be modified
+        """
+        with open(local_path, 'wb') as f:
+            self.get_contents_to_file(f)
+
+    def _download_parts(self, file_obj, size, read_part):
+        """Download the object with parallel ranged reads.
+
+        Parts are fetched by `remote.concurrency` threads and written to `file_obj` in order,
+        so `file_obj` does not have to be seekable. At most `concurrency` parts are kept in memory.
+
+        Args:
+            file_obj    (file):     Destination stream
+            size        (int):      Size of the object in bytes
+            read_part   (function): Callable `(start, end) -> bytes`, `end` is inclusive
+        """
+        part_size = self.remote.part_size
+        ranges = deque(
+            (start, min(start + part_size, size) - 1) for start in range(0, size, part_size)
+        )
+        with ThreadPoolExecutor(max_workers=self.remote.concurrency) as executor:
+            futures = deque()
+            while ranges or futures:
+                while ranges and len(futures) < self.remote.concurrency:
+                    futures.append(executor.submit(read_part, *ranges.popleft()))
+                file_obj.write(futures.popleft().result())
+
 
 class RemoteBase(object):
     def __init__(self, ContentsHandler, storage_config):
         self.ContentsHandler = ContentsHandler
         self._storage_config = storage_config
+        self.part_size = storage_config.part_size
+        self.concurrency = max(1, storage_config.concurrency)
+        # new resources up to this size are stored in the database, see `plynx.utils.file_handler`
+        self.inline_threshold = storage_config.inline_threshold
 
     def get_contents_handler(self, path):
         full_path = '{}{}'.format(self._storage_config.prefix, path)
         return self.ContentsHandler(self, full_path)
+
+    def _remove_or_fail(self, path):
+        try:
+            self.get_contents_handler(path).remove()
+        except Exception as e:
+            if not self.get_contents_handler(path).exists():
+                return None
+            logging.error('Failed to remove `{}`: {}'.format(path, e))
+            return path
+        return None
+
+    def remove_batch(self, paths):
+        """Remove multiple objects. Objects that do not exist are considered removed.
+
+        Default implementation removes objects in `concurrency` parallel threads.
+
+        Args:
+            paths   (list of str):  Paths of the objects
+
+        Return:
+            (list of str)   Paths that failed to be removed
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return [path for path in executor.map(self._remove_or_fail, paths) if path is not None]
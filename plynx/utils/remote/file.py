@@ -1,26 +1,116 @@
 import os
+import stat
+import uuid
+import errno
 import shutil
+import hashlib
+import logging
 from plynx.utils.remote.base import ContentsHandlerBase, RemoteBase
 
+# Objects are fanned out to `<prefix>/ab/cd/<path>` subdirectories, where `abcd` is a prefix of the hash of the path
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+# Results of `migrate_to_sharded`
+MIGRATE_MOVED = 'moved'
+# the object already exists in the sharded layout, e.g. it has been written again: the flat copy is removed
+MIGRATE_DUPLICATE_REMOVED = 'duplicate_removed'
+
+# Objects are immutable: they are read-only for the processes that do not run as root
+_READ_ONLY_MODE = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+# ioctl request to share data blocks of two files (copy-on-write), see `man ioctl_ficlone`
+_FICLONE = 0x40049409
+
+try:
+    import fcntl
+except ImportError:     # pragma: no cover
+    fcntl = None
+
+
+def _reflink(src, dst):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, 'reflink is not supported')
+    with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+        except OSError:
+            os.remove(dst)
+            raise
+
+
+def _is_read_only_mount(path):
+    return bool(os.statvfs(path).f_flag & os.ST_RDONLY)
+
 
 class ContentsHandlerFile(ContentsHandlerBase):
-    def __init__(self, remote, path):
+    def __init__(self, remote, path, flat_path=None):
         super(ContentsHandlerFile, self).__init__(remote)
         self.path = path
+        # Legacy location of the object, used as a fallback for reading
+        self.flat_path = flat_path or path
+
+    def _get_read_path(self):
+        if not os.path.exists(self.path) and os.path.exists(self.flat_path):
+            return self.flat_path
+        return self.path
 
     def get_contents_to_file(self, file_obj):
-        with open(self.path, 'rb') as f:
+        with open(self._get_read_path(), 'rb') as f:
             shutil.copyfileobj(f, file_obj)
 
     def set_contents_from_file(self, file_obj):
-        with open(self.path, 'wb') as f:
+        dirname = os.path.dirname(self.path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        # write to a temporary file and replace the object atomically,
+        # so that the files materialized from the previous version are not changed
+        tmp_path = '{}.{}.tmp'.format(self.path, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as f:
             shutil.copyfileobj(file_obj, f)
+        os.chmod(tmp_path, _READ_ONLY_MODE)
+        os.replace(tmp_path, self.path)
+        if self.flat_path != self.path and os.path.exists(self.flat_path):
+            os.remove(self.flat_path)
 
     def remove(self):
-        os.remove(self.path)
+        os.remove(self._get_read_path())
 
     def exists(self):
-        return os.path.exists(self.path)
+        return os.path.exists(self.path) or os.path.exists(self.flat_path)
+
+    def size(self):
+        return os.path.getsize(self._get_read_path())
+
+    def read_range(self, offset, length=None):
+        with open(self._get_read_path(), 'rb') as f:
+            f.seek(offset)
+            return f.read(-1 if length is None else length)
+
+    def materialize(self, local_path, allow_symlink=True, allow_link=True):
+        """Make the object available as `local_path` without copying the data if possible.
+
+        Try in order: reflink (copy-on-write clone), symbolic link, copy.
+        A symbolic link shares the stored object, so it is used only if `allow_link` and the storage is mounted
+        read-only: the jobs running as root would be able to modify the object otherwise.
+        """
+        src_path = os.path.abspath(self._get_read_path())
+        methods = [_reflink]
+        if allow_link and allow_symlink and _is_read_only_mount(src_path):
+            methods.append(os.symlink)
+        for method in methods:
+            try:
+                method(src_path, local_path)
+                return
+            except OSError as e:
+                logging.debug('Could not materialize `{}` using `{}`: {}'.format(src_path, method.__name__, e))
+        shutil.copyfile(src_path, local_path)
+
+
+def get_shard_dirs(path):
+    """Get the list of nested subdirectories of the object."""
+    path_hash = hashlib.md5(path.encode('utf-8')).hexdigest()
+    return [path_hash[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH] for level in range(SHARD_LEVELS)]
 
 
 class RemoteFile(RemoteBase):
@@ -30,3 +120,35 @@ class RemoteFile(RemoteBase):
         # make sure directory exists
         if not os.path.exists(self._storage_config.prefix):
             os.makedirs(self._storage_config.prefix)
+
+    def get_contents_handler(self, path):
+        flat_path = '{}{}'.format(self._storage_config.prefix, path)
+        sharded_path = '{}{}'.format(self._storage_config.prefix, os.path.join(*(get_shard_dirs(path) + [path])))
+        return self.ContentsHandler(self, sharded_path, flat_path)
+
+    def migrate_to_sharded(self, path):
+        """Move an object from the flat layout to the sharded one. The sharded object is never overwritten.
+
+        Return:
+            (str, None)     `MIGRATE_MOVED`, `MIGRATE_DUPLICATE_REMOVED` or None if there is no flat object
+        """
+        content = self.get_contents_handler(path)
+        if not os.path.isfile(content.flat_path):
+            return None
+        os.makedirs(os.path.dirname(content.path), exist_ok=True)
+        try:
+            # unlike `rename`, `link` fails if the destination exists
+            os.link(content.flat_path, content.path)
+            result = MIGRATE_MOVED
+        except FileExistsError:
+            logging.warning('Object `{}` exists in both layouts, removing the flat copy'.format(path))
+            result = MIGRATE_DUPLICATE_REMOVED
+        os.remove(content.flat_path)
+        return result
+
+    def list_flat_paths(self):
+        """Iterate over the objects stored in the flat layout."""
+        dirname, name_prefix = os.path.split(self._storage_config.prefix)
+        for entry in os.scandir(dirname or '.'):
+            if entry.is_file() and entry.name.startswith(name_prefix):
+                yield entry.name[len(name_prefix):]
@@ -2,18 +2,36 @@ from future.standard_library import install_aliases
 install_aliases()   # noqa
 
 import os                                                               # noqa: E402
+from google.api_core.exceptions import RequestRangeNotSatisfiable       # noqa: E402
 from google.cloud import storage                                        # noqa: E402
 from urllib.parse import urlparse                                       # noqa: E402
 from plynx.utils.remote.base import ContentsHandlerBase, RemoteBase     # noqa: E402
 
+# Chunk size of resumable uploads must be a multiple of 256 KB
+_GS_CHUNK_ALIGNMENT = 256 * 1024
+
 
 class ContentsHandlerGS(ContentsHandlerBase):
     def __init__(self, remote, path):
         super(ContentsHandlerGS, self).__init__(remote)
-        self.blob = self.remote.bucket.blob(urlparse(path).path[1:])
+        self.path = urlparse(path).path[1:]     # get the file path in the bucket
+        self.blob = self._get_blob()
+
+    def _get_blob(self):
+        # `Blob` objects are not thread safe, each thread downloading a part needs its own one
+        return self.remote.bucket.blob(self.path, chunk_size=self.remote.chunk_size)
 
     def get_contents_to_file(self, file_obj):
-        self.blob.download_to_file(file_obj)
+        # the size is only needed to split the object into parts
+        size = self.size() if self.remote.concurrency > 1 else 0
+        if size <= self.remote.part_size:
+            self.blob.download_to_file(file_obj)
+            return
+        self._download_parts(
+            file_obj,
+            size,
+            lambda start, end: self._get_blob().download_as_string(start=start, end=end),
+        )
 
     def set_contents_from_file(self, file_obj):
         self.blob.upload_from_file(file_obj)
@@ -24,6 +42,21 @@ class ContentsHandlerGS(ContentsHandlerBase):
     def exists(self):
         return self.blob.exists()
 
+    def size(self):
+        self.blob.reload()
+        return self.blob.size
+
+    def read_range(self, offset, length=None):
+        if length == 0:
+            return b''
+        try:
+            return self.blob.download_as_string(
+                start=offset,
+                end=None if length is None else offset + length - 1,
+            )
+        except RequestRangeNotSatisfiable:
+            return b''
+
 
 class RemoteGS(RemoteBase):
     def __init__(self, storage_config):
@@ -33,3 +66,4 @@ class RemoteGS(RemoteBase):
         bucket_name = urlparse(self._storage_config.prefix).netloc
         client = storage.Client()
         self.bucket = client.get_bucket(bucket_name)
+        self.chunk_size = max(1, self.part_size // _GS_CHUNK_ALIGNMENT) * _GS_CHUNK_ALIGNMENT
@@ -2,11 +2,18 @@ from future.standard_library import install_aliases
 install_aliases()   # noqa
 
 import os                                                               # noqa: E402
+import logging                                                          # noqa: E402
 import boto3                                                            # noqa: E402
+from boto3.s3.transfer import TransferConfig                            # noqa: E402
 from botocore.errorfactory import ClientError                           # noqa: E402
 from urllib.parse import urlparse                                       # noqa: E402
 from plynx.utils.remote.base import ContentsHandlerBase, RemoteBase     # noqa: E402
 
+# Limit of `delete_objects` request
+_S3_DELETE_BATCH_SIZE = 1000
+# Minimal size of a part of multipart uploads, except for the last one
+_S3_MIN_PART_SIZE = 5 * 1024 ** 2
+
 
 class ContentsHandlerS3(ContentsHandlerBase):
     def __init__(self, remote, path):
@@ -14,10 +21,20 @@ class ContentsHandlerS3(ContentsHandlerBase):
         self.path = urlparse(path).path[1:]     # get the file path in the bucket
 
     def get_contents_to_file(self, file_obj):
-        self.remote.s3.download_fileobj(Bucket=self.remote.bucket_name, Key=self.path, Fileobj=file_obj)
+        self.remote.s3.download_fileobj(
+            Bucket=self.remote.bucket_name,
+            Key=self.path,
+            Fileobj=file_obj,
+            Config=self.remote.transfer_config,
+        )
 
     def set_contents_from_file(self, file_obj):
-        self.remote.s3.upload_fileobj(Fileobj=file_obj, Bucket=self.remote.bucket_name, Key=self.path)
+        self.remote.s3.upload_fileobj(
+            Fileobj=file_obj,
+            Bucket=self.remote.bucket_name,
+            Key=self.path,
+            Config=self.remote.transfer_config,
+        )
 
     def remove(self):
         self.remote.s3.delete_object(Bucket=self.remote.bucket_name, Key=self.path)
@@ -29,12 +46,60 @@ class ContentsHandlerS3(ContentsHandlerBase):
             return False
         return True
 
+    def size(self):
+        return self.remote.s3.head_object(Bucket=self.remote.bucket_name, Key=self.path)['ContentLength']
+
+    def read_range(self, offset, length=None):
+        if length == 0:
+            return b''
+        try:
+            response = self.remote.s3.get_object(
+                Bucket=self.remote.bucket_name,
+                Key=self.path,
+                Range='bytes={}-{}'.format(offset, '' if length is None else offset + length - 1),
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'InvalidRange':
+                return b''
+            raise
+        return response['Body'].read()
+
 
 class RemoteS3(RemoteBase):
     def __init__(self, storage_config):
         super(RemoteS3, self).__init__(ContentsHandlerS3, storage_config)
+        if self.part_size < _S3_MIN_PART_SIZE:
+            raise ValueError('`part_size` must be at least `{min_size}` bytes. Value `{part_size}` is given'.format(
+                min_size=_S3_MIN_PART_SIZE,
+                part_size=self.part_size,
+            ))
         if self._storage_config.credential_path:
             os.environ['AWS_SHARED_CREDENTIALS_FILE'] = self._storage_config.credential_path
         parse_result = urlparse(self._storage_config.prefix)
         self.s3 = boto3.client('s3')
         self.bucket_name = parse_result.netloc
+        # multipart uploads and parallel ranged downloads
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.part_size,
+            multipart_chunksize=self.part_size,
+            max_concurrency=self.concurrency,
+            use_threads=self.concurrency > 1,
+        )
+
+    def remove_batch(self, paths):
+        failed_paths = []
+        for start in range(0, len(paths), _S3_DELETE_BATCH_SIZE):
+            key_to_path = {
+                self.get_contents_handler(path).path: path for path in paths[start:start + _S3_DELETE_BATCH_SIZE]
+            }
+            response = self.s3.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    'Objects': [{'Key': key} for key in key_to_path],
+                    'Quiet': True,
+                },
+            )
+            for error in response.get('Errors', []):
+                logging.error('Failed to remove `{}`: {}'.format(error['Key'], error.get('Message')))
+                failed_paths.append(key_to_path[error['Key']])
+        return failed_paths
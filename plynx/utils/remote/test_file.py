@@ -0,0 +1,120 @@
+import io
+import os
+import pytest
+from plynx.utils.config import StorageConfig
+from plynx.plugins.resources.common import Executable
+import plynx.utils.remote.file
+from plynx.utils.remote.file import RemoteFile, get_shard_dirs, MIGRATE_MOVED, MIGRATE_DUPLICATE_REMOVED
+
+
+@pytest.fixture
+def remote(tmpdir):
+    return RemoteFile(StorageConfig(
+        scheme='file',
+        prefix='{}/'.format(tmpdir),
+        credential_path=None,
+        part_size=8 * 1024 ** 2,
+        concurrency=1,
+        inline_threshold=0,
+    ))
+
+
+def test_read_range(remote):
+    data = b'0123456789'
+    content = remote.get_contents_handler('range')
+    content.set_contents_from_file(io.BytesIO(data))
+
+    assert content.size() == len(data)
+    assert content.read_range(0, 4) == b'0123'
+    assert content.read_range(8, 100) == b'89'
+    assert content.read_range(3) == b'3456789'
+    assert content.read_range(20, 5) == b''
+    assert content.read_range(0, 0) == b''
+
+
+def test_remove_batch(remote):
+    paths = ['a', 'b', 'c']
+    for path in paths:
+        remote.get_contents_handler(path).set_contents_from_file(io.BytesIO(b'data'))
+
+    # missing objects are considered removed
+    assert remote.remove_batch(paths + ['missing']) == []
+    for path in paths:
+        assert not remote.get_contents_handler(path).exists()
+
+
+def test_sharded_layout(remote, tmpdir):
+    content = remote.get_contents_handler('sharded')
+    content.set_contents_from_file(io.BytesIO(b'data'))
+
+    assert content.path == os.path.join(str(tmpdir), *(get_shard_dirs('sharded') + ['sharded']))
+    assert os.path.isfile(content.path)
+    assert not os.path.exists(os.path.join(str(tmpdir), 'sharded'))
+
+
+def test_flat_layout_fallback_and_migration(remote, tmpdir):
+    with open(os.path.join(str(tmpdir), 'flat'), 'wb') as f:
+        f.write(b'data')
+
+    content = remote.get_contents_handler('flat')
+    assert content.exists()
+    assert content.read_range(0) == b'data'
+
+    assert list(remote.list_flat_paths()) == ['flat']
+    assert remote.migrate_to_sharded('flat') == MIGRATE_MOVED
+    assert list(remote.list_flat_paths()) == []
+    assert os.path.isfile(content.path)
+    assert content.read_range(0) == b'data'
+    assert remote.migrate_to_sharded('flat') is None
+
+    # the object has been written again during the migration: the newer sharded copy is kept
+    with open(content.flat_path, 'wb') as f:
+        f.write(b'old data')
+    assert remote.migrate_to_sharded('flat') == MIGRATE_DUPLICATE_REMOVED
+    assert not os.path.exists(content.flat_path)
+    assert content.read_range(0) == b'data'
+
+
+def test_materialize(remote, tmpdir):
+    content = remote.get_contents_handler('input')
+    content.set_contents_from_file(io.BytesIO(b'data'))
+
+    for allow_symlink in [True, False]:
+        local_path = os.path.join(str(tmpdir), 'local_{}'.format(allow_symlink))
+        content.materialize(local_path, allow_symlink=allow_symlink)
+        with open(local_path, 'rb') as f:
+            assert f.read() == b'data'
+        # the storage is writable: the object is not shared
+        assert not os.path.samefile(local_path, content.path)
+
+    # replacing the object does not change materialized files
+    content.set_contents_from_file(io.BytesIO(b'new data'))
+    with open(os.path.join(str(tmpdir), 'local_False'), 'rb') as f:
+        assert f.read() == b'data'
+
+
+def test_materialize_read_only_mount(remote, tmpdir, monkeypatch):
+    content = remote.get_contents_handler('input')
+    content.set_contents_from_file(io.BytesIO(b'data'))
+    monkeypatch.setattr(plynx.utils.remote.file, '_is_read_only_mount', lambda path: True)
+
+    local_path = os.path.join(str(tmpdir), 'symlink')
+    content.materialize(local_path)
+    assert os.path.islink(local_path)
+
+    local_path = os.path.join(str(tmpdir), 'copy')
+    content.materialize(local_path, allow_link=False)
+    assert not os.path.samefile(local_path, content.path)
+
+
+def test_materialize_executable(remote, tmpdir):
+    content = remote.get_contents_handler('executable')
+    content.set_contents_from_file(io.BytesIO(b'#!/bin/sh\n'))
+    st_mode = os.stat(content.path).st_mode
+
+    local_path = os.path.join(str(tmpdir), 'executable')
+    content.materialize(local_path, allow_link=Executable.ALLOW_LINK)
+    Executable.prepare_input(local_path, preview=False)
+
+    assert os.access(local_path, os.X_OK)
+    assert os.stat(content.path).st_mode == st_mode
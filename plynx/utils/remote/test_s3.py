@@ -0,0 +1,81 @@
+import io
+import os
+import pytest
+from plynx.utils.config import StorageConfig
+
+boto3 = pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+
+BUCKET_NAME = 'plynx-test'
+PART_SIZE = 5 * 1024 ** 2   # minimal part size allowed by s3
+
+
+@pytest.fixture
+def remote(monkeypatch):
+    monkeypatch.setitem(os.environ, 'AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setitem(os.environ, 'AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setitem(os.environ, 'AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_s3():
+        from plynx.utils.remote.s3 import RemoteS3
+        boto3.client('s3').create_bucket(Bucket=BUCKET_NAME)
+        yield RemoteS3(StorageConfig(
+            scheme='s3',
+            prefix='s3://{}/'.format(BUCKET_NAME),
+            credential_path=None,
+            part_size=PART_SIZE,
+            concurrency=4,
+            inline_threshold=0,
+        ))
+
+
+def test_multipart_roundtrip(remote):
+    data = os.urandom(2 * PART_SIZE + 123)
+    content = remote.get_contents_handler('multipart')
+    content.set_contents_from_file(io.BytesIO(data))
+
+    head = remote.s3.head_object(Bucket=BUCKET_NAME, Key='multipart')
+    # multipart uploads produce ETags in form of `<md5>-<number of parts>`
+    assert head['ETag'].strip('"').endswith('-3')
+
+    file_obj = io.BytesIO()
+    content.get_contents_to_file(file_obj)
+    assert file_obj.getvalue() == data
+
+
+def test_download_parts_keeps_order(remote):
+    data = os.urandom(10 * 1024)
+    content = remote.get_contents_handler('small')
+    remote.part_size = 1000
+
+    file_obj = io.BytesIO()
+    content._download_parts(file_obj, len(data), lambda start, end: data[start:end + 1])
+    assert file_obj.getvalue() == data
+
+
+def test_read_range(remote):
+    data = b'0123456789'
+    content = remote.get_contents_handler('range')
+    content.set_contents_from_file(io.BytesIO(data))
+
+    assert content.size() == len(data)
+    assert content.read_range(0, 4) == b'0123'
+    assert content.read_range(8, 100) == b'89'
+    assert content.read_range(3) == b'3456789'
+    assert content.read_range(20, 5) == b''
+    assert content.read_range(0, 0) == b''
+
+
+def test_min_part_size(remote):
+    from plynx.utils.remote.s3 import RemoteS3
+    with pytest.raises(ValueError, match='part_size'):
+        RemoteS3(remote._storage_config._replace(part_size=PART_SIZE - 1))
+
+
+def test_remove_batch(remote):
+    paths = ['obj_{}'.format(i) for i in range(5)]
+    for path in paths:
+        remote.get_contents_handler(path).set_contents_from_file(io.BytesIO(b'data'))
+
+    assert remote.remove_batch(paths + ['missing']) == []
+    for path in paths:
+        assert not remote.get_contents_handler(path).exists()
@@ -0,0 +1,156 @@
+"""Scratch space of the worker.
+
+Working directories of the jobs are created in one of the scratch roots, e.g. tmpfs for small jobs and a large disk
+for the rest. Each root may have a quota of the space reserved by the running jobs of the worker.
+"""
+import os
+import fcntl
+import shutil
+import logging
+import threading
+
+# Marker of the directories created by the workers. The directory of the worker is locked through it while the worker
+# is running. Only the directories that have the marker are swept, the scratch roots may be shared with other programs.
+LOCK_NAME = '.plynx-worker'
+
+
+class ScratchPolicy:
+    # the first root in the order of the config that has enough space
+    FIRST_FIT = 'first_fit'
+    # the root with the most of the free space
+    MOST_FREE = 'most_free'
+
+
+class ScratchRoot(object):
+    """Directory containing the working directories of the worker.
+
+    Args:
+        config      (ScratchRootConfig):    `name`, `path`, `quota` and `min_free` in bytes, 0 means no limit
+        worker_id   (str):                  ID of the worker
+    """
+
+    def __init__(self, config, worker_id):
+        self.name = config.name
+        self.base_path = config.path
+        self.path = os.path.join(config.path, worker_id)
+        self.quota = config.quota
+        self.min_free = config.min_free
+        self.reserved = 0
+        self._lock_file = None
+
+    def lock(self):
+        """Lock the directory of the worker, so that the other workers do not remove it."""
+        lock_path = os.path.join(self.path, LOCK_NAME)
+        if os.path.isdir(self.path) and os.listdir(self.path) and not os.path.exists(lock_path):
+            raise Exception('Directory `{}` has not been created by a worker'.format(self.path))
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_file = open(lock_path, 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise Exception('Directory `{}` is used by another worker'.format(self.path))
+
+    def get_free_space(self):
+        """Get the space available for the new jobs, taking into account `min_free`, `quota` and the reserved space."""
+        free = shutil.disk_usage(self.path).free - self.min_free
+        if self.quota:
+            free = min(free, self.quota - self.reserved)
+        return free
+
+    def iter_leftovers(self):
+        """Iterate over the directories left by the crashed jobs and by the workers that are no longer running.
+
+        Yield:
+            (str, file)     Path of the directory and the lock file of the dead worker to be closed after the removal
+        """
+        for entry in os.scandir(self.path):
+            if entry.name != LOCK_NAME:
+                yield entry.path, None
+
+        for entry in os.scandir(self.base_path):
+            if entry.path == self.path or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                # the marker is not created if it is missing
+                lock_file = open(os.path.join(entry.path, LOCK_NAME), 'r')
+            except FileNotFoundError:
+                logging.info('Skipping `{}`: not a directory of a worker'.format(entry.path))
+                continue
+            except OSError as e:
+                logging.warning('Could not open the lock of `{}`: {}'.format(entry.path, e))
+                continue
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # the worker is running
+                lock_file.close()
+                continue
+            yield entry.path, lock_file
+
+
+class ScratchManager(object):
+    """Select the scratch roots for the jobs and keep track of the reserved space.
+
+    Args:
+        scratch_root_configs    (list of ScratchRootConfig)
+        policy                  (str):  See `ScratchPolicy`
+        worker_id               (str):  ID of the worker
+    """
+
+    def __init__(self, scratch_root_configs, policy, worker_id):
+        if policy not in (ScratchPolicy.FIRST_FIT, ScratchPolicy.MOST_FREE):
+            raise ValueError('Unknown scratch policy `{}`'.format(policy))
+        if not scratch_root_configs:
+            raise ValueError('At least one scratch root is required')
+        self.roots = [ScratchRoot(config, worker_id) for config in scratch_root_configs]
+        self.policy = policy
+        self._lock = threading.Lock()
+
+    def lock(self):
+        for root in self.roots:
+            root.lock()
+
+    def iter_leftovers(self):
+        for root in self.roots:
+            for leftover in root.iter_leftovers():
+                yield leftover
+
+    def has_free_space(self):
+        """Check if any of the roots can take a new job."""
+        with self._lock:
+            return any(root.get_free_space() > 0 for root in self.roots)
+
+    def reserve(self, size, name=None):
+        """Select the root for a job and reserve the space in it.
+
+        Args:
+            size    (int):          Estimated size of the working directory in bytes
+            name    (str, None):    Name of the preferred root
+
+        Return:
+            (ScratchRoot)
+        """
+        with self._lock:
+            roots = self.roots
+            if name:
+                preferred_roots = [root for root in self.roots if root.name == name]
+                if preferred_roots and preferred_roots[0].get_free_space() >= size:
+                    roots = preferred_roots
+                else:
+                    logging.warning('Scratch root `{}` is not available for {} bytes, selecting another one'.format(name, size))
+            free_spaces = [(root.get_free_space(), root) for root in roots]
+            fit = [(free_space, root) for free_space, root in free_spaces if free_space >= size]
+            if not fit:
+                # the size is only an estimate: try the root with the most of the free space
+                logging.warning('No scratch root has {} bytes available'.format(size))
+                fit = [max(free_spaces, key=lambda free_space_root: free_space_root[0])]
+            if self.policy == ScratchPolicy.FIRST_FIT:
+                root = fit[0][1]
+            else:
+                root = max(fit, key=lambda free_space_root: free_space_root[0])[1]
+            root.reserved += size
+            return root
+
+    def release(self, root, size):
+        with self._lock:
+            root.reserved -= size
@@ -0,0 +1,98 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import jinja2
+
+DEFAULT_MAX_SIZE = 256
+
+
+class TemplateCache(object):
+    """Process-wide LRU of compiled jinja2 templates keyed by the hash of the source.
+
+    The cache accumulates the time spent on compiling and on rendering the templates.
+
+    Args:
+        max_size    (int):  Max number of compiled templates
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._environment = jinja2.Environment()
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compile_time = 0.
+        self.render_time = 0.
+
+    def get_template(self, source):
+        """Get the compiled template, compile it if it is not in the cache.
+
+        Return:
+            (jinja2.Template)
+        """
+        key = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return template
+
+        # compile outside of the lock, the same template might be compiled concurrently
+        start_time = time.perf_counter()
+        template = self._environment.from_string(source)
+        compile_time = time.perf_counter() - start_time
+
+        with self._lock:
+            self.misses += 1
+            self.compile_time += compile_time
+            self._templates[key] = template
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        logging.debug('Compiled template `{}` in {:.2f}ms'.format(key[:8], compile_time * 1000))
+        return template
+
+    def render(self, source, **kwargs):
+        """Render the template using the cached compiled version of it."""
+        template = self.get_template(source)
+        start_time = time.perf_counter()
+        res = template.render(**kwargs)
+        render_time = time.perf_counter() - start_time
+        with self._lock:
+            self.render_time += render_time
+        logging.debug('Rendered template in {:.2f}ms'.format(render_time * 1000))
+        return res
+
+    def get_stats(self):
+        """Get the counters of the cache.
+
+        Return:
+            (dict)  `size`, `hits`, `misses`, `compile_time` and `render_time` in seconds
+        """
+        with self._lock:
+            return {
+                'size': len(self._templates),
+                'hits': self.hits,
+                'misses': self.misses,
+                'compile_time': self.compile_time,
+                'render_time': self.render_time,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+_template_cache = TemplateCache()
+
+
+def get_template_cache():
+    return _template_cache
+
+
+def render_template(source, **kwargs):
+    """Render jinja2 template `source` using the process-wide cache of compiled templates."""
+    return _template_cache.render(source, **kwargs)
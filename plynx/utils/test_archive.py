@@ -0,0 +1,138 @@
+import io
+import os
+import tarfile
+import zipfile
+import pytest
+from plynx.utils.archive import Compression, pack_directory, unpack_directory, list_directory, extract_members
+from plynx.utils.common import zipdir
+
+
+class _NonSeekable(object):
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        # return short reads as pipes do
+        return self._stream.read(min(size, 3) if size is not None and size >= 0 else -1)
+
+
+@pytest.fixture
+def directory(tmpdir):
+    path = tmpdir.mkdir('src')
+    path.join('a.txt').write('a')
+    path.mkdir('sub').join('b.txt').write('b' * 100000)
+    path.join('sub', 'c.txt').write('c' * 1000)
+    return str(path)
+
+
+def _check_directory(path):
+    with open(os.path.join(path, 'a.txt')) as f:
+        assert f.read() == 'a'
+    with open(os.path.join(path, 'sub', 'b.txt')) as f:
+        assert f.read() == 'b' * 100000
+
+
+@pytest.mark.parametrize('compression', [Compression.NONE, Compression.ZSTD])
+def test_roundtrip(directory, tmpdir, compression):
+    if compression == Compression.ZSTD:
+        pytest.importorskip('zstandard')
+    stream = io.BytesIO()
+    pack_directory(directory, stream, compression=compression, level=1, threads=2)
+
+    assert sorted(list_directory(_NonSeekable(stream.getvalue()))) == ['a.txt', 'sub/', 'sub/b.txt', 'sub/c.txt']
+    dst = str(tmpdir.mkdir('dst'))
+    unpack_directory(_NonSeekable(stream.getvalue()), dst)
+    _check_directory(dst)
+
+
+def test_zip_is_readable(directory, tmpdir):
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zipdir(directory, zf)
+
+    dst = str(tmpdir.mkdir('dst'))
+    unpack_directory(_NonSeekable(stream.getvalue()), dst)
+    _check_directory(dst)
+
+
+@pytest.mark.parametrize('compression', [Compression.NONE, Compression.ZSTD])
+def test_extract_members(directory, tmpdir, compression):
+    if compression == Compression.ZSTD:
+        pytest.importorskip('zstandard')
+    stream = io.BytesIO()
+    # the files of the directory do not share the frames
+    index = pack_directory(directory, stream, compression=compression, frame_size=1)
+    data = stream.getvalue()
+    read_ranges = []
+
+    def read_range(offset, length):
+        read_ranges.append((offset, length))
+        return data[offset:offset + length]
+
+    dst = str(tmpdir.mkdir('dst'))
+    extract_members(index, read_range, dst, ['sub/c*'])
+    assert os.listdir(dst) == ['sub']
+    assert os.listdir(os.path.join(dst, 'sub')) == ['c.txt']
+    with open(os.path.join(dst, 'sub', 'c.txt')) as f:
+        assert f.read() == 'c' * 1000
+    assert len(read_ranges) == 1 and read_ranges[0][1] < len(data)
+
+    dst = str(tmpdir.mkdir('dst_all'))
+    extract_members(index, read_range, dst, ['a.txt', 'sub'])
+    _check_directory(dst)
+
+    # partial extraction from the stream
+    dst = str(tmpdir.mkdir('dst_stream'))
+    unpack_directory(_NonSeekable(data), dst, ['a.txt'])
+    assert os.listdir(dst) == ['a.txt']
+
+
+def test_shared_frames(directory, tmpdir):
+    pytest.importorskip('zstandard')
+    stream = io.BytesIO()
+    index = pack_directory(directory, stream, compression=Compression.ZSTD)
+    data = stream.getvalue()
+    # small files are compressed together
+    frames = [member['frame'] for member in index['members'] if member['type'] == 'file']
+    assert len(frames) == 3 and frames.count(frames[0]) == 3
+    read_ranges = []
+
+    def read_range(offset, length):
+        read_ranges.append((offset, length))
+        return data[offset:offset + length]
+
+    dst = str(tmpdir.mkdir('dst'))
+    extract_members(index, read_range, dst, ['a.txt', 'sub'])
+    _check_directory(dst)
+    assert read_ranges == [tuple(frames[0])]
+
+
+def _make_tar(members):
+    file_obj = io.BytesIO()
+    with tarfile.open(fileobj=file_obj, mode='w') as tf:
+        for name, type, linkname in members:
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.type = type
+            tarinfo.linkname = linkname
+            tf.addfile(tarinfo, io.BytesIO(b''))
+    return file_obj.getvalue()
+
+
+@pytest.mark.parametrize('data_filter', [True, False])
+@pytest.mark.parametrize('members', [
+    [('../outside', tarfile.REGTYPE, '')],
+    [('/outside', tarfile.REGTYPE, '')],
+    [('link', tarfile.SYMTYPE, '/')],
+    # the target is inside of the directory only if the link is not resolved
+    [('up', tarfile.SYMTYPE, '.'), ('link', tarfile.SYMTYPE, 'up/..'), ('link/outside', tarfile.REGTYPE, '')],
+    [('hard_link', tarfile.LNKTYPE, '../outside')],
+    [('fifo', tarfile.FIFOTYPE, '')],
+])
+def test_unsafe_tar(tmpdir, monkeypatch, data_filter, members):
+    if not data_filter:
+        monkeypatch.delattr(tarfile, 'data_filter', raising=False)
+    path = tmpdir.mkdir('dst').mkdir('dir')
+    with pytest.raises(Exception):
+        unpack_directory(io.BytesIO(_make_tar(members)), str(path))
+    assert not tmpdir.join('dst', 'outside').exists()
+    assert not tmpdir.join('outside').exists()
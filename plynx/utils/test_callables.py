@@ -0,0 +1,76 @@
+import os
+import time
+import pytest
+from plynx.utils.callables import CallableProcessPool, plynx_callable
+
+
+@plynx_callable
+def write_params(inputs, outputs, params, logs):
+    print('pid', os.getpid())
+    with open(outputs['out'], 'w') as f:
+        f.write(repr(sorted(params.items())))
+
+
+@plynx_callable
+def sleep(inputs, outputs, params, logs):
+    time.sleep(params['seconds'])
+
+
+def not_registered(inputs, outputs, params, logs):
+    pass
+
+
+MODULES = ['plynx.utils.test_callables']
+
+
+def _call(pool, tmpdir, name, params, timeout=None):
+    process = pool.acquire()
+    try:
+        return process.call(
+            'plynx.utils.test_callables.{}'.format(name),
+            {'inputs': {}, 'outputs': {'out': str(tmpdir.join('out'))}, 'params': params, 'logs': {}},
+            str(tmpdir),
+            str(tmpdir.join('stdout')),
+            str(tmpdir.join('stderr')),
+            timeout,
+        )
+    finally:
+        pool.release(process)
+
+
+def test_call(tmpdir):
+    pool = CallableProcessPool(1, MODULES)
+    assert _call(pool, tmpdir, 'write_params', {'a': [1, 2], 'b': 'x'}) is None
+    assert tmpdir.join('out').read() == "[('a', [1, 2]), ('b', 'x')]"
+    # the process is reused
+    assert _call(pool, tmpdir, 'write_params', {}) is None
+    pids = [line for line in tmpdir.join('stdout').read().splitlines() if line.startswith('pid')]
+    assert len(pids) == 2 and pids[0] == pids[1]
+
+    assert 'not registered' in _call(pool, tmpdir, 'not_registered', {})
+    assert 'Traceback' in tmpdir.join('stderr').read()
+
+
+def test_timeout(tmpdir):
+    pool = CallableProcessPool(1, MODULES)
+    with pytest.raises(Exception, match='Timeout'):
+        _call(pool, tmpdir, 'sleep', {'seconds': 10}, timeout=0.5)
+    # the killed process is replaced
+    assert _call(pool, tmpdir, 'sleep', {'seconds': 0}) is None
+
+
+def test_unregistered_module_is_not_imported(tmpdir, monkeypatch):
+    marker = tmpdir.join('imported')
+    tmpdir.join('side_effects.py').write('open({!r}, "w").close()\n'.format(str(marker)))
+    monkeypatch.syspath_prepend(str(tmpdir))
+
+    pool = CallableProcessPool(1, MODULES)
+    process = pool.acquire()
+    try:
+        error = process.call(
+            'side_effects.func', {}, str(tmpdir), str(tmpdir.join('stdout')), str(tmpdir.join('stderr')),
+        )
+    finally:
+        pool.release(process)
+    assert 'not registered' in error
+    assert not marker.check()
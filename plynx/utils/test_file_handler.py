@@ -0,0 +1,112 @@
+import io
+import hashlib
+import pytest
+import plynx.utils.remote
+from plynx.constants import Collections
+from plynx.utils import file_handler
+from plynx.utils.config import StorageConfig
+from plynx.utils.remote.file import RemoteFile
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture(autouse=True)
+def driver(tmpdir, monkeypatch):
+    driver = RemoteFile(StorageConfig(
+        scheme='file',
+        prefix='{}/'.format(tmpdir),
+        credential_path=None,
+        part_size=8 * 1024 ** 2,
+        concurrency=1,
+        inline_threshold=0,
+    ))
+    monkeypatch.setattr(plynx.utils.remote, '_driver', driver)
+    return driver
+
+
+@pytest.fixture(autouse=True)
+def db(monkeypatch):
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(file_handler, 'get_db_connector', lambda: db)
+    return db
+
+
+def test_segmented_file(monkeypatch):
+    file_path = file_handler.append_file_stream(b'012')
+    assert file_handler.is_segmented(file_path)
+    assert file_handler.append_file_stream(b'', file_path) == file_path
+    assert file_handler.append_file_stream(b'3456', file_path) == file_path
+    file_handler.append_file_stream(b'789', file_path)
+
+    assert file_handler.get_file_stream(file_path).read() == b'0123456789'
+    assert file_handler.get_file_size(file_path) == 10
+    assert file_handler.get_file_range(file_path, 2, 6) == b'234567'
+    assert file_handler.get_file_range(file_path, 5) == b'56789'
+    assert file_handler.get_file_range(file_path, 11, 2) == b''
+
+    # the segments kept by the caller: the manifest is written, but not read
+    segments = []
+    assert file_handler.append_file_stream(b'ab', file_path, segments) == file_path
+    assert len(segments) == 5
+    with monkeypatch.context() as m:
+        m.setattr(file_handler, '_get_segments', None)
+        file_handler.append_file_stream(b'c', file_path, segments)
+    assert file_handler.get_file_stream(file_path).read() == b'0123456789abc'
+
+    # the path does not change
+    assert file_handler.compact_file(file_path, metadata={'file_type': 'file'}) == file_path
+    assert file_handler.get_file_stream(file_path).read() == b'0123456789abc'
+    assert file_handler.get_file_range(file_path, 9, 2) == b'9a'
+    assert len(file_handler._get_segments(file_path)) == 1
+    assert not plynx.utils.remote.get_driver().get_contents_handler('{}.0'.format(file_path)).exists()
+    metadata = file_handler.get_file_metadata(file_path)
+    assert metadata['size'] == 13
+    assert metadata['file_type'] == 'file'
+
+
+def test_inline_file(driver, db, tmpdir):
+    driver.inline_threshold = 4
+
+    file_path = file_handler.upload_file_stream(io.BytesIO(b'0123'))
+    assert file_handler.is_inline(file_path)
+    assert not driver.get_contents_handler(file_path).exists()
+    assert file_handler.get_file_stream(file_path).read() == b'0123'
+    assert file_handler.get_file_size(file_path) == 4
+    assert file_handler.get_file_range(file_path, 1, 2) == b'12'
+    local_path = str(tmpdir.join('local'))
+    file_handler.materialize_file(file_path, local_path)
+    with open(local_path, 'rb') as f:
+        assert f.read() == b'0123'
+
+    # not seekable streams
+    large_file_path = file_handler.upload_file_stream(io.BufferedReader(io.BytesIO(b'01234')), seek=False)
+    assert not file_handler.is_inline(large_file_path)
+    assert file_handler.get_file_stream(large_file_path).read() == b'01234'
+
+    assert file_handler.remove_batch([file_path, large_file_path]) == []
+    assert db[Collections.RESOURCE_BLOBS].count_documents({}) == 0
+    assert not driver.get_contents_handler(large_file_path).exists()
+
+
+def test_metadata(db):
+    data = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+    file_path = file_handler.upload_file_stream(io.BytesIO(data), metadata={'file_type': 'image'})
+    metadata = file_handler.get_file_metadata(file_path)
+    assert metadata['size'] == len(data)
+    assert metadata['digest'] == 'sha256:{}'.format(hashlib.sha256(data).hexdigest())
+    assert metadata['content_type'] == 'image/png'
+    assert metadata['file_type'] == 'image'
+
+    text_file_path = file_handler.upload_file_stream(io.BytesIO('абв'.encode('utf-8') * 1000))
+    assert file_handler.get_file_metadata(text_file_path)['content_type'] == 'text/plain'
+
+    file_handler.remove(file_path)
+    assert db[Collections.RESOURCES].count_documents({'_id': file_path}) == 0
+
+    assert list(file_handler.get_files_metadata([text_file_path, file_path])) == [text_file_path]
+
+    # resources without metadata
+    legacy_file_path = file_handler.upload_file_stream(io.BytesIO(data))
+    db[Collections.RESOURCES].delete_many({})
+    assert file_handler.get_file_metadata(legacy_file_path) == {'_id': legacy_file_path, 'size': len(data)}
+    assert file_handler.get_files_metadata([legacy_file_path]) == {}
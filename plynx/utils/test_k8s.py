@@ -0,0 +1,274 @@
+import os
+import tarfile
+import json
+import queue
+import base64
+import struct
+import hashlib
+import threading
+import subprocess
+import socketserver
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+import pytest
+
+kubernetes = pytest.importorskip('kubernetes')
+
+from plynx.utils import k8s  # noqa: E402
+
+_WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+_OPCODE_BINARY = 0x2
+_OPCODE_CLOSE = 0x8
+_ERROR_CHANNEL = 3
+
+
+def _send_frame(wfile, opcode, payload):
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 2 ** 16:
+        header += bytes([126]) + struct.pack('!H', len(payload))
+    else:
+        header += bytes([127]) + struct.pack('!Q', len(payload))
+    wfile.write(header + payload)
+    wfile.flush()
+
+
+def _recv_frame(rfile):
+    header = rfile.read(2)
+    if len(header) < 2:
+        return None, None
+    opcode = header[0] & 0x0f
+    size = header[1] & 0x7f
+    if size == 126:
+        size = struct.unpack('!H', rfile.read(2))[0]
+    elif size == 127:
+        size = struct.unpack('!Q', rfile.read(8))[0]
+    mask = rfile.read(4) if header[1] & 0x80 else b'\0' * 4
+    payload = rfile.read(size)
+    return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+class _ExecHandler(socketserver.StreamRequestHandler):
+    """Exec API of a pod: run the command locally using the v4 channel protocol."""
+
+    def handle(self):
+        request_line = self.rfile.readline().decode('latin-1')
+        headers = {}
+        for line in iter(self.rfile.readline, b'\r\n'):
+            key, value = line.decode('latin-1').split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+        query = parse_qs(urlparse(request_line.split()[1]).query)
+
+        accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + _WEBSOCKET_GUID).encode()).digest())
+        self.wfile.write(
+            b'HTTP/1.1 101 Switching Protocols\r\n'
+            b'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+            b'Sec-WebSocket-Protocol: v4.channel.k8s.io\r\n'
+            b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n'
+        )
+        self.wfile.flush()
+
+        sp = subprocess.Popen(query['command'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        lock = threading.Lock()
+
+        def forward(channel, pipe):
+            for data in iter(lambda: pipe.read1(4096), b''):
+                with lock:
+                    _send_frame(self.wfile, _OPCODE_BINARY, bytes([channel]) + data)
+
+        def read_stdin():
+            while True:
+                opcode, payload = _recv_frame(self.rfile)
+                if opcode is None or opcode == _OPCODE_CLOSE:
+                    break
+                if payload[:1] == b'\0':
+                    try:
+                        sp.stdin.write(payload[1:])
+                        sp.stdin.flush()
+                    except BrokenPipeError:
+                        pass
+
+        readers = [threading.Thread(target=forward, args=(channel, pipe)) for channel, pipe in ((1, sp.stdout), (2, sp.stderr))]
+        for reader in readers:
+            reader.start()
+        stdin_reader = threading.Thread(target=read_stdin, daemon=True)
+        stdin_reader.start()
+        for reader in readers:
+            reader.join()
+        returncode = sp.wait()
+
+        if returncode == 0:
+            status = {'status': 'Success'}
+        else:
+            status = {'status': 'Failure', 'details': {'causes': [{'reason': 'ExitCode', 'message': str(returncode)}]}}
+        with lock:
+            _send_frame(self.wfile, _OPCODE_BINARY, bytes([_ERROR_CHANNEL]) + json.dumps(status).encode())
+            _send_frame(self.wfile, _OPCODE_CLOSE, struct.pack('!H', 1000))
+        # wait for the close frame of the client
+        stdin_reader.join()
+
+
+@pytest.fixture
+def api():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _ExecHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    configuration = kubernetes.client.Configuration()
+    configuration.host = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    yield kubernetes.client.CoreV1Api(kubernetes.client.ApiClient(configuration))
+    server.shutdown()
+    server.server_close()
+
+
+def test_exec(api):
+    stdout, stderr = [], []
+    returncode = k8s.exec_in_pod(
+        api, 'ns', 'pod', ['sh', '-c', 'echo out; echo err >&2; exit 3'],
+        write_stdout=stdout.append,
+        write_stderr=stderr.append,
+    )
+    assert returncode == 3
+    assert ''.join(stdout) == 'out\n'
+    assert ''.join(stderr) == 'err\n'
+
+
+def test_copy(api, tmpdir):
+    src = tmpdir.mkdir('src')
+    src.join('text').write('text')
+    src.mkdir('dir').join('binary').write_binary(os.urandom(300000))
+    dst = tmpdir.join('dst')
+
+    assert k8s.copy_to_pod(api, 'ns', 'pod', str(src), str(dst)) == 0
+    assert dst.join('text').read() == 'text'
+    assert dst.join('dir', 'binary').read_binary() == src.join('dir', 'binary').read_binary()
+
+    local_dir = tmpdir.mkdir('local')
+    local_dir.join('text').write('stale')
+    returncode = k8s.copy_from_pod(api, 'ns', 'pod', [str(dst.join('text')), str(dst.join('dir'))], str(local_dir))
+    assert returncode == 0
+    assert local_dir.join('text').read() == 'text'
+    assert local_dir.join('dir', 'binary').read_binary() == src.join('dir', 'binary').read_binary()
+
+    # missing paths are skipped
+    assert k8s.copy_from_pod(api, 'ns', 'pod', [str(dst.join('missing'))], str(local_dir)) == 0
+    assert not local_dir.join('missing').check()
+
+
+@pytest.mark.parametrize('data_filter', [True, False])
+def test_copy_from_pod_rejects_links_outside(api, tmpdir, monkeypatch, data_filter):
+    if not data_filter:
+        monkeypatch.delattr(tarfile, 'data_filter', raising=False)
+    dst = tmpdir.mkdir('dst')
+    dst.join('link').mksymlinkto(str(tmpdir))
+
+    local_dir = tmpdir.mkdir('local')
+    with pytest.raises(IOError):
+        k8s.copy_from_pod(api, 'ns', 'pod', [str(dst.join('link'))], str(local_dir))
+    assert not local_dir.join('link').check(link=1)
+
+
+class _FakePods(object):
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+
+    def create(self, key, lifetime):
+        name = 'pod-{}'.format(len(self.created))
+        self.created.append((name, key, lifetime))
+        return name
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+def test_pod_pool():
+    pods = _FakePods()
+    pool = k8s.PodPool(min_size=1, max_size=2, idle_ttl=0, lifetime=100, create_pod=pods.create, delete_pod=pods.delete)
+
+    first = pool.acquire('a', 10)
+    second = pool.acquire('a', 10)
+    # `max_size` is exceeded: the pod is deleted after the job
+    third = pool.acquire('a', 10)
+    assert [first.pooled, second.pooled, third.pooled] == [True, True, False]
+    pool.release(third, True)
+    assert pods.deleted == [third.name]
+
+    pool.release(first, True)
+    assert pool.acquire('a', 10) is first
+    # the idle pod would exit before the end of the job
+    pool.release(first, True)
+    long_job = pool.acquire('a', 1000)
+    assert long_job.name not in (first.name, second.name)
+    assert pods.created[-1][2] == 1000
+    pool.release(long_job, False)
+
+    # broken pods are not reused
+    pool.release(second, False)
+    assert pods.deleted == [third.name, long_job.name, second.name]
+
+    # the idle pods above `min_size` are deleted after `idle_ttl`
+    pool.maintain()
+    assert first.name not in pods.deleted
+    # the pools of the used keys are kept warm up to `min_size`
+    pool.release(pool.acquire('b', 10), False)
+    pool.maintain()
+    assert pods.created[-1][1] == 'b'
+    assert pool.acquire('b', 10).name == pods.created[-1][0]
+
+    pool.close()
+    assert first.name in pods.deleted
+
+
+def _make_pod(name, phase):
+    return SimpleNamespace(metadata=SimpleNamespace(name=name), status=SimpleNamespace(phase=phase))
+
+
+class _FakeWatch(object):
+    events = []
+
+    def stream(self, func, *args, **kwargs):
+        assert kwargs['resource_version'] == '1'
+        for event in _FakeWatch.events:
+            yield event
+
+    def stop(self):
+        pass
+
+
+def test_pod_watcher(monkeypatch):
+    listed = []
+
+    def list_namespaced_pod(namespace, label_selector):
+        listed.append(label_selector)
+        return SimpleNamespace(metadata=SimpleNamespace(resource_version='1'), items=[_make_pod('a', 'Pending')])
+
+    api = SimpleNamespace(list_namespaced_pod=list_namespaced_pod)
+    monkeypatch.setattr(kubernetes.watch, 'Watch', _FakeWatch)
+    _FakeWatch.events = [
+        {'type': 'MODIFIED', 'object': _make_pod('a', 'Running')},
+        {'type': 'ADDED', 'object': _make_pod('other', 'Pending')},
+        {'type': 'DELETED', 'object': _make_pod('a', 'Running')},
+    ]
+
+    watcher = k8s.PodWatcher(api, 'ns', 'plynx-worker=abc')
+    events = watcher.subscribe('a')
+    watcher.start()
+    try:
+        # the state from the list, then the events of the pod
+        received = [events.get(timeout=5) for _ in range(3)]
+    finally:
+        watcher.stop()
+    assert [(event_type, pod.status.phase) for event_type, pod in received] == [
+        ('MODIFIED', 'Pending'),
+        ('MODIFIED', 'Running'),
+        ('DELETED', 'Running'),
+    ]
+    assert listed[0] == 'plynx-worker=abc'
+
+    watcher.unsubscribe('a')
+    watcher.dispatch('MODIFIED', _make_pod('a', 'Running'))
+    with pytest.raises(queue.Empty):
+        events.get_nowait()
@@ -0,0 +1,61 @@
+import os
+import pytest
+from plynx.utils.config import ScratchRootConfig
+from plynx.utils.scratch import LOCK_NAME, ScratchManager, ScratchPolicy
+
+
+@pytest.fixture
+def scratch_root_configs(tmpdir):
+    return [
+        ScratchRootConfig(name='small', path=str(tmpdir.join('small')), quota=100, min_free=0),
+        ScratchRootConfig(name='large', path=str(tmpdir.join('large')), quota=0, min_free=0),
+    ]
+
+
+def test_reserve(scratch_root_configs):
+    scratch = ScratchManager(scratch_root_configs, ScratchPolicy.FIRST_FIT, 'worker')
+    scratch.lock()
+    small, large = scratch.roots
+
+    assert scratch.reserve(60) is small
+    # the quota of `small` is exceeded
+    assert scratch.reserve(60) is large
+    scratch.release(small, 60)
+    assert scratch.reserve(60, name='small') is small
+    assert scratch.reserve(10, name='large') is large
+    assert small.reserved == 60
+
+
+def test_most_free(scratch_root_configs):
+    scratch = ScratchManager(scratch_root_configs, ScratchPolicy.MOST_FREE, 'worker')
+    scratch.lock()
+    assert scratch.reserve(10).name == 'large'
+
+
+def test_leftovers(scratch_root_configs):
+    scratch = ScratchManager(scratch_root_configs, ScratchPolicy.FIRST_FIT, 'worker')
+    scratch.lock()
+    os.makedirs(os.path.join(scratch.roots[0].path, 'job'))
+
+    # running worker
+    alive = ScratchManager(scratch_root_configs, ScratchPolicy.FIRST_FIT, 'alive')
+    alive.lock()
+    # dead worker: the lock is not held
+    dead = ScratchManager(scratch_root_configs, ScratchPolicy.FIRST_FIT, 'dead')
+    dead.lock()
+    dead.roots[1]._lock_file.close()
+    # not created by a worker
+    os.makedirs(os.path.join(scratch_root_configs[1].path, 'other', 'data'))
+
+    with pytest.raises(Exception):
+        ScratchManager(scratch_root_configs, ScratchPolicy.FIRST_FIT, 'worker').lock()
+
+    leftovers = sorted(path for path, _ in scratch.iter_leftovers())
+    assert leftovers == [
+        os.path.join(scratch_root_configs[1].path, 'dead'),
+        os.path.join(scratch_root_configs[0].path, 'worker', 'job'),
+    ]
+    assert not os.path.exists(os.path.join(scratch_root_configs[1].path, 'other', LOCK_NAME))
+
+    with pytest.raises(Exception, match='not been created'):
+        ScratchManager(scratch_root_configs, ScratchPolicy.FIRST_FIT, 'other').lock()
@@ -0,0 +1,18 @@
+from plynx.utils.template import TemplateCache
+
+
+def test_template_cache():
+    cache = TemplateCache(max_size=2)
+    assert cache.render('{{ a }}', a=1) == '1'
+    assert cache.render('{{ a }}', a=2) == '2'
+    assert cache.render('{{ b }}', b=3) == '3'
+    assert cache.render('{{ c }}', c=4) == '4'
+    # the least recently used template has been evicted
+    assert cache.render('{{ a }}', a=5) == '5'
+
+    stats = cache.get_stats()
+    assert stats['size'] == 2
+    assert stats['hits'] == 1
+    assert stats['misses'] == 4
+    assert stats['compile_time'] > 0
+    assert stats['render_time'] > 0
@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 import json
+import time
 from flask import request, g
 from plynx.db.node import Node
 from plynx.db.group import Group
@@ -9,7 +10,8 @@ import plynx.base.hub
 import plynx.utils.plugin_manager
 from plynx.web.common import app, requires_auth, make_success_response, make_fail_response, make_permission_denied, handle_errors
 from plynx.utils.common import to_object_id
-from plynx.constants import NodeStatus, NodePostAction, NodePostStatus, Collections, NodeClonePolicy, NodeVirtualCollection, IAMPolicies
+from plynx.constants import NodeStatus, NodePostAction, NodePostStatus, Collections, NodeClonePolicy, NodeVirtualCollection, IAMPolicies, \
+    RunPhase, NodeRunningStatus
 
 PAGINATION_QUERY_KEYS = {'per_page', 'offset', 'status', 'hub', 'node_kinds', 'search', 'user_id'}
 
@@ -220,6 +222,7 @@ def post_node(collection):
 
         node = node.clone(NodeClonePolicy.NODE_TO_RUN)
         node.author = g.user._id
+        node.timings[RunPhase.QUEUE] = {'start': time.time()}
         if is_admin or can_run_workflows:
             node.save(collection=Collections.RUNS)
         else:
@@ -318,6 +321,49 @@ def post_node(collection):
         })
 
 
+def can_view_run(run):
+    """Check if the current user can view the details of the run, such as its timings and logs."""
+    if run['author'] == to_object_id(g.user._id):
+        return True
+    is_workflow = run['kind'] in workflow_manager.kind_to_workflow_dict
+    return g.user.check_role(IAMPolicies.CAN_VIEW_OTHERS_WORKFLOWS if is_workflow else IAMPolicies.CAN_VIEW_OTHERS_OPERATIONS)
+
+
+@app.route('/plynx/api/v0/runs/<run_id>/timings', methods=['GET'])
+@handle_errors
+@requires_auth
+def get_run_timings(run_id):
+    """Get the phase timings and the resource usage of the run and of its subnodes."""
+    user_id = to_object_id(g.user._id)
+    try:
+        run_id = to_object_id(run_id)
+    except Exception:
+        return make_fail_response('Invalid ID'), 404
+    run = node_collection_managers[Collections.RUNS].get_db_node(run_id, user_id)
+    if not run:
+        return make_fail_response('Run `{}` was not found'.format(run_id)), 404
+    if not can_view_run(run):
+        return make_permission_denied()
+
+    node = Node.from_dict(run)
+    nodes = [node]
+    sub_nodes = node.get_parameter_by_name('_nodes', throw=False)
+    if sub_nodes:
+        nodes.extend(sub_node for sub_node in sub_nodes.value.value if sub_node.node_running_status != NodeRunningStatus.SPECIAL)
+    return make_success_response({
+        'runs': [
+            {
+                'node_id': str(node._id),
+                'title': node.title,
+                'node_running_status': node.node_running_status,
+                'timings': node.timings,
+                'rusage': node.rusage,
+            }
+            for node in nodes
+        ]
+    })
+
+
 @app.route('/plynx/api/v0/groups', methods=['POST'])
 @handle_errors
 @requires_auth
@@ -1,36 +1,131 @@
+import io
 import json
-from flask import request, send_file, g
+import codecs
+from bson.errors import InvalidId
+from flask import request, send_file, g, make_response
 import plynx.db.node
-from plynx.web.common import app, requires_auth, make_success_response, make_fail_response, handle_errors
+import plynx.db.node_collection_manager
+from plynx.web.common import app, requires_auth, make_success_response, make_fail_response, make_permission_denied, \
+    handle_errors
+from plynx.web.node import can_view_run
+from plynx.db.worker_state import get_live_log_tail
 import plynx.base.resource
 from plynx.plugins.resources.common import FILE_KIND
 import plynx.utils.plugin_manager
-from plynx.utils.file_handler import get_file_stream, upload_file_stream
-from plynx.constants import NodeRunningStatus, NodeStatus
+from plynx.utils.common import to_object_id
+from plynx.utils.file_handler import get_file_stream, get_file_range, get_file_metadata, upload_file_stream, \
+    DEFAULT_CONTENT_TYPE
+from plynx.constants import NodeRunningStatus, NodeStatus, Collections
 
 
 RESOURCE_TYPES = list(plynx.utils.plugin_manager.get_resource_manager().kind_to_resource_class.keys())
+DEFAULT_LOG_LIMIT = 1024 ** 2   # 1 MB
+MAX_LOG_LIMIT = 16 * 1024 ** 2
+
+run_collection_manager = plynx.db.node_collection_manager.NodeCollectionManager(collection=Collections.RUNS)
 
 
 @app.route('/plynx/api/v0/resource/<resource_id>', methods=['GET'])
 @handle_errors
 def get_resource(resource_id):
+    if request.method == 'HEAD':
+        # metadata only, the content is not fetched from the storage
+        metadata = get_file_metadata(resource_id)
+        response = make_response('')
+        response.headers['Content-Length'] = metadata['size']
+        response.headers['Content-Type'] = metadata.get('content_type', DEFAULT_CONTENT_TYPE)
+        if metadata.get('digest'):
+            response.headers['Digest'] = metadata['digest']
+            response.set_etag(metadata['digest'])
+        return response
     preview = json.loads(request.args.get('preview', 'false'))
     file_type = request.args.get('file_type', None)
     if preview and not file_type:
         return make_fail_response('In preview mode `file_type` must be specified'), 400
-    fp = get_file_stream(resource_id, preview=preview, file_type=file_type)
     if preview:
+        resource_class = plynx.utils.plugin_manager.get_resource_manager().kind_to_resource_class[file_type]
+        if resource_class.PREVIEW_SIZE is None:
+            fp = get_file_stream(resource_id, preview=preview, file_type=file_type)
+        elif resource_class.PREVIEW_SIZE == 0:
+            fp = io.BytesIO()
+        else:
+            # fetch only the head of the object
+            fp = io.BytesIO(get_file_range(resource_id, 0, resource_class.PREVIEW_SIZE))
         preview_object = plynx.base.resource.PreviewObject(
             fp=fp,
             resource_id=resource_id,
         )
-        return plynx.utils.plugin_manager.get_resource_manager().kind_to_resource_class[file_type].preview(preview_object)
+        return resource_class.preview(preview_object)
+    fp = get_file_stream(resource_id)
     return send_file(
         fp,
         attachment_filename=resource_id)
 
 
+@app.route('/plynx/api/v0/resource/<resource_id>/metadata', methods=['GET'])
+@handle_errors
+def get_resource_metadata(resource_id):
+    metadata = get_file_metadata(resource_id)
+    return make_success_response({
+        'metadata': {
+            'resource_id': resource_id,
+            'size': metadata['size'],
+            'digest': metadata.get('digest'),
+            'content_type': metadata.get('content_type'),
+            'file_type': metadata.get('file_type'),
+            'run_id': str(metadata['run_id']) if metadata.get('run_id') else None,
+            'node_id': str(metadata['node_id']) if metadata.get('node_id') else None,
+        }
+    })
+
+
+@app.route('/plynx/api/v0/logs/<run_id>/<log_name>', methods=['GET'])
+@handle_errors
+@requires_auth
+def get_log_tail(run_id, log_name):
+    try:
+        run_id = to_object_id(run_id)
+    except InvalidId:
+        return make_fail_response('Invalid ID'), 400
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = min(int(request.args.get('limit', DEFAULT_LOG_LIMIT)), MAX_LOG_LIMIT)
+    except ValueError:
+        return make_fail_response('`offset` and `limit` must be integers'), 400
+    if offset < 0 or limit < 0:
+        return make_fail_response('`offset` and `limit` must be non-negative'), 400
+    run = run_collection_manager.get_db_object(run_id)
+    if not run:
+        return make_fail_response('Run `{}` was not found'.format(run_id)), 404
+    if not can_view_run(run):
+        return make_permission_denied()
+
+    log_dicts = [log for log in run['logs'] if log['name'] == log_name]
+    if not log_dicts:
+        return make_fail_response('Log `{}` was not found'.format(log_name)), 404
+
+    finished = NodeRunningStatus.is_finished(run['node_running_status'])
+    if request.args.get('tail'):
+        # the recent part of the log kept in memory by the worker while the run is active
+        return make_success_response({
+            'data': None if finished else get_live_log_tail(run_id, log_name),
+            'finished': finished,
+        })
+    data = b''
+    if log_dicts[0]['values']:
+        data = get_file_range(log_dicts[0]['values'][0], offset, limit)
+    # do not split multibyte characters: the tail of incomplete sequence will be returned in the next call
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    text = decoder.decode(data, final=finished and len(data) < limit)
+    pending_bytes, _ = decoder.getstate()
+
+    return make_success_response({
+        'data': text,
+        'offset': offset + len(data) - len(pending_bytes),
+        'finished': finished,
+    })
+
+
 @app.route('/plynx/api/v0/resource', methods=['POST'])
 @handle_errors
 @requires_auth
@@ -56,7 +151,7 @@ def upload_file():
         app.logger.debug(RESOURCE_TYPES)
         return make_fail_response('Unknown file type `{}`'.format(file_type)), 400
 
-    resource_id = upload_file_stream(request.files['data'])
+    resource_id = upload_file_stream(request.files['data'], metadata={'file_type': file_type})
 
     file = plynx.db.node.Node.from_dict({
         'title': title,
@@ -0,0 +1,77 @@
+"""Memory and latency of the nodes of a large workflow.
+
+Usage:
+    python scripts/benchmark_nodes.py [--nodes 10000] [--parameters 20]
+"""
+import time
+import argparse
+import tracemalloc
+from plynx.db.node import Node
+
+
+def make_node_dict(index, num_parameters):
+    return {
+        'title': 'Node {}'.format(index),
+        'kind': 'basic-bash-jinja2-operation',
+        'inputs': [
+            {
+                'name': 'in_{}'.format(i),
+                'file_type': 'file',
+                'values': [],
+                'input_references': [{'node_id': None, 'output_id': 'out_0'}],
+            }
+            for i in range(2)
+        ],
+        'outputs': [{'name': 'out_{}'.format(i), 'file_type': 'file', 'values': ['resource']} for i in range(2)],
+        'logs': [{'name': name, 'file_type': 'file', 'values': []} for name in ('stderr', 'stdout', 'worker')],
+        'parameters': [
+            {'name': '_param_{}'.format(i), 'parameter_type': 'int', 'value': i}
+            for i in range(num_parameters)
+        ],
+    }
+
+
+def measure(name, func, repeat=1):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        res = func()
+    elapsed = time.perf_counter() - start_time
+    print('{:<32} {:>10.3f} ms'.format(name, elapsed * 1000 / repeat))
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--parameters', type=int, default=20)
+    args = parser.parse_args()
+
+    node_dicts = [make_node_dict(i, args.parameters) for i in range(args.nodes)]
+
+    nodes = measure('load', lambda: [Node.from_dict(node_dict) for node_dict in node_dicts])
+
+    # tracing slows the allocations down, so the memory is measured on a separate load
+    del nodes
+    tracemalloc.start()
+    nodes = [Node.from_dict(node_dict) for node_dict in node_dicts]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:<32} {:>10.1f} MB'.format('memory', size / 1024 ** 2))
+
+    last_parameter = '_param_{}'.format(args.parameters - 1)
+
+    def lookup():
+        for node in nodes:
+            node.get_parameter_by_name(last_parameter)
+            node.get_output_by_name('out_1')
+            node.get_input_by_name('in_1')
+            node.get_log_by_name('worker')
+
+    measure('first lookup x4 per node', lookup)
+    measure('lookup x4 per node', lookup, repeat=5)
+    measure('copy', lambda: [node.copy() for node in nodes])
+    measure('to_dict', lambda: [node.to_dict() for node in nodes])
+
+
+if __name__ == '__main__':
+    main()
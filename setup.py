@@ -27,6 +27,11 @@ ssh = [
 ]
 all_remotes = gs + s3 + ssh
 
+# Extra dependencies for compression of Directory resources
+zstd = [
+    "zstandard>=0.15.0",
+]
+
 setup(
     name='plynx',
     version=plynx.__version__,
@@ -63,10 +68,11 @@ setup(
     packages=find_packages(exclude=['scripts', 'docker']),
     install_requires=install_requires,
     extras_require={
-        'all': all_remotes,
+        'all': all_remotes + zstd,
         'gs': gs,
         's3': s3,
         'ssh': ssh,
+        'zstd': zstd,
     },
     package_data={},
     entry_points={